@@ -1,5 +1,8 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Optional, cast
+from typing import Callable, Optional, TypeVar, cast
+import asyncio
+import time
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
@@ -10,16 +13,31 @@ from sqlalchemy import select
 from ..database import get_db
 from ..models.user import User
 from ..config import settings
+from ..metrics import metrics
+from .token_cache import UserSnapshot, token_cache
 
 # Password hashing
 from passlib.context import CryptContext
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt runs on a small dedicated pool so it never blocks the event loop;
+# callers beyond PASSWORD_HASH_MAX_PENDING are turned away instead of queueing
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+)
+_hash_slots = asyncio.Semaphore(settings.PASSWORD_HASH_MAX_PENDING)
+
+T = TypeVar("T")
+
 # JWT Bearer token
 security = HTTPBearer()
 
 
+class PasswordHashingBusy(Exception):
+    pass
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
@@ -28,6 +46,29 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+async def _run_password_hashing(fn: Callable[..., T], *args) -> T:
+    if _hash_slots.locked():
+        metrics.inc("password_hash_rejected_total")
+        raise PasswordHashingBusy(
+            "Too many sign-in requests are being processed. Please try again in a moment."
+        )
+
+    async with _hash_slots:
+        start = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(_hash_executor, fn, *args)
+        finally:
+            metrics.observe("password_hash_seconds", time.perf_counter() - start)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_password_hashing(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_password_hashing(get_password_hash, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -55,7 +96,7 @@ async def authenticate_user(
     user = await get_user_by_email(db, email)
     if not user:
         return None
-    if not verify_password(password, str(user.hashed_password)):
+    if not await verify_password_async(password, str(user.hashed_password)):
         return None
     return user
 
@@ -63,7 +104,12 @@ async def authenticate_user(
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: AsyncSession = Depends(get_db),
-) -> User:
+) -> UserSnapshot:
+    # Verified tokens are served from memory until they expire or are invalidated
+    cached = token_cache.get(credentials.credentials)
+    if cached is not None:
+        return cached[1]
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -85,12 +131,15 @@ async def get_current_user(
     user = await get_user_by_email(db, email)
     if user is None:
         raise credentials_exception
-    return user
+
+    snapshot = UserSnapshot.from_model(user)
+    token_cache.put(credentials.credentials, payload, snapshot)
+    return snapshot
 
 
 def get_current_active_user(
-    current_user: User = Depends(get_current_user),
-) -> User:
+    current_user: UserSnapshot = Depends(get_current_user),
+) -> UserSnapshot:
     if current_user.is_active is False:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
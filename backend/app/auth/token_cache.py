@@ -0,0 +1,159 @@
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Optional, Set, Tuple
+
+from ..config import settings
+from ..database import get_redis
+from ..metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "auth:user-invalidated"
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """Compact, session-independent copy of the authenticated user."""
+
+    id: int
+    email: str
+    first_name: Optional[str]
+    last_name: Optional[str]
+    is_active: bool
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+
+    @classmethod
+    def from_model(cls, user: Any) -> "UserSnapshot":
+        return cls(
+            id=int(user.id),
+            email=str(user.email),
+            first_name=user.first_name,
+            last_name=user.last_name,
+            is_active=bool(user.is_active),
+            created_at=user.created_at,
+            updated_at=user.updated_at,
+        )
+
+
+class TokenCache:
+    """
+    Bounded LRU of verified tokens, keyed by the token's SHA-256 digest.
+
+    Entries never outlive the token's own ``exp`` claim and can be dropped
+    per user when the profile or password changes.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any], UserSnapshot]]" = OrderedDict()
+        self._by_user: Dict[int, Set[str]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def digest(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> Optional[Tuple[Dict[str, Any], UserSnapshot]]:
+        key = self.digest(token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                metrics.inc("auth_token_cache_requests_total", result="hit")
+                return entry[1], entry[2]
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+        metrics.inc("auth_token_cache_requests_total", result="miss")
+        return None
+
+    def put(self, token: str, claims: Dict[str, Any], user: UserSnapshot) -> None:
+        expires_at = time.time() + self.ttl_seconds
+        exp = claims.get("exp")
+        if exp is not None:
+            expires_at = min(expires_at, float(exp))
+        if expires_at <= time.time():
+            return
+
+        key = self.digest(token)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (expires_at, claims, user)
+            self._by_user.setdefault(user.id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+    def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            for key in list(self._by_user.get(user_id, ())):
+                self._remove(key)
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._by_user.get(entry[2].id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[entry[2].id]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+token_cache = TokenCache(settings.AUTH_CACHE_MAX_ENTRIES, settings.AUTH_CACHE_TTL)
+metrics.gauge("auth_token_cache_entries", lambda: len(token_cache))
+metrics.gauge("auth_token_cache_hit_ratio", token_cache.hit_ratio)
+
+
+async def publish_user_invalidation(user_id: int) -> None:
+    """Drop a user's cached tokens here and in every other process."""
+    token_cache.invalidate_user(user_id)
+    try:
+        async with get_redis() as redis:
+            await redis.publish(INVALIDATION_CHANNEL, str(user_id))
+    except Exception as e:
+        logger.warning(f"Failed to broadcast token cache invalidation for user {user_id}: {e}")
+
+
+async def listen_for_invalidations() -> None:
+    """Background task applying invalidations published by other workers."""
+    while True:
+        try:
+            async with get_redis() as redis:
+                pubsub = redis.pubsub()
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                try:
+                    while True:
+                        message = await pubsub.get_message(
+                            ignore_subscribe_messages=True, timeout=1.0
+                        )
+                        if message is not None:
+                            token_cache.invalidate_user(int(message["data"]))
+                finally:
+                    await pubsub.unsubscribe(INVALIDATION_CHANNEL)
+                    await pubsub.aclose()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Token cache invalidation listener failed, retrying: {e}")
+            await asyncio.sleep(1)
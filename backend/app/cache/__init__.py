@@ -0,0 +1,26 @@
+from .swr import SWRCache, jittered
+from .two_tier import LRU, TwoTierCache, listen_for_cache_invalidations
+from .tags import (
+    add_cache_tags,
+    invalidate_tags,
+    ticker_articles_tag,
+    ticker_sentiment_tag,
+    user_holdings_tag,
+    user_watchlist_tag,
+    wait_for_invalidations,
+)
+
+__all__ = [
+    "SWRCache",
+    "jittered",
+    "LRU",
+    "TwoTierCache",
+    "listen_for_cache_invalidations",
+    "add_cache_tags",
+    "invalidate_tags",
+    "ticker_articles_tag",
+    "ticker_sentiment_tag",
+    "user_holdings_tag",
+    "user_watchlist_tag",
+    "wait_for_invalidations",
+]
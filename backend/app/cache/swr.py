@@ -0,0 +1,288 @@
+import asyncio
+import json
+import logging
+import math
+import random
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Union
+
+from ..database import get_redis
+from ..metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+Compute = Callable[[], Awaitable[Any]]
+
+# Delete the lock only if it still holds our token, so a slow holder whose
+# lock already expired cannot release someone else's
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Store an entry only if the key's generation is unchanged since the
+# computation started, so a refresh that began before an invalidation cannot
+# put pre-invalidation data back, and register the key under its tag sets.
+# KEYS: entry, generation, tag sets...; ARGV: envelope, ttl (ms), generation ('' if none)
+WRITE_SCRIPT = """
+local generation = redis.call('GET', KEYS[2])
+if (generation or '') ~= ARGV[3] then
+  return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+for i = 3, #KEYS do
+  redis.call('SADD', KEYS[i], KEYS[1])
+  if redis.call('PTTL', KEYS[i]) < tonumber(ARGV[2]) then
+    redis.call('PEXPIRE', KEYS[i], ARGV[2])
+  end
+end
+return 1
+"""
+
+TAG_PREFIX = "cache:tag:"
+
+Tags = Union[Iterable[str], Callable[[Any], Iterable[str]]]
+
+
+def jittered(ttl: float, jitter: float) -> float:
+    """Spread ``ttl`` by +/- ``jitter`` (a fraction) so keys set together expire apart."""
+    return ttl * (1 + random.uniform(-jitter, jitter))
+
+
+class SWRCache:
+    """
+    Redis-backed cache with stale-while-revalidate and single-flight refresh.
+
+    Entries are stored as an envelope of the value, the time it was computed,
+    how long the computation took and when it goes stale. A read then is:
+
+    - fresh: served as is. Close to the stale time it may also start a
+      background refresh early, with a probability that grows as expiry nears
+      and with the cost of the computation (XFetch), so hot keys are usually
+      refreshed before anyone sees them stale;
+    - stale (past the fresh TTL, inside the stale window): served as is while
+      one background refresh runs;
+    - missing: computed, but only once. Concurrent callers in this process
+      await the same task and other processes wait on a Redis lock for the
+      holder to publish the value.
+
+    ``invalidate`` bumps a per-key generation alongside the delete; a refresh
+    that started before it finds the generation changed and discards its
+    result instead of storing pre-invalidation data.
+
+    Redis errors degrade to computing directly, still single-flight within the
+    process. Compute callables must not depend on the caller's request state
+    (e.g. its DB session), since a refresh can outlive the request.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ttl: float,
+        stale_ttl: float,
+        jitter: float = 0.1,
+        lock_timeout: float = 30.0,
+        beta: float = 1.0,
+        poll_interval: float = 0.05,
+    ):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.jitter = jitter
+        self.lock_timeout = lock_timeout
+        self.beta = beta
+        self.poll_interval = poll_interval
+        self._inflight: Dict[str, "asyncio.Task[Any]"] = {}
+
+    def key(self, suffix: Any) -> str:
+        return f"{self.name}:{suffix}"
+
+    async def get_or_compute(self, key: str, compute: Compute, tags: Tags = ()) -> Any:
+        """
+        The cached value for ``key``, computing it with ``compute`` if needed.
+
+        ``tags`` (or a callable deriving them from the computed value) are
+        registered for the stored entry so ``invalidate_tags`` can find it.
+        """
+        envelope = await self._read(key)
+        now = time.time()
+        if envelope is not None:
+            if now < envelope["stale_at"]:
+                if self._should_refresh_early(envelope, now):
+                    self._record("early_refresh")
+                    self._refresh_in_background(key, compute, tags)
+                else:
+                    self._record("fresh")
+                return envelope["value"]
+            self._record("stale")
+            self._refresh_in_background(key, compute, tags)
+            return envelope["value"]
+
+        self._record("miss")
+        return await asyncio.shield(self._single_flight(key, compute, tags, wait_for_holder=True))
+
+    async def invalidate(self, *keys: str) -> None:
+        if not keys:
+            return
+        self.discard_inflight(*keys)
+        try:
+            async with get_redis() as redis:
+                async with redis.pipeline(transaction=True) as pipe:
+                    for key in keys:
+                        pipe.incr(self._generation_key(key))
+                        pipe.pexpire(self._generation_key(key), self.max_age_ms())
+                    # Dropping the lock too lets the next miss recompute right
+                    # away rather than wait on a refresh whose result is void
+                    pipe.delete(*keys, *(self._lock_key(key) for key in keys))
+                    await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to invalidate {self.name} cache keys {keys}: {e}")
+
+    def discard_inflight(self, *keys: str) -> None:
+        # Later misses start a new computation instead of joining a void one
+        for key in keys:
+            self._inflight.pop(key, None)
+
+    @staticmethod
+    def _generation_key(key: str) -> str:
+        return f"{key}:gen"
+
+    @staticmethod
+    def _lock_key(key: str) -> str:
+        return f"{key}:lock"
+
+    def max_age_ms(self) -> int:
+        return int((self.ttl + self.stale_ttl) * (1 + self.jitter) * 1000)
+
+    def _should_refresh_early(self, envelope: Dict[str, Any], now: float) -> bool:
+        # XFetch: refresh when now - delta * beta * ln(rand) passes the stale
+        # time. -ln(rand) is exponential, so refreshes cluster just before
+        # expiry, and earlier for entries that are slow to compute.
+        delta = envelope.get("delta", 0.0)
+        if delta <= 0 or self.beta <= 0:
+            return False
+        return now - delta * self.beta * math.log(1.0 - random.random()) >= envelope["stale_at"]
+
+    def _refresh_in_background(self, key: str, compute: Compute, tags: Tags) -> None:
+        if key in self._inflight:
+            return
+        self._single_flight(key, compute, tags, wait_for_holder=False)
+
+    def _single_flight(
+        self, key: str, compute: Compute, tags: Tags, wait_for_holder: bool
+    ) -> "asyncio.Task[Any]":
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fill(key, compute, tags, wait_for_holder))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        return task
+
+    def _done(self, key: str, task: "asyncio.Task[Any]") -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"{self.name} cache refresh for {key} failed: {task.exception()}")
+
+    async def _fill(self, key: str, compute: Compute, tags: Tags, wait_for_holder: bool) -> Any:
+        lock_key = self._lock_key(key)
+        token = uuid.uuid4().hex
+        try:
+            async with get_redis() as redis:
+                generation = await redis.get(self._generation_key(key))
+                acquired = await redis.set(lock_key, token, nx=True, px=int(self.lock_timeout * 1000))
+        except Exception as e:
+            logger.warning(f"{self.name} cache lock unavailable, computing {key} directly: {e}")
+            return await self._compute(key, compute, tags, generation=None)
+        generation = generation.decode() if isinstance(generation, bytes) else (generation or "")
+
+        if not acquired:
+            if not wait_for_holder:
+                # Another process is already refreshing; keep serving stale
+                return None
+            envelope = await self._wait_for_holder(key)
+            if envelope is not None:
+                return envelope["value"]
+            # The holder died or is too slow: compute without the lock
+            self._record("lock_timeout")
+            return await self._compute(key, compute, tags, generation)
+
+        try:
+            return await self._compute(key, compute, tags, generation)
+        finally:
+            try:
+                async with get_redis() as redis:
+                    await redis.eval(RELEASE_SCRIPT, 1, lock_key, token)
+            except Exception as e:
+                logger.warning(f"Failed to release {self.name} cache lock {lock_key}: {e}")
+
+    async def _wait_for_holder(self, key: str) -> Optional[Dict[str, Any]]:
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            envelope = await self._read(key)
+            if envelope is not None:
+                self._record("lock_wait")
+                return envelope
+        return None
+
+    async def _compute(self, key: str, compute: Compute, tags: Tags, generation: Optional[str]) -> Any:
+        """Run ``compute`` and store the result unless ``generation`` is None."""
+        start = time.perf_counter()
+        value = await compute()
+        delta = time.perf_counter() - start
+        metrics.observe("cache_compute_seconds", delta, cache=self.name)
+        if generation is not None:
+            entry_tags = tags(value) if callable(tags) else tags
+            await self._write(key, value, delta, generation, entry_tags)
+        return value
+
+    async def _read(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            async with get_redis() as redis:
+                raw = await redis.get(key)
+        except Exception as e:
+            logger.warning(f"{self.name} cache read failed for {key}: {e}")
+            return None
+        if raw is None:
+            return None
+        try:
+            envelope = json.loads(raw)
+            if "value" not in envelope or "stale_at" not in envelope:
+                raise KeyError("value/stale_at")
+            return envelope
+        except (ValueError, TypeError, KeyError) as e:
+            logger.warning(f"Dropping corrupted {self.name} cache entry {key}: {e}")
+            await self.invalidate(key)
+            return None
+
+    async def _write(
+        self, key: str, value: Any, delta: float, generation: str, tags: Iterable[str]
+    ) -> None:
+        now = time.time()
+        fresh = jittered(self.ttl, self.jitter)
+        envelope = {"value": value, "computed_at": now, "delta": delta, "stale_at": now + fresh}
+        ttl_ms = int((fresh + jittered(self.stale_ttl, self.jitter)) * 1000)
+        tag_keys = [TAG_PREFIX + tag for tag in dict.fromkeys(tags)]
+        try:
+            async with get_redis() as redis:
+                stored = await redis.eval(
+                    WRITE_SCRIPT,
+                    2 + len(tag_keys),
+                    key,
+                    self._generation_key(key),
+                    *tag_keys,
+                    json.dumps(envelope, default=str),
+                    ttl_ms,
+                    generation,
+                )
+            if not stored:
+                self._record("discarded")
+        except Exception as e:
+            logger.warning(f"Failed to store {self.name} cache entry {key}: {e}")
+
+    def _record(self, result: str) -> None:
+        metrics.inc("cache_requests_total", cache=self.name, tier="l2", result=result)
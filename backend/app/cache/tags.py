@@ -0,0 +1,159 @@
+import asyncio
+import logging
+from typing import Any, Iterable, List, Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from ..database import get_redis
+from ..metrics import metrics
+from ..models.article import Article
+from ..models.holding import Holding
+from ..models.sentiment import Sentiment
+from ..models.watchlist import Watchlist
+from . import two_tier
+from .swr import TAG_PREFIX
+
+logger = logging.getLogger(__name__)
+
+# session.info keys: tags touched in the open transaction, and invalidations
+# started by its commits that the owner of the session may want to await
+PENDING_TAGS = "cache_tags"
+PENDING_INVALIDATIONS = "cache_invalidations"
+
+# Strong references to running invalidation tasks
+_running: Set["asyncio.Task[List[str]]"] = set()
+
+# Invalidate every entry registered under the given tag sets in one round-trip:
+# collect the members, void them the way SWRCache.invalidate does (generation
+# bump, value and lock deleted), drop the tag sets and announce the keys to
+# the L1 tiers. Entry-derived keys are not declared in KEYS, so this needs a
+# non-cluster Redis. KEYS: tag sets; ARGV: generation ttl (ms), channel
+INVALIDATE_SCRIPT = """
+local seen, keys = {}, {}
+for _, tag in ipairs(KEYS) do
+  for _, key in ipairs(redis.call('SMEMBERS', tag)) do
+    if not seen[key] then
+      seen[key] = true
+      keys[#keys + 1] = key
+    end
+  end
+  redis.call('DEL', tag)
+end
+for _, key in ipairs(keys) do
+  redis.call('INCR', key .. ':gen')
+  redis.call('PEXPIRE', key .. ':gen', ARGV[1])
+  redis.call('DEL', key, key .. ':lock')
+end
+if #keys > 0 then
+  redis.call('PUBLISH', ARGV[2], cjson.encode({keys = keys}))
+end
+return keys
+"""
+
+
+def user_holdings_tag(user_id: int) -> str:
+    return f"user:{user_id}:holdings"
+
+
+def user_watchlist_tag(user_id: int) -> str:
+    return f"user:{user_id}:watchlist"
+
+
+def ticker_sentiment_tag(ticker: str) -> str:
+    return f"ticker:{ticker}:sentiment"
+
+
+def ticker_articles_tag(ticker: str) -> str:
+    return f"ticker:{ticker}:articles"
+
+
+def tags_for(instance: Any) -> List[str]:
+    """Cache tags a write to this ORM instance invalidates."""
+    if isinstance(instance, Holding) and instance.user_id is not None:
+        return [user_holdings_tag(instance.user_id)]
+    if isinstance(instance, Watchlist) and instance.user_id is not None:
+        return [user_watchlist_tag(instance.user_id)]
+    if isinstance(instance, Sentiment) and instance.ticker:
+        return [ticker_sentiment_tag(instance.ticker)]
+    if isinstance(instance, Article) and instance.ticker:
+        return [ticker_articles_tag(instance.ticker)]
+    return []
+
+
+def add_cache_tags(session: Any, *tags: str) -> None:
+    """
+    Mark tags as touched by the session's transaction.
+
+    For writes the flush hook cannot see, i.e. Core insert/update/delete
+    statements; ORM instance writes are tagged automatically.
+    """
+    session.info.setdefault(PENDING_TAGS, set()).update(tags)
+
+
+async def invalidate_tags(tags: Iterable[str]) -> List[str]:
+    """Invalidate every cache entry carrying any of the tags; returns the keys."""
+    tags = sorted(set(tags))
+    if not tags:
+        return []
+    try:
+        async with get_redis() as redis:
+            keys = await redis.eval(
+                INVALIDATE_SCRIPT,
+                len(tags),
+                *(TAG_PREFIX + tag for tag in tags),
+                two_tier.max_generation_ttl_ms(),
+                two_tier.INVALIDATION_CHANNEL,
+            )
+    except Exception as e:
+        logger.warning(f"Failed to invalidate cache tags {tags}: {e}")
+        return []
+    keys = [k.decode() if isinstance(k, bytes) else k for k in keys]
+    # The listener would do this too; doing it here makes the invalidating
+    # worker consistent as soon as the call returns
+    two_tier.discard_local(keys)
+    metrics.inc("cache_tag_invalidations_total", value=len(tags))
+    return keys
+
+
+async def wait_for_invalidations(session: Any) -> None:
+    """Await the invalidations started by the session's commits."""
+    tasks = session.info.pop(PENDING_INVALIDATIONS, None)
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_tags(session: Session, flush_context) -> None:
+    tags: Set[str] = set()
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        tags.update(tags_for(instance))
+    if tags:
+        add_cache_tags(session, *tags)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session: Session) -> None:
+    tags = session.info.pop(PENDING_TAGS, None)
+    if not tags:
+        return
+    loop: Optional[asyncio.AbstractEventLoop]
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    if loop is None:
+        logger.warning(f"No event loop to invalidate cache tags {sorted(tags)} after commit")
+        return
+    # Commit hooks are synchronous; the invalidation runs as a task, which the
+    # session's owner can await through wait_for_invalidations
+    task = loop.create_task(invalidate_tags(tags))
+    pending = session.info.setdefault(PENDING_INVALIDATIONS, set())
+    for tracked in (pending, _running):
+        tracked.add(task)
+        task.add_done_callback(tracked.discard)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_tags(session: Session) -> None:
+    session.info.pop(PENDING_TAGS, None)
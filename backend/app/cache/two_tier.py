@@ -0,0 +1,164 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Tuple
+
+from ..database import get_redis
+from ..metrics import metrics
+from .swr import Compute, SWRCache, Tags
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "cache:invalidated"
+
+# Every TwoTierCache in the process, by name, for the invalidation listener
+_registry: Dict[str, "TwoTierCache"] = {}
+
+
+class LRU:
+    """Bounded, thread-safe LRU whose entries also expire after ``ttl`` seconds."""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            if entry[0] <= now:
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, entry[1]
+
+    def put(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class TwoTierCache:
+    """
+    Per-process LRU (L1) in front of the shared Redis cache (L2).
+
+    L2 holds JSON payloads and does the stale-while-revalidate and
+    single-flight work (see SWRCache). L1 holds the payloads already decoded
+    into response objects, so a hit costs neither a Redis round-trip nor JSON
+    parsing and object construction. L1 entries live for a short TTL and are
+    dropped in every worker when ``invalidate`` publishes the keys on Redis
+    pub/sub; the TTL bounds staleness if a message is missed.
+
+    Decoded objects are shared between requests and must not be mutated.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        l2: SWRCache,
+        decode: Callable[[Any], Any],
+        l1_max_entries: int,
+        l1_ttl: float,
+    ):
+        self.name = name
+        self.l2 = l2
+        self.decode = decode
+        self.l1 = LRU(l1_max_entries, l1_ttl)
+        # Bumped by every invalidation; a fetch that overlaps one does not
+        # fill L1, so it cannot re-insert what was just invalidated
+        self._invalidations = 0
+        _registry[name] = self
+        metrics.gauge("cache_l1_entries", lambda: len(self.l1), cache=name)
+
+    def key(self, suffix: Any) -> str:
+        return self.l2.key(suffix)
+
+    async def get_or_compute(self, key: str, compute: Compute, tags: Tags = ()) -> Any:
+        found, value = self.l1.get(key)
+        if found:
+            metrics.inc("cache_requests_total", cache=self.name, tier="l1", result="hit")
+            return value
+        metrics.inc("cache_requests_total", cache=self.name, tier="l1", result="miss")
+
+        invalidations = self._invalidations
+        value = self.decode(await self.l2.get_or_compute(key, compute, tags))
+        if invalidations == self._invalidations:
+            self.l1.put(key, value)
+        return value
+
+    async def invalidate(self, *keys: str) -> None:
+        if not keys:
+            return
+        self.discard_local(*keys)
+        await self.l2.invalidate(*keys)
+        try:
+            async with get_redis() as redis:
+                await redis.publish(INVALIDATION_CHANNEL, json.dumps({"keys": list(keys)}))
+        except Exception as e:
+            logger.warning(f"Failed to broadcast {self.name} cache invalidation: {e}")
+
+    def discard_local(self, *keys: str) -> None:
+        self._invalidations += 1
+        self.l2.discard_inflight(*keys)
+        for key in keys:
+            self.l1.discard(key)
+
+
+def discard_local(keys: Iterable[str]) -> None:
+    """Drop keys from this process's tiers; keys are namespaced per cache."""
+    keys = list(keys)
+    for cache in _registry.values():
+        cache.discard_local(*keys)
+
+
+def max_generation_ttl_ms() -> int:
+    return max((cache.l2.max_age_ms() for cache in _registry.values()), default=0) or 3_600_000
+
+
+def _apply_invalidation(data: Any) -> None:
+    try:
+        keys = json.loads(data)["keys"]
+    except (ValueError, TypeError, KeyError) as e:
+        logger.warning(f"Ignoring malformed cache invalidation {data!r}: {e}")
+        return
+    discard_local(keys)
+
+
+async def listen_for_cache_invalidations() -> None:
+    """Background task dropping L1 entries invalidated by any worker."""
+    while True:
+        try:
+            async with get_redis() as redis:
+                pubsub = redis.pubsub()
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                try:
+                    while True:
+                        message = await pubsub.get_message(
+                            ignore_subscribe_messages=True, timeout=1.0
+                        )
+                        if message is not None:
+                            _apply_invalidation(message["data"])
+                finally:
+                    await pubsub.unsubscribe(INVALIDATION_CHANNEL)
+                    await pubsub.aclose()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Cache invalidation listener failed, retrying: {e}")
+            await asyncio.sleep(1)
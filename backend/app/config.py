@@ -11,11 +11,30 @@ class Settings(BaseSettings):
     # Database configuration
     DATABASE_URL: str
     REDIS_URL: str
+    # Optional read replica for read-only resolvers
+    DATABASE_READ_URL: Optional[str] = None
+
+    # Connection pooling
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_RECYCLE: int = 1800  # seconds
+    DB_STATEMENT_CACHE_SIZE: int = 100  # set to 0 behind pgbouncer
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_POOL_TIMEOUT: float = 5.0
+    REDIS_SOCKET_TIMEOUT: float = 5.0
 
     # JWT configuration
     JWT_SECRET: str
     JWT_ALGORITHM: str
     EXPIRY_MIN: int
+    # Verified-token cache (entries also expire with the token itself)
+    AUTH_CACHE_TTL: int = 300  # seconds
+    AUTH_CACHE_MAX_ENTRIES: int = 10000
+    # bcrypt executor: worker threads and the most hashes admitted at once
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 32
 
     # External APIs
     news_api_key: Optional[str] = None
@@ -24,6 +43,63 @@ class Settings(BaseSettings):
     # File upload
     max_file_size: int = 10 * 1024 * 1024  # 10MB
     upload_dir: str = "uploads"
+    # Rows parsed and staged at a time; bounds upload memory regardless of file size
+    upload_chunk_rows: int = 5000
+    # Upload parsing runs in worker processes: how many at once, how many may
+    # wait for one, and per-job limits (parse time, address space; 0 = no cap)
+    UPLOAD_PARSE_WORKERS: int = 2
+    UPLOAD_PARSE_MAX_PENDING: int = 16
+    UPLOAD_PARSE_TIMEOUT: float = 120.0  # seconds
+    UPLOAD_PARSE_MEMORY_LIMIT_MB: int = 2048
+    # Background upload jobs (files kept in upload_dir until processed)
+    UPLOAD_JOB_WORKERS: int = 2  # per process; 0 = this process runs no jobs
+    UPLOAD_JOB_USER_CONCURRENCY: int = 1  # jobs of one user running at once
+    UPLOAD_JOB_MAX_ACTIVE_PER_USER: int = 5  # queued or running; more are refused
+    UPLOAD_JOB_TTL: int = 86400  # seconds job state is kept
+    UPLOAD_JOB_STALE_AFTER: int = 600  # seconds without progress before a job is re-queued
+    # Uploads with at least this many rows are ingested through COPY + merge
+    bulk_copy_min_rows: int = 1000
+
+    # GraphQL documents: parsed/validated AST LRU and automatic persisted queries
+    GRAPHQL_DOCUMENT_CACHE_SIZE: int = 256
+    APQ_CACHE_SIZE: int = 1000
+    APQ_TTL: int = 7 * 24 * 3600  # seconds
+    APQ_GET_CACHE_MAX_AGE: int = 30  # seconds, anonymous GET responses only
+
+    # GraphQL admission control (see graphql_api/extensions.py for the cost model)
+    GRAPHQL_MAX_DEPTH: int = 8
+    GRAPHQL_MAX_QUERY_COST: int = 5000
+    GRAPHQL_HEAVY_QUERY_COST: int = 1000
+    GRAPHQL_COST_BUDGET_PER_MINUTE: int = 20000
+
+    # Response caches: fresh for the TTL, then served stale while one request
+    # refreshes; TTLs are spread by +/- jitter so entries do not expire together
+    DASHBOARD_CACHE_TTL: int = 300  # seconds
+    DASHBOARD_CACHE_STALE_TTL: int = 900  # seconds
+    CACHE_TTL_JITTER: float = 0.1
+    CACHE_LOCK_TIMEOUT: float = 30.0  # seconds
+    CACHE_XFETCH_BETA: float = 1.0  # 0 disables probabilistic early refresh
+    HOLDINGS_CACHE_TTL: int = 300  # seconds
+    WATCHLIST_CACHE_TTL: int = 300  # seconds
+    CACHE_STALE_TTL: int = 900  # seconds, for caches without their own setting
+    # Per-process L1 in front of Redis, kept coherent by pub/sub invalidation
+    CACHE_L1_MAX_ENTRIES: int = 2048
+    CACHE_L1_TTL: float = 30.0  # seconds; bounds staleness if an invalidation is missed
+
+    # Time-decayed per-ticker sentiment index
+    SENTIMENT_INDEX_HALF_LIFE_HOURS: float = 24.0
+    SENTIMENT_NEUTRAL_BAND: float = 0.15  # |index| below this reads as Neutral
+
+    # Price feed: ticks are coalesced per ISIN and applied in batches. Set a
+    # replay file (isin,price,ts CSV) to run the feed from recorded ticks
+    PRICE_FEED_REPLAY_FILE: Optional[str] = None
+    PRICE_FEED_REPLAY_SPEED: float = 1.0  # 0 = as fast as possible
+    PRICE_FEED_FLUSH_INTERVAL: float = 1.0  # seconds
+    PRICE_FEED_MAX_BATCH: int = 5000  # ISINs per revaluation statement
+    PRICE_FEED_TIMEZONE: str = "Asia/Kolkata"  # trading days roll over at midnight here
+
+    # Portfolio history: each run overwrites today's snapshot row per user
+    PORTFOLIO_SNAPSHOT_INTERVAL: int = 60  # minutes; 0 disables the job
 
     # Scheduler
     news_fetch_interval: int = 300  # 5 minutes
@@ -1,16 +1,77 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy import event, inspect
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, AsyncEngine
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 import redis.asyncio as aioredis
+import asyncio
+import time
+from pathlib import Path
 
 from .config import settings
+from .metrics import metrics
 from sqlalchemy.ext.asyncio import async_sessionmaker
 from contextlib import asynccontextmanager
 
 
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=settings.debug,
-    
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long callers wait for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.observe(
+                "db_pool_wait_seconds",
+                time.perf_counter() - start,
+                engine=self.logging_name or "primary",
+            )
+
+
+def _instrument_engine(db_engine: AsyncEngine, name: str) -> None:
+    @event.listens_for(db_engine.sync_engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.inc("db_pool_checkouts_total", engine=name)
+
+    @event.listens_for(db_engine.sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        metrics.inc("db_pool_connections_opened_total", engine=name)
+
+    metrics.gauge("db_pool_size", lambda: db_engine.sync_engine.pool.size(), engine=name)
+    metrics.gauge("db_pool_checked_out", lambda: db_engine.sync_engine.pool.checkedout(), engine=name)
+    metrics.gauge("db_pool_overflow", lambda: db_engine.sync_engine.pool.overflow(), engine=name)
+
+
+def _create_engine(url: str, name: str) -> AsyncEngine:
+    connect_args = {}
+    if url.startswith("postgresql+asyncpg"):
+        # SQLAlchemy's prepared statement cache and asyncpg's own statement cache
+        connect_args["prepared_statement_cache_size"] = settings.DB_STATEMENT_CACHE_SIZE
+        connect_args["statement_cache_size"] = settings.DB_STATEMENT_CACHE_SIZE
+
+    db_engine = create_async_engine(
+        url,
+        echo=settings.debug,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_logging_name=name,
+        connect_args=connect_args,
+    )
+    _instrument_engine(db_engine, name)
+    return db_engine
+
+
+engine = _create_engine(settings.DATABASE_URL, "primary")
+
+# Read-only resolvers use the replica when one is configured, the primary otherwise
+read_engine = (
+    _create_engine(settings.DATABASE_READ_URL, "replica")
+    if settings.DATABASE_READ_URL
+    else engine
 )
 
 
@@ -18,24 +79,38 @@ AsyncSessionLocal = async_sessionmaker(
     bind=engine, class_=AsyncSession, expire_on_commit=False
 )
 
+AsyncReadSessionLocal = async_sessionmaker(
+    bind=read_engine, class_=AsyncSession, expire_on_commit=False
+)
+
 Base = declarative_base()
 
-# Redis connection pool
+# Redis connection pool, shared by every caller in the process
 redis_pool = None
+redis_client = None
+
+
+def _get_redis_client() -> aioredis.Redis:
+    global redis_pool, redis_client
+    if redis_client is None:
+        # Blocks for up to REDIS_POOL_TIMEOUT instead of failing when the pool is exhausted
+        redis_pool = aioredis.BlockingConnectionPool.from_url(
+            settings.REDIS_URL,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            timeout=settings.REDIS_POOL_TIMEOUT,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        )
+        redis_client = aioredis.Redis(connection_pool=redis_pool)
+        metrics.gauge(
+            "redis_pool_max_connections", lambda: settings.REDIS_MAX_CONNECTIONS
+        )
+    return redis_client
 
 
 @asynccontextmanager
 async def get_redis():
-    global redis_pool
-    if redis_pool is None:
-        redis_pool = aioredis.ConnectionPool.from_url(
-            settings.REDIS_URL, max_connections=10
-        )
-    client = aioredis.Redis(connection_pool=redis_pool)
-    try:
-        yield client
-    finally:
-        await client.close()
+    # Connections go back to the pool after each command; the client stays open
+    yield _get_redis_client()
 
 
 async def get_db():
@@ -46,12 +121,45 @@ async def get_db():
         await session.close()
 
 
+async def get_read_db():
+    session = AsyncReadSessionLocal()
+    try:
+        yield session
+    finally:
+        await session.close()
+
+
+ALEMBIC_INI = Path(__file__).resolve().parent.parent / "alembic.ini"
+BASELINE_REVISION = "0001"
+
+
+def _run_migrations(stamp_baseline: bool) -> None:
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(str(ALEMBIC_INI))
+    config.attributes["configure_logger"] = False
+    if stamp_baseline:
+        command.stamp(config, BASELINE_REVISION)
+    command.upgrade(config, "head")
+
+
 async def init_db():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    """Bring the schema up to date with the Alembic migrations."""
+    async with engine.connect() as conn:
+        tables = await conn.run_sync(lambda sync_conn: set(inspect(sync_conn).get_table_names()))
+    # Databases created by the old create_all() have the baseline tables but no
+    # version table; mark them as baseline so only the later revisions run.
+    stamp_baseline = "users" in tables and "alembic_version" not in tables
+    await asyncio.to_thread(_run_migrations, stamp_baseline)
 
 
 async def close_db():
+    global redis_pool, redis_client
     await engine.dispose()
+    if read_engine is not engine:
+        await read_engine.dispose()
     if redis_pool:
         await redis_pool.disconnect()
+        redis_pool = None
+        redis_client = None
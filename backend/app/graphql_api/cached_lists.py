@@ -0,0 +1,79 @@
+from datetime import datetime
+from typing import Any, Dict, List
+
+from sqlalchemy import select
+
+from ..cache import SWRCache, TwoTierCache, user_holdings_tag, user_watchlist_tag
+from ..config import settings
+from ..database import AsyncSessionLocal
+from ..models.holding import Holding as HoldingModel
+from ..models.watchlist import Watchlist as WatchlistModel
+from .converters import holding_to_graphql, watchlist_to_graphql
+from .types import Holding, Watchlist
+
+
+def _list_cache(name: str, ttl: int, decode) -> TwoTierCache:
+    return TwoTierCache(
+        name,
+        SWRCache(
+            f"{name}:user",
+            ttl=ttl,
+            stale_ttl=settings.CACHE_STALE_TTL,
+            jitter=settings.CACHE_TTL_JITTER,
+            lock_timeout=settings.CACHE_LOCK_TIMEOUT,
+            beta=settings.CACHE_XFETCH_BETA,
+        ),
+        decode=decode,
+        l1_max_entries=settings.CACHE_L1_MAX_ENTRIES,
+        l1_ttl=settings.CACHE_L1_TTL,
+    )
+
+
+async def build_holdings_payload(user_id: int) -> List[Dict[str, Any]]:
+    # Fills read the primary: a replica lagging behind the write that triggered
+    # the invalidation would otherwise be cached for a full TTL
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(HoldingModel).where(HoldingModel.user_id == user_id))
+        return [holding_to_graphql(h).__dict__ for h in result.scalars().all()]
+
+
+def holdings_from_payload(payload: List[Dict[str, Any]]) -> List[Holding]:
+    return [Holding(**h) for h in payload]
+
+
+async def build_watchlist_payload(user_id: int) -> List[Dict[str, Any]]:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(WatchlistModel).where(WatchlistModel.user_id == user_id))
+        payload = []
+        for w in result.scalars().all():
+            item = dict(watchlist_to_graphql(w).__dict__)
+            item["created_at"] = item["created_at"].isoformat() if item["created_at"] else None
+            payload.append(item)
+        return payload
+
+
+def watchlist_from_payload(payload: List[Dict[str, Any]]) -> List[Watchlist]:
+    return [
+        Watchlist(**{**w, "created_at": datetime.fromisoformat(w["created_at"]) if w["created_at"] else None})
+        for w in payload
+    ]
+
+
+holdings_cache = _list_cache("holdings", settings.HOLDINGS_CACHE_TTL, holdings_from_payload)
+watchlist_cache = _list_cache("watchlist", settings.WATCHLIST_CACHE_TTL, watchlist_from_payload)
+
+
+async def get_holdings(user_id: int) -> List[Holding]:
+    return await holdings_cache.get_or_compute(
+        holdings_cache.key(user_id),
+        lambda: build_holdings_payload(user_id),
+        tags=[user_holdings_tag(user_id)],
+    )
+
+
+async def get_watchlist(user_id: int) -> List[Watchlist]:
+    return await watchlist_cache.get_or_compute(
+        watchlist_cache.key(user_id),
+        lambda: build_watchlist_payload(user_id),
+        tags=[user_watchlist_tag(user_id)],
+    )
@@ -0,0 +1,92 @@
+import asyncio
+from typing import Optional
+
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
+from strawberry.fastapi import BaseContext
+
+from ..auth.auth import get_current_user
+from ..auth.token_cache import UserSnapshot
+from ..cache import wait_for_invalidations
+from ..database import AsyncSessionLocal, AsyncReadSessionLocal
+from .loaders import Loaders
+
+
+class GraphQLContext(BaseContext):
+    """
+    Per-request GraphQL context.
+
+    Database sessions and the current user are only created when a resolver
+    first asks for them, so requests that need neither never touch the pool.
+    """
+
+    def __init__(self, credentials: Optional[HTTPAuthorizationCredentials] = None):
+        super().__init__()
+        self.credentials = credentials
+        self._db: Optional[AsyncSession] = None
+        self._read_db: Optional[AsyncSession] = None
+        self._current_user: Optional[UserSnapshot] = None
+        self._user_resolved = False
+        self._user_lock = asyncio.Lock()
+        self._loaders: Optional[Loaders] = None
+
+    @property
+    def db(self) -> AsyncSession:
+        if self._db is None:
+            self._db = AsyncSessionLocal()
+        return self._db
+
+    @property
+    def read_db(self) -> AsyncSession:
+        if self._read_db is None:
+            self._read_db = AsyncReadSessionLocal()
+        return self._read_db
+
+    @property
+    def loaders(self) -> Loaders:
+        if self._loaders is None:
+            self._loaders = Loaders()
+        return self._loaders
+
+    async def get_current_user(self) -> Optional[UserSnapshot]:
+        """Resolve the bearer token once per request; None when missing or invalid."""
+        if self._user_resolved:
+            return self._current_user
+
+        async with self._user_lock:
+            if not self._user_resolved:
+                credentials = self.credentials or self._connection_credentials()
+                if credentials:
+                    try:
+                        self._current_user = await get_current_user(
+                            credentials=credentials, db=self.db
+                        )
+                    except HTTPException:
+                        self._current_user = None
+                self._user_resolved = True
+
+        return self._current_user
+
+    def _connection_credentials(self) -> Optional[HTTPAuthorizationCredentials]:
+        """Bearer token from a websocket's connection_init payload, if any."""
+        params = self.connection_params
+        if not isinstance(params, dict):
+            return None
+        value = params.get("Authorization") or params.get("authorization")
+        if not isinstance(value, str):
+            return None
+        scheme, _, token = value.partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return None
+        return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+    async def close(self) -> None:
+        for session in (self._db, self._read_db):
+            if session is not None:
+                # Let the cache invalidations started by this request's
+                # commits finish with the request
+                await wait_for_invalidations(session)
+                await session.close()
+        self._db = None
+        self._read_db = None
@@ -3,7 +3,21 @@ from ..models.holding import Holding as HoldingModel
 from ..models.article import Article as ArticleModel
 from ..models.sentiment import Sentiment as SentimentModel
 from ..models.watchlist import Watchlist as WatchlistModel
-from .types import User, Holding, Article, Sentiment, Watchlist
+from ..services.portfolio_analytics import PortfolioAnalytics
+from ..workers.upload_jobs import UploadJobState
+from .types import (
+    User,
+    Holding,
+    Article,
+    Sentiment,
+    Watchlist,
+    AllocationSlice,
+    PercentileValue,
+    HoldingPerformance,
+    StcgExposure,
+    UploadJob,
+    UploadJobStage,
+)
 
 
 def user_to_graphql(user: UserModel) -> User:
@@ -20,7 +34,7 @@ def user_to_graphql(user: UserModel) -> User:
 
 
 def holding_to_graphql(holding: HoldingModel) -> Holding:
-    """Convert SQLAlchemy Holding model to GraphQL Holding type."""
+    """Convert a SQLAlchemy Holding model (or a row with its columns) to GraphQL Holding type."""
     return Holding(
         id=int(holding.id),  # type: ignore
         user_id=int(holding.user_id),  # type: ignore
@@ -36,9 +50,11 @@ def holding_to_graphql(holding: HoldingModel) -> Holding:
         
         # Handle optional fields with proper null checking
         client_id=str(holding.client_id) if holding.client_id is not None else None,  # type: ignore
+        ticker=str(holding.ticker) if holding.ticker is not None else None,  # type: ignore
         market_cap=float(holding.market_cap) if holding.market_cap is not None else None,  # type: ignore
         stcg_quantity=int(holding.stcg_quantity) if holding.stcg_quantity is not None else None,  # type: ignore
         stcg_value=float(holding.stcg_value) if holding.stcg_value is not None else None,  # type: ignore
+        sentiment_key=str(holding.sentiment_key) if holding.sentiment_key is not None else None,  # type: ignore
         
         # Commented fields for future use - uncomment when model is updated
         # free_quantity=int(holding.free_quantity) if holding.free_quantity is not None else None,  # type: ignore
@@ -93,4 +109,59 @@ def article_to_graphql(article: ArticleModel) -> Article:
         sector=str(article.sector) if article.sector is not None else None,  # type: ignore
         is_processed=bool(article.is_processed),  # type: ignore
         created_at=article.created_at,  # type: ignore
-    )
\ No newline at end of file
+    )
+
+
+def upload_job_to_graphql(job: UploadJobState) -> UploadJob:
+    return UploadJob(
+        id=job.id,
+        stage=UploadJobStage(job.stage),
+        fileName=job.filename,
+        rowsParsed=job.rows_parsed,
+        rowsUpserted=job.rows_upserted,
+        created=job.created,
+        updated=job.updated,
+        deleted=job.deleted,
+        skipped=job.skipped,
+        unchanged=job.unchanged,
+        duplicate=job.duplicate,
+        error=job.error,
+        createdAt=job.created_at,
+        updatedAt=job.updated_at,
+    )
+
+
+def analytics_to_dashboard_fields(analytics: PortfolioAnalytics) -> dict:
+    """Portfolio analytics as keyword arguments for DashboardData."""
+    def allocation(slices):
+        return [
+            AllocationSlice(label=a.label, marketValue=a.market_value, weight=a.weight)
+            for a in slices
+        ]
+
+    def performance(rows):
+        return [
+            HoldingPerformance(
+                id=h.id,
+                companyName=h.company_name,
+                isin=h.isin,
+                clientId=h.client_id,
+                gainLoss=h.gain_loss,
+                gainLossPercent=h.gain_loss_percent,
+            )
+            for h in rows
+        ]
+
+    return {
+        "sectorAllocation": allocation(analytics.sector_allocation),
+        "marketCapAllocation": allocation(analytics.market_cap_allocation),
+        "concentrationHhi": analytics.concentration_hhi,
+        "sectorHhi": analytics.sector_hhi,
+        "gainLossPercentiles": [
+            PercentileValue(percentile=p, value=v)
+            for p, v in sorted(analytics.gain_loss_percentiles.items())
+        ],
+        "topHoldings": performance(analytics.top_holdings),
+        "bottomHoldings": performance(analytics.bottom_holdings),
+        "stcgExposure": StcgExposure(value=analytics.stcg_value, weight=analytics.stcg_weight),
+    }
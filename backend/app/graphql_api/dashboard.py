@@ -0,0 +1,161 @@
+import asyncio
+from typing import Any, Dict, List, Sequence, Tuple
+
+from ..cache import SWRCache, TwoTierCache, ticker_sentiment_tag, user_holdings_tag
+from ..config import settings
+from ..database import AsyncSessionLocal
+from ..models.holding import Holding as HoldingModel
+from ..services.portfolio_analytics import (
+    PortfolioAnalytics,
+    PortfolioArrays,
+    compute_analytics,
+    load_portfolio_rows,
+)
+from ..services.portfolio_summary_service import PortfolioSummaryService
+from ..services.price_service import PriceService
+from ..services.sentiment_index import sentiment_index, sentiment_label
+from .converters import analytics_to_dashboard_fields, holding_to_graphql
+from .types import DashboardData, Holding, PortfolioSummary
+
+
+EMPTY_PORTFOLIO = {
+    "totalMarketValue": 0,
+    "totalInvestedValue": 0,
+    "totalGainLoss": 0,
+    "totalGainLossPercent": 0,
+    "todaysGainLoss": 0,
+    "todaysGainLossPercent": 0,
+    "totalDividends": 0,
+    "avgGainLossPercent": 0,
+}
+
+# What the holdings list needs beyond the analytics columns; both are read
+# in one query rather than as ORM objects and again as column arrays
+HOLDING_LIST_COLUMNS = (
+    HoldingModel.user_id,
+    HoldingModel.ticker,
+    HoldingModel.total_quantity,
+    HoldingModel.avg_trading_price,
+    HoldingModel.ltp,
+    HoldingModel.stcg_quantity,
+)
+
+
+def _split_rows(rows: Sequence[Any]) -> Tuple[PortfolioArrays, List[Dict[str, Any]]]:
+    """Column arrays for the analytics and the holdings list in GraphQL format."""
+    return PortfolioArrays.from_rows(rows), [holding_to_graphql(row).__dict__ for row in rows]
+
+
+async def build_dashboard_payload(user_id: int) -> Dict[str, Any]:
+    """
+    Compute a user's dashboard as a JSON-serializable dict.
+
+    Opens its own session: the cache may run this as a background refresh
+    after the request that triggered it has finished.
+    """
+    async with AsyncSessionLocal() as db:
+        # Totals, counts and top/worst come from the incrementally maintained summary
+        summary = await PortfolioSummaryService.get(db, user_id)
+
+        if not summary.holdings_count:
+            return {
+                "portfolio": EMPTY_PORTFOLIO,
+                "overallSentiment": "N/A",
+                "overallSentimentScore": None,
+                "topPerformingAsset": "N/A",
+                "worstPerformingAsset": "N/A",
+                "totalStocks": 0,
+                "sectorsCount": 0,
+                "holdings_graphql": [],
+                "analytics": PortfolioAnalytics().as_dict(),
+            }
+
+        rows = await load_portfolio_rows(db, user_id, *HOLDING_LIST_COLUMNS)
+        day_change = await PriceService.day_change(db, user_id)
+
+    # Allocation, concentration and performance stats over column arrays
+    # (off the event loop: institutional accounts run to tens of thousands of rows)
+    arrays, holdings_graphql = await asyncio.to_thread(_split_rows, rows)
+    analytics = await asyncio.to_thread(compute_analytics, arrays)
+
+    total_invested_value = summary.total_invested_value
+    total_gain_loss = summary.total_gain_loss
+    total_gain_loss_percent = (total_gain_loss / total_invested_value * 100) if total_invested_value > 0 else 0
+
+    # Change since the previous close, over holdings the price feed covers
+    todays_gain_loss, previous_close_value = day_change
+    todays_gain_loss_percent = (todays_gain_loss / previous_close_value * 100) if previous_close_value > 0 else 0
+
+    avg_gain_loss_percent = (
+        summary.gain_percent_sum / summary.gain_percent_count if summary.gain_percent_count else 0
+    )
+
+    # Market-value-weighted time-decayed sentiment of the held tickers
+    overall_sentiment_score = await sentiment_index.portfolio_sentiment(analytics.market_value_by_key)
+
+    return {
+        "portfolio": {
+            "totalMarketValue": summary.total_market_value,
+            "totalInvestedValue": total_invested_value,
+            "totalGainLoss": total_gain_loss,
+            "totalGainLossPercent": total_gain_loss_percent,
+            "todaysGainLoss": todays_gain_loss,
+            "todaysGainLossPercent": todays_gain_loss_percent,
+            "totalDividends": 0,  # Placeholder
+            "avgGainLossPercent": avg_gain_loss_percent,
+        },
+        "overallSentiment": sentiment_label(overall_sentiment_score),
+        "overallSentimentScore": overall_sentiment_score,
+        "topPerformingAsset": summary.top_company_name or "N/A",
+        "worstPerformingAsset": summary.worst_company_name or "N/A",
+        "totalStocks": summary.holdings_count,
+        "sectorsCount": summary.sectors_count,
+        # Holdings are stored in GraphQL format
+        "holdings_graphql": holdings_graphql,
+        "analytics": analytics.as_dict(),
+    }
+
+
+def dashboard_from_payload(payload: Dict[str, Any]) -> DashboardData:
+    return DashboardData(
+        portfolio=PortfolioSummary(**payload["portfolio"]),
+        overallSentiment=payload["overallSentiment"],
+        overallSentimentScore=payload.get("overallSentimentScore"),
+        topPerformingAsset=payload["topPerformingAsset"],
+        worstPerformingAsset=payload["worstPerformingAsset"],
+        totalStocks=payload["totalStocks"],
+        sectorsCount=payload["sectorsCount"],
+        holdings=[Holding(**h) for h in payload["holdings_graphql"]],
+        **analytics_to_dashboard_fields(PortfolioAnalytics.from_dict(payload.get("analytics", {}))),
+    )
+
+
+dashboard_cache = TwoTierCache(
+    "dashboard",
+    SWRCache(
+        "dashboard:user",
+        ttl=settings.DASHBOARD_CACHE_TTL,
+        stale_ttl=settings.DASHBOARD_CACHE_STALE_TTL,
+        jitter=settings.CACHE_TTL_JITTER,
+        lock_timeout=settings.CACHE_LOCK_TIMEOUT,
+        beta=settings.CACHE_XFETCH_BETA,
+    ),
+    decode=dashboard_from_payload,
+    l1_max_entries=settings.CACHE_L1_MAX_ENTRIES,
+    l1_ttl=settings.CACHE_L1_TTL,
+)
+
+
+def dashboard_tags(user_id: int, payload: Dict[str, Any]) -> List[str]:
+    # Holdings drive every figure; new sentiment for a held ticker moves the
+    # overall sentiment
+    held = payload.get("analytics", {}).get("market_value_by_key", {})
+    return [user_holdings_tag(user_id), *(ticker_sentiment_tag(key) for key in held)]
+
+
+async def get_dashboard(user_id: int) -> DashboardData:
+    return await dashboard_cache.get_or_compute(
+        dashboard_cache.key(user_id),
+        lambda: build_dashboard_payload(user_id),
+        tags=lambda payload: dashboard_tags(user_id, payload),
+    )
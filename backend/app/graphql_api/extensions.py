@@ -0,0 +1,227 @@
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, Optional
+
+from graphql import (
+    ExecutionResult as GraphQLExecutionResult,
+    FieldNode,
+    FragmentDefinitionNode,
+    FragmentSpreadNode,
+    GraphQLError,
+    GraphQLObjectType,
+    InlineFragmentNode,
+    OperationDefinitionNode,
+    SelectionSetNode,
+    get_named_type,
+    get_nullable_type,
+    is_list_type,
+    value_from_ast_untyped,
+)
+from strawberry.extensions import SchemaExtension
+
+from ..config import settings
+from ..database import get_redis
+from ..metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Cost of resolving a field once, before its children. Composite fields that are
+# not listed cost 1 and scalar leaves are free.
+FIELD_WEIGHTS: Dict[str, int] = {
+    "dashboard": 20,
+    "holdings": 5,
+    "watchlist": 2,
+    "sentiment_analysis": 2,
+    "recent_articles": 2,
+    "articles": 2,
+    "sentiments": 2,
+    "holdings_connection": 2,
+    "sentimentTrend": 2,
+    "portfolioSentiment": 10,
+    "portfolioHistory": 5,
+    "latestSentiment": 1,
+    "sentimentSummary": 2,
+    "recentArticles": 1,
+    "login": 25,
+    "register": 25,
+    "change_password": 25,
+    "upload_holdings": 100,
+    "enqueue_holdings_upload": 25,
+    "uploadJob": 1,
+    "uploadJobProgress": 1,
+}
+
+# Arguments that bound the size of a returned list, with the estimated number
+# of rows per unit (a day of sentiment is several rows per ticker)
+LIST_SIZE_ARGUMENTS: Dict[str, float] = {
+    "limit": 1.0,
+    "first": 1.0,
+    "last": 1.0,
+    "days": 5.0,
+}
+
+# Assumed size of lists that take no size argument (holdings, watchlist, ...)
+DEFAULT_LIST_SIZE = 50
+
+
+class QueryCostCalculator:
+    """Static cost of an operation: weight + list size x per-item child cost."""
+
+    def __init__(self, schema, fragments: Dict[str, FragmentDefinitionNode], variables: Dict[str, Any]):
+        self.schema = schema
+        self.fragments = fragments
+        self.variables = variables
+
+    def operation_cost(self, operation: OperationDefinitionNode) -> float:
+        root_type = self.schema.get_root_type(operation.operation)
+        if root_type is None:
+            return 0.0
+        return self._selection_cost(operation.selection_set, root_type)
+
+    def _selection_cost(self, selection_set: Optional[SelectionSetNode], parent_type) -> float:
+        if selection_set is None or not isinstance(parent_type, GraphQLObjectType):
+            return 0.0
+
+        total = 0.0
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                total += self._field_cost(selection, parent_type)
+            elif isinstance(selection, InlineFragmentNode):
+                fragment_type = (
+                    self.schema.get_type(selection.type_condition.name.value)
+                    if selection.type_condition
+                    else parent_type
+                )
+                total += self._selection_cost(selection.selection_set, fragment_type)
+            elif isinstance(selection, FragmentSpreadNode):
+                fragment = self.fragments.get(selection.name.value)
+                if fragment is not None:
+                    fragment_type = self.schema.get_type(fragment.type_condition.name.value)
+                    total += self._selection_cost(fragment.selection_set, fragment_type)
+        return total
+
+    def _field_cost(self, node: FieldNode, parent_type: GraphQLObjectType) -> float:
+        name = node.name.value
+        field_def = parent_type.fields.get(name)
+        if field_def is None or name.startswith("__"):
+            return 0.0
+
+        if node.selection_set is None:
+            return float(FIELD_WEIGHTS.get(name, 0))
+
+        named_type = get_named_type(field_def.type)
+        child_cost = max(1.0, self._selection_cost(node.selection_set, named_type))
+        size = 1.0
+        if self._is_connection(named_type):
+            # A page of a connection: `first` bounds the edges below it
+            size = self._list_size(node, field_def)
+        elif is_list_type(get_nullable_type(field_def.type)) and not self._is_connection(parent_type):
+            size = self._list_size(node, field_def)
+        return FIELD_WEIGHTS.get(name, 1) + size * child_cost
+
+    @staticmethod
+    def _is_connection(object_type) -> bool:
+        fields = getattr(object_type, "fields", None) or {}
+        return "edges" in fields and "pageInfo" in fields
+
+    def _list_size(self, node: FieldNode, field_def) -> float:
+        provided = {
+            argument.name.value: value_from_ast_untyped(argument.value, self.variables)
+            for argument in node.arguments or ()
+        }
+        for argument, rows_per_unit in LIST_SIZE_ARGUMENTS.items():
+            if argument not in field_def.args:
+                continue
+            value = provided.get(argument, field_def.args[argument].default_value)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                return max(1.0, float(value) * rows_per_unit)
+        return float(DEFAULT_LIST_SIZE)
+
+
+def _reject(message: str, code: str) -> GraphQLExecutionResult:
+    return GraphQLExecutionResult(
+        data=None, errors=[GraphQLError(message, extensions={"code": code})]
+    )
+
+
+class QueryCostLimiter(SchemaExtension):
+    """
+    Rejects operations whose static cost exceeds GRAPHQL_MAX_QUERY_COST before
+    any resolver runs, and throttles heavy operations per user (or client IP)
+    with a per-minute cost budget kept in Redis.
+    """
+
+    def _operation(self) -> Optional[OperationDefinitionNode]:
+        document = self.execution_context.graphql_document
+        if document is None:
+            return None
+        operations = [d for d in document.definitions if isinstance(d, OperationDefinitionNode)]
+        operation_name = self.execution_context.operation_name
+        for operation in operations:
+            if operation_name is None or (operation.name and operation.name.value == operation_name):
+                return operation
+        return None
+
+    async def on_execute(self) -> AsyncIterator[None]:
+        operation = self._operation()
+        if operation is not None:
+            document = self.execution_context.graphql_document
+            fragments = {
+                d.name.value: d for d in document.definitions
+                if isinstance(d, FragmentDefinitionNode)
+            }
+            calculator = QueryCostCalculator(
+                self.execution_context.schema._schema,
+                fragments,
+                self.execution_context.variables or {},
+            )
+            try:
+                cost = calculator.operation_cost(operation)
+            except Exception as e:
+                logger.warning(f"Could not compute query cost, admitting operation: {e}")
+                cost = 0.0
+            metrics.observe("graphql_operation_cost", cost)
+
+            if cost > settings.GRAPHQL_MAX_QUERY_COST:
+                metrics.inc("graphql_operations_rejected_total", reason="cost")
+                self.execution_context.result = _reject(
+                    f"Query cost {cost:.0f} exceeds the maximum of {settings.GRAPHQL_MAX_QUERY_COST}. "
+                    "Request fewer items or a shorter time range.",
+                    "QUERY_TOO_EXPENSIVE",
+                )
+            elif cost >= settings.GRAPHQL_HEAVY_QUERY_COST and not await self._admit_heavy(cost):
+                metrics.inc("graphql_operations_rejected_total", reason="throttled")
+                self.execution_context.result = _reject(
+                    "Too many expensive requests. Please try again in a minute.",
+                    "RATE_LIMITED",
+                )
+        yield
+
+    async def _admit_heavy(self, cost: float) -> bool:
+        context = self.execution_context.context
+        identity = None
+        try:
+            user = await context.get_current_user()
+            if user is not None:
+                identity = f"user:{user.id}"
+        except Exception:
+            pass
+        if identity is None:
+            request = getattr(context, "request", None)
+            client = getattr(request, "client", None)
+            identity = f"ip:{client.host if client else 'unknown'}"
+
+        window = int(time.time() // 60)
+        key = f"graphql:cost:{identity}:{window}"
+        try:
+            async with get_redis() as redis:
+                async with redis.pipeline(transaction=True) as pipe:
+                    pipe.incrbyfloat(key, cost)
+                    pipe.expire(key, 120)
+                    spent, _ = await pipe.execute()
+        except Exception as e:
+            # Fail open: throttling must not take the API down with Redis
+            logger.warning(f"Cost budget check failed for {identity}: {e}")
+            return True
+
+        return float(spent) <= settings.GRAPHQL_COST_BUDGET_PER_MINUTE
@@ -0,0 +1,139 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, case, func, select
+from strawberry.dataloader import DataLoader
+
+from ..database import AsyncReadSessionLocal
+from ..models.article import Article as ArticleModel
+from ..models.sentiment import Sentiment as SentimentModel
+from .converters import article_to_graphql, sentiment_to_graphql
+from .types import Article, Sentiment, SentimentSummary
+
+
+class Loaders:
+    """
+    Per-request DataLoaders for nested fields.
+
+    Every row in a response asks its loader for one key and the loader issues
+    a single query for all of them. Each batch runs on its own short-lived
+    read session because batches of different loaders can run concurrently.
+    """
+
+    def __init__(self):
+        self.latest_sentiment: DataLoader[str, Optional[Sentiment]] = DataLoader(
+            load_fn=self._load_latest_sentiments
+        )
+        self._sentiment_summaries: Dict[int, DataLoader[str, SentimentSummary]] = {}
+        self._recent_articles: Dict[int, DataLoader[str, List[Article]]] = {}
+
+    def sentiment_summary(self, days: int) -> DataLoader[str, SentimentSummary]:
+        if days not in self._sentiment_summaries:
+            self._sentiment_summaries[days] = DataLoader(
+                load_fn=lambda tickers: self._load_sentiment_summaries(tickers, days)
+            )
+        return self._sentiment_summaries[days]
+
+    def recent_articles(self, limit: int) -> DataLoader[str, List[Article]]:
+        if limit not in self._recent_articles:
+            self._recent_articles[limit] = DataLoader(
+                load_fn=lambda tickers: self._load_recent_articles(tickers, limit)
+            )
+        return self._recent_articles[limit]
+
+    @staticmethod
+    async def _load_latest_sentiments(tickers: List[str]) -> List[Optional[Sentiment]]:
+        query = (
+            select(SentimentModel)
+            .where(SentimentModel.ticker.in_(tickers))
+            .distinct(SentimentModel.ticker)
+            .order_by(
+                SentimentModel.ticker,
+                SentimentModel.created_at.desc(),
+                SentimentModel.id.desc(),
+            )
+        )
+        async with AsyncReadSessionLocal() as session:
+            result = await session.execute(query)
+            latest = {s.ticker: sentiment_to_graphql(s) for s in result.scalars().all()}
+
+        return [latest.get(ticker) for ticker in tickers]
+
+    @staticmethod
+    async def _load_sentiment_summaries(tickers: List[str], days: int) -> List[SentimentSummary]:
+        since_date = datetime.utcnow() - timedelta(days=days)
+        label = func.upper(SentimentModel.sentiment_label)
+        query = (
+            select(
+                SentimentModel.ticker,
+                func.count(SentimentModel.id),
+                func.avg(SentimentModel.sentiment_score),
+                func.avg(SentimentModel.confidence),
+                func.sum(case((label == "POSITIVE", 1), else_=0)),
+                func.sum(case((label == "NEGATIVE", 1), else_=0)),
+                func.max(SentimentModel.created_at),
+            )
+            .where(
+                and_(
+                    SentimentModel.ticker.in_(tickers),
+                    SentimentModel.created_at >= since_date,
+                )
+            )
+            .group_by(SentimentModel.ticker)
+        )
+        async with AsyncReadSessionLocal() as session:
+            result = await session.execute(query)
+            rows = {row[0]: row for row in result.all()}
+
+        summaries = []
+        for ticker in tickers:
+            row = rows.get(ticker)
+            if row is None:
+                summaries.append(SentimentSummary(ticker=ticker, days=days))
+                continue
+            _, count, avg_score, avg_confidence, positive, negative, latest_at = row
+            summaries.append(
+                SentimentSummary(
+                    ticker=ticker,
+                    days=days,
+                    articleCount=int(count),
+                    averageScore=float(avg_score) if avg_score is not None else None,
+                    averageConfidence=float(avg_confidence) if avg_confidence is not None else None,
+                    positiveCount=int(positive or 0),
+                    negativeCount=int(negative or 0),
+                    neutralCount=int(count) - int(positive or 0) - int(negative or 0),
+                    latestAt=latest_at,
+                )
+            )
+        return summaries
+
+    @staticmethod
+    async def _load_recent_articles(tickers: List[str], limit: int) -> List[List[Article]]:
+        # Top-N per ticker in one pass with a window function
+        position = (
+            func.row_number()
+            .over(
+                partition_by=ArticleModel.ticker,
+                order_by=(ArticleModel.published_at.desc(), ArticleModel.id.desc()),
+            )
+            .label("position")
+        )
+        ranked = (
+            select(ArticleModel.id, position)
+            .where(ArticleModel.ticker.in_(tickers))
+            .subquery()
+        )
+        query = (
+            select(ArticleModel)
+            .join(ranked, ranked.c.id == ArticleModel.id)
+            .where(ranked.c.position <= limit)
+            .order_by(ArticleModel.ticker, ranked.c.position)
+        )
+        async with AsyncReadSessionLocal() as session:
+            result = await session.execute(query)
+            articles = result.scalars().all()
+
+        grouped: Dict[str, List[Article]] = {ticker: [] for ticker in tickers}
+        for article in articles:
+            grouped[article.ticker].append(article_to_graphql(article))
+        return [grouped[ticker] for ticker in tickers]
@@ -0,0 +1,79 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Sequence, Tuple, TypeVar
+
+from sqlalchemy import Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .types import Connection, Edge, PageInfo
+
+T = TypeVar("T")
+
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(*values: Any) -> str:
+    """Opaque cursor for a row's sort key, e.g. (published_at, id)."""
+    parts = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(parts).encode()).decode()
+
+
+def decode_cursor(cursor: str, *types: type) -> Tuple[Any, ...]:
+    """Decode a cursor produced by encode_cursor back into a typed sort key."""
+    try:
+        parts = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(parts, list) or len(parts) != len(types):
+            raise ValueError
+        return tuple(
+            datetime.fromisoformat(part) if kind is datetime else kind(part)
+            for part, kind in zip(parts, types)
+        )
+    except (ValueError, TypeError):
+        raise Exception("Invalid cursor")
+
+
+def clamp_page_size(first: int) -> int:
+    if first < 1:
+        raise Exception("first must be a positive number")
+    return min(first, MAX_PAGE_SIZE)
+
+
+async def keyset_page(
+    db: AsyncSession,
+    query: Select,
+    key_columns: Sequence[Any],
+    first: int,
+    after: Optional[Tuple[Any, ...]] = None,
+) -> Tuple[List[Any], bool]:
+    """
+    Fetch one page of `query` ordered newest-first by `key_columns`.
+
+    The position is a row-value comparison on the sort key rather than an
+    OFFSET, so with an index on the key columns every page is a single index
+    range scan no matter how deep it is. One extra row is read to tell
+    whether another page follows.
+    """
+    if after is not None:
+        query = query.where(tuple_(*key_columns) < tuple_(*after))
+    query = query.order_by(*(column.desc() for column in key_columns)).limit(first + 1)
+
+    result = await db.execute(query)
+    rows = result.scalars().all()
+    return rows[:first], len(rows) > first
+
+
+def build_connection(
+    rows: Sequence[Any],
+    has_next_page: bool,
+    cursor_of: Callable[[Any], str],
+    convert: Callable[[Any], T],
+) -> Connection[T]:
+    edges = [Edge(cursor=cursor_of(row), node=convert(row)) for row in rows]
+    return Connection(
+        edges=edges,
+        pageInfo=PageInfo(
+            hasNextPage=has_next_page,
+            endCursor=edges[-1].cursor if edges else None,
+        ),
+    )
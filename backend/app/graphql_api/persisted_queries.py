@@ -0,0 +1,239 @@
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+from ..config import settings
+from ..database import get_redis
+from ..metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY_PREFIX = "apq:"
+
+
+class PersistedQueryStore:
+    """
+    sha256 -> query text, with a bounded in-process LRU in front of Redis so
+    every worker can serve a hash registered by any other worker.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._local: "OrderedDict[str, str]" = OrderedDict()
+
+    def _remember(self, sha256: str, query: str) -> None:
+        with self._lock:
+            self._local[sha256] = query
+            self._local.move_to_end(sha256)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+    async def get(self, sha256: str) -> Optional[str]:
+        with self._lock:
+            query = self._local.get(sha256)
+            if query is not None:
+                self._local.move_to_end(sha256)
+        if query is not None:
+            metrics.inc("apq_lookups_total", result="local_hit")
+            return query
+
+        try:
+            async with get_redis() as redis:
+                stored = await redis.get(REDIS_KEY_PREFIX + sha256)
+        except Exception as e:
+            logger.warning(f"Persisted query lookup failed for {sha256}: {e}")
+            stored = None
+
+        if stored is None:
+            metrics.inc("apq_lookups_total", result="miss")
+            return None
+
+        query = stored.decode() if isinstance(stored, bytes) else stored
+        self._remember(sha256, query)
+        metrics.inc("apq_lookups_total", result="redis_hit")
+        return query
+
+    async def put(self, sha256: str, query: str) -> None:
+        self._remember(sha256, query)
+        try:
+            async with get_redis() as redis:
+                await redis.set(REDIS_KEY_PREFIX + sha256, query, ex=self.ttl_seconds)
+        except Exception as e:
+            logger.warning(f"Failed to persist query {sha256}: {e}")
+
+
+persisted_queries = PersistedQueryStore(settings.APQ_CACHE_SIZE, settings.APQ_TTL)
+
+
+def _error_body(message: str, code: str) -> bytes:
+    return json.dumps(
+        {"errors": [{"message": message, "extensions": {"code": code}}]}
+    ).encode()
+
+
+async def resolve_persisted_query(payload: Dict[str, Any]) -> Tuple[Optional[bytes], bool]:
+    """
+    Apply the Automatic Persisted Query protocol to a request payload in place.
+
+    Returns an error body to send instead of executing (or None to continue)
+    and whether the payload was changed, i.e. a stored query filled in.
+    """
+    extensions = payload.get("extensions")
+    if isinstance(extensions, str):
+        try:
+            extensions = json.loads(extensions)
+        except ValueError:
+            return None, False
+    if not isinstance(extensions, dict):
+        return None, False
+
+    persisted = extensions.get("persistedQuery")
+    if not isinstance(persisted, dict) or persisted.get("version") != 1:
+        return None, False
+
+    sha256 = persisted.get("sha256Hash")
+    if not isinstance(sha256, str):
+        return _error_body("Invalid persisted query hash", "PERSISTED_QUERY_INVALID"), False
+
+    query = payload.get("query")
+    if query:
+        if hashlib.sha256(query.encode()).hexdigest() != sha256:
+            return _error_body("provided sha does not match query", "PERSISTED_QUERY_HASH_MISMATCH"), False
+        await persisted_queries.put(sha256, query)
+        return None, False
+
+    query = await persisted_queries.get(sha256)
+    if query is None:
+        return _error_body("PersistedQueryNotFound", "PERSISTED_QUERY_NOT_FOUND"), False
+
+    payload["query"] = query
+    return None, True
+
+
+class PersistedQueryMiddleware:
+    """
+    ASGI middleware that expands persisted-query hashes before the request
+    reaches Strawberry, for both POST bodies and GET query strings.
+
+    GET responses for persisted queries carry Cache-Control headers so
+    anonymous ones can be served by HTTP caches.
+    """
+
+    def __init__(self, app, path: str = "/graphql"):
+        self.app = app
+        self.path = path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].rstrip("/") != self.path:
+            await self.app(scope, receive, send)
+            return
+
+        if scope["method"] == "GET":
+            await self._handle_get(scope, receive, send)
+        elif scope["method"] == "POST" and self._is_json(scope):
+            await self._handle_post(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
+
+    @staticmethod
+    def _header(scope, name: bytes) -> Optional[bytes]:
+        for key, value in scope["headers"]:
+            if key.lower() == name:
+                return value
+        return None
+
+    def _is_json(self, scope) -> bool:
+        content_type = self._header(scope, b"content-type") or b""
+        return content_type.split(b";")[0].strip().lower() == b"application/json"
+
+    async def _handle_get(self, scope, receive, send):
+        params = dict(parse_qsl(scope["query_string"].decode(), keep_blank_values=True))
+        if "extensions" not in params:
+            await self.app(scope, receive, send)
+            return
+
+        error, changed = await resolve_persisted_query(params)
+        if error is not None:
+            await self._send_json(send, error)
+            return
+
+        if changed:
+            scope = dict(scope, query_string=urlencode(params).encode())
+        cache_control = (
+            b"private, no-cache"
+            if self._header(scope, b"authorization")
+            else f"public, max-age={settings.APQ_GET_CACHE_MAX_AGE}".encode()
+        )
+
+        async def send_with_cache_headers(message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                headers = [
+                    (k, v) for k, v in message.get("headers", [])
+                    if k.lower() != b"cache-control"
+                ]
+                headers.append((b"cache-control", cache_control))
+                headers.append((b"vary", b"Authorization"))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        await self.app(scope, receive, send_with_cache_headers)
+
+    async def _handle_post(self, scope, receive, send):
+        chunks: List[bytes] = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] != "http.request":
+                # Client went away before the body arrived
+                return
+            chunks.append(message.get("body", b""))
+            more_body = message.get("more_body", False)
+        body = b"".join(chunks)
+
+        try:
+            payload = json.loads(body) if body else None
+        except ValueError:
+            payload = None
+
+        changed = False
+        if isinstance(payload, dict):
+            error, changed = await resolve_persisted_query(payload)
+            if error is not None:
+                await self._send_json(send, error)
+                return
+
+        # Only a filled-in query needs a new body; anything else is passed
+        # through byte for byte
+        if changed:
+            body = json.dumps(payload).encode()
+            headers = [
+                (k, v) for k, v in scope["headers"] if k.lower() != b"content-length"
+            ]
+            headers.append((b"content-length", str(len(body)).encode()))
+            scope = dict(scope, headers=headers)
+
+        replayed = False
+
+        async def replay_receive():
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        await self.app(scope, replay_receive, send)
+
+    @staticmethod
+    async def _send_json(send, body: bytes) -> None:
+        headers: List[Tuple[bytes, bytes]] = [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
@@ -1,11 +1,13 @@
 import strawberry
 from strawberry.types import Info
 from strawberry.file_uploads import Upload
-from typing import List, Optional
-from datetime import datetime, timedelta
+from contextlib import aclosing
+from typing import Annotated, AsyncGenerator, List, Optional
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
 from sqlalchemy import select, and_
+from sqlalchemy.exc import IntegrityError
 import logging
-import json
 import hashlib
 
 
@@ -24,13 +26,23 @@ from ..models.holding import Holding as HoldingModel
 from ..models.article import Article as ArticleModel
 from ..models.sentiment import Sentiment as SentimentModel
 from ..models.watchlist import Watchlist as WatchlistModel
-from ..services.excel_service import ExcelService
+from ..services.excel_service import ExcelService, UploadTooLarge
 from ..services.holding_service import HoldingService
+from ..services.portfolio_summary_service import PortfolioSummaryService
+from ..services.portfolio_history import PortfolioHistoryService
+from ..services.portfolio_sentiment import PortfolioSentimentService
+from ..services.sentiment_rollup import SentimentRollupService
+from ..services.sentiment_index import sentiment_label
 
 # Fixed auth imports
-from ..auth.auth import authenticate_user, create_access_token, get_password_hash
+from ..auth.auth import (
+    authenticate_user,
+    create_access_token,
+    get_password_hash_async,
+    verify_password_async,
+)
+from ..auth.token_cache import publish_user_invalidation
 from ..config import settings
-from ..database import get_redis
 from .types import (
     User,
     Holding,
@@ -45,8 +57,22 @@ from .types import (
     HoldingInput,
     WatchlistInput,
     DashboardData,
-    PortfolioSummary,
     UploadHoldingsResponse,
+    Connection,
+    SentimentTrendPoint,
+    TrendBucket,
+    AllocationSlice,
+    PortfolioHistoryPoint,
+    HoldingSentiment,
+    PortfolioSentiment,
+    UploadJob,
+)
+from .pagination import (
+    build_connection,
+    clamp_page_size,
+    decode_cursor,
+    encode_cursor,
+    keyset_page,
 )
 from .converters import (
     user_to_graphql,
@@ -54,145 +80,28 @@ from .converters import (
     watchlist_to_graphql,
     sentiment_to_graphql,
     article_to_graphql,
+    upload_job_to_graphql,
 )
+from ..workers.parse_pool import ParseError, ParserBusy, ParseTimeout, parse_pool
+from ..workers.upload_jobs import UploadJobsBusy, enqueue_upload, get_job, watch_job
+from .cached_lists import get_holdings, get_watchlist
+from .dashboard import get_dashboard
 
 @strawberry.type
 class Query:
     @strawberry.field
     async def dashboard(self, info: Info) -> DashboardData:
-        current_user = info.context.get("current_user")
+        current_user = await info.context.get_current_user()
         if not current_user:
             raise Exception("Authentication required")
-        db = info.context["db"]
-        
-        # Try to get data from cache first
-        cache_key = f"dashboard:user:{current_user.id}"
-        async with get_redis() as redis:
-            cached_data = await redis.get(cache_key)
-            if cached_data:
-                logger.info(f"Dashboard cache hit for user {current_user.id}")
-                try:
-                    data_dict = json.loads(cached_data)
-                    # Reconstruct the response from cached data
-                    portfolio = PortfolioSummary(**data_dict["portfolio"])
-                    # Holdings are already in GraphQL format from cache
-                    holdings = [Holding(**h) for h in data_dict["holdings_graphql"]]
-                    return DashboardData(
-                        portfolio=portfolio,
-                        overallSentiment=data_dict["overallSentiment"],
-                        topPerformingAsset=data_dict["topPerformingAsset"],
-                        worstPerformingAsset=data_dict["worstPerformingAsset"],
-                        totalStocks=data_dict["totalStocks"],
-                        sectorsCount=data_dict["sectorsCount"],
-                        holdings=holdings
-                    )
-                except (json.JSONDecodeError, KeyError) as e:
-                    logger.warning(f"Cache data corrupted for user {current_user.id}: {e}")
-                    await redis.delete(cache_key)
-
-        result = await db.execute(
-            select(HoldingModel).where(HoldingModel.user_id == current_user.id)
-        )
-        holdings = result.scalars().all()
-
-        if not holdings:
-            empty_portfolio = PortfolioSummary(
-                totalMarketValue=0,
-                totalInvestedValue=0,
-                totalGainLoss=0,
-                totalGainLossPercent=0,
-                todaysGainLoss=0,
-                todaysGainLossPercent=0,
-                totalDividends=0,
-                avgGainLossPercent=0
-            )
-            return DashboardData(
-                portfolio=empty_portfolio,
-                overallSentiment="N/A",
-                topPerformingAsset="N/A",
-                worstPerformingAsset="N/A",
-                totalStocks=0,
-                sectorsCount=0,
-                holdings=[]
-            )
-
-        # Calculate portfolio metrics
-        total_market_value = sum(h.market_value for h in holdings)
-        total_invested_value = sum(h.invested_value for h in holdings)
-        total_gain_loss = sum(h.overall_gain_loss for h in holdings)
-        total_gain_loss_percent = (total_gain_loss / total_invested_value * 100) if total_invested_value > 0 else 0
-        
-        # Get unique sectors
-        sectors = set(h.sector for h in holdings if h.sector)
-        
-        # Calculate today's gains (placeholder - would need real-time data)
-        todays_gain_loss = total_gain_loss * 0.1  # Placeholder
-        todays_gain_loss_percent = (todays_gain_loss / total_invested_value * 100) if total_invested_value > 0 else 0
-        
-        # Calculate average gain/loss percentage across all holdings
-        individual_gain_percentages = []
-        for h in holdings:
-            if h.invested_value > 0:
-                individual_gain_percentages.append((h.overall_gain_loss / h.invested_value) * 100)
-        
-        avg_gain_loss_percent = sum(individual_gain_percentages) / len(individual_gain_percentages) if individual_gain_percentages else 0
-        
-        top_asset = max(holdings, key=lambda h: h.overall_gain_loss, default=None)
-        worst_asset = min(holdings, key=lambda h: h.overall_gain_loss, default=None)
-
-        portfolio = PortfolioSummary(
-            totalMarketValue=total_market_value,
-            totalInvestedValue=total_invested_value,
-            totalGainLoss=total_gain_loss,
-            totalGainLossPercent=total_gain_loss_percent,
-            todaysGainLoss=todays_gain_loss,
-            todaysGainLossPercent=todays_gain_loss_percent,
-            totalDividends=0,  # Placeholder
-            avgGainLossPercent=avg_gain_loss_percent
-        )
-
-        dashboard_data = DashboardData(
-            portfolio=portfolio,
-            overallSentiment="Neutral", # Placeholder
-            topPerformingAsset=top_asset.company_name if top_asset else "N/A",
-            worstPerformingAsset=worst_asset.company_name if worst_asset else "N/A",
-            totalStocks=len(holdings),
-            sectorsCount=len(sectors),
-            holdings=[holding_to_graphql(h) for h in holdings],
-        )
-        
-        # Cache the result for 5 minutes
-        try:
-            cache_data = {
-                "portfolio": {
-                    "totalMarketValue": total_market_value,
-                    "totalInvestedValue": total_invested_value,
-                    "totalGainLoss": total_gain_loss,
-                    "totalGainLossPercent": total_gain_loss_percent,
-                    "todaysGainLoss": todays_gain_loss,
-                    "todaysGainLossPercent": todays_gain_loss_percent,
-                    "totalDividends": 0,
-                    "avgGainLossPercent": avg_gain_loss_percent
-                },
-                "overallSentiment": "Neutral",
-                "topPerformingAsset": top_asset.company_name if top_asset else "N/A",
-                "worstPerformingAsset": worst_asset.company_name if worst_asset else "N/A",
-                "totalStocks": len(holdings),
-                "sectorsCount": len(sectors),
-                "holdings_graphql": [holding_to_graphql(h).__dict__ for h in holdings]  # Store GraphQL formatted data
-            }
-            async with get_redis() as redis:
-                await redis.setex(cache_key, 300, json.dumps(cache_data, default=str))  # 5 minutes
-                logger.info(f"Dashboard data cached for user {current_user.id}")
-        except Exception as e:
-            logger.warning(f"Failed to cache dashboard data for user {current_user.id}: {e}")
-        
-        return dashboard_data
+        # Served from the stale-while-revalidate cache; at most one
+        # computation per user runs however many requests arrive at once
+        return await get_dashboard(current_user.id)
         
 
     @strawberry.field
     async def me(self, info: Info) -> User:
-        current_user = info.context.get("current_user")
+        current_user = await info.context.get_current_user()
         if not current_user:
             raise Exception("Authentication required")
 
@@ -200,36 +109,24 @@ class Query:
 
     @strawberry.field
     async def holdings(self, info: Info) -> List[Holding]:
-        current_user = info.context.get("current_user")
+        current_user = await info.context.get_current_user()
         if not current_user:
             raise Exception("Authentication required")
-        db = info.context["db"]
-        result = await db.execute(
-            select(HoldingModel).where(HoldingModel.user_id == current_user.id)
-        )
-        holdings_list = result.scalars().all()
-        return [holding_to_graphql(h) for h in holdings_list]
+        return await get_holdings(current_user.id)
 
 
     @strawberry.field
     async def watchlist(self, info: Info) -> List[Watchlist]:
-        current_user = info.context.get("current_user")
+        current_user = await info.context.get_current_user()
         if not current_user:
             raise Exception("Authentication required")
-        db = info.context["db"]
-
-        result = await db.execute(
-            select(WatchlistModel).where(WatchlistModel.user_id == current_user.id)
-        )
-        watchlists = result.scalars().all()
-
-        return [watchlist_to_graphql(w) for w in watchlists]
+        return await get_watchlist(current_user.id)
 
     @strawberry.field
     async def sentiment_analysis(
         self, info: Info, ticker: str, days: int = 7
     ) -> List[Sentiment]:
-        db = info.context["db"]
+        db = info.context.read_db
         since_date = datetime.utcnow() - timedelta(days=days)
 
         result = await db.execute(
@@ -250,7 +147,7 @@ class Query:
     async def recent_articles(
         self, info: Info, ticker: Optional[str] = None, limit: int = 10
     ) -> List[Article]:
-        db = info.context["db"]
+        db = info.context.read_db
 
         query = (
             select(ArticleModel).order_by(ArticleModel.published_at.desc()).limit(limit)
@@ -263,11 +160,208 @@ class Query:
 
         return [article_to_graphql(a) for a in articles]
 
+    @strawberry.field
+    async def articles(
+        self,
+        info: Info,
+        first: int = 20,
+        after: Optional[str] = None,
+        ticker: Optional[str] = None,
+    ) -> Connection[Article]:
+        db = info.context.read_db
+        first = clamp_page_size(first)
+
+        query = select(ArticleModel)
+        if ticker:
+            query = query.where(ArticleModel.ticker == ticker)
+
+        rows, has_next_page = await keyset_page(
+            db,
+            query,
+            (ArticleModel.published_at, ArticleModel.id),
+            first,
+            decode_cursor(after, datetime, int) if after else None,
+        )
+        return build_connection(
+            rows,
+            has_next_page,
+            lambda a: encode_cursor(a.published_at, a.id),
+            article_to_graphql,
+        )
+
+    @strawberry.field
+    async def sentiments(
+        self,
+        info: Info,
+        ticker: str,
+        first: int = 20,
+        after: Optional[str] = None,
+        days: Optional[int] = None,
+    ) -> Connection[Sentiment]:
+        db = info.context.read_db
+        first = clamp_page_size(first)
+
+        query = select(SentimentModel).where(SentimentModel.ticker == ticker)
+        if days is not None:
+            since_date = datetime.utcnow() - timedelta(days=days)
+            query = query.where(SentimentModel.created_at >= since_date)
+
+        rows, has_next_page = await keyset_page(
+            db,
+            query,
+            (SentimentModel.created_at, SentimentModel.id),
+            first,
+            decode_cursor(after, datetime, int) if after else None,
+        )
+        return build_connection(
+            rows,
+            has_next_page,
+            lambda s: encode_cursor(s.created_at, s.id),
+            sentiment_to_graphql,
+        )
+
+    @strawberry.field(name="sentimentTrend")
+    async def sentiment_trend(
+        self,
+        info: Info,
+        ticker: str,
+        from_: Annotated[date, strawberry.argument(name="from")],
+        to: Optional[date] = None,
+        bucket: TrendBucket = TrendBucket.DAY,
+    ) -> List[SentimentTrendPoint]:
+        """Sentiment per bucket from the daily rollup; `from`/`to` are inclusive UTC days."""
+        to = to or datetime.utcnow().date()
+        if from_ > to:
+            raise Exception("'from' must not be after 'to'")
+
+        points = await SentimentRollupService.get_trend(
+            info.context.read_db, ticker, from_, to, bucket.value
+        )
+        return [
+            SentimentTrendPoint(
+                bucketStart=p.bucket_start,
+                articleCount=p.count,
+                averageScore=p.average_score,
+                scoreStddev=p.score_stddev,
+                positiveCount=p.positive_count,
+                negativeCount=p.negative_count,
+                neutralCount=p.neutral_count,
+            )
+            for p in points
+        ]
+
+    @strawberry.field(name="portfolioHistory")
+    async def portfolio_history(
+        self,
+        info: Info,
+        from_: Annotated[date, strawberry.argument(name="from")],
+        to: Optional[date] = None,
+        resolution: TrendBucket = TrendBucket.DAY,
+    ) -> List[PortfolioHistoryPoint]:
+        """
+        Portfolio value and sector mix over time, one point per bucket (its
+        last daily snapshot); `from`/`to` are inclusive trading days.
+        """
+        current_user = await info.context.get_current_user()
+        if not current_user:
+            raise Exception("Authentication required")
+
+        to = to or datetime.now(ZoneInfo(settings.PRICE_FEED_TIMEZONE)).date()
+        if from_ > to:
+            raise Exception("'from' must not be after 'to'")
+
+        points = await PortfolioHistoryService.get_history(
+            info.context.read_db, current_user.id, from_, to, resolution.value
+        )
+        return [
+            PortfolioHistoryPoint(
+                bucketStart=p.bucket_start,
+                day=p.day,
+                marketValue=p.market_value,
+                investedValue=p.invested_value,
+                gainLoss=p.gain_loss,
+                gainLossPercent=(p.gain_loss / p.invested_value * 100) if p.invested_value > 0 else 0.0,
+                holdingsCount=p.holdings_count,
+                sectorAllocation=[
+                    AllocationSlice(label=sector, marketValue=p.market_value * weight, weight=weight)
+                    for sector, weight in zip(p.sectors, p.sector_weights)
+                ],
+            )
+            for p in points
+        ]
+
+    @strawberry.field(name="uploadJob")
+    async def upload_job(self, info: Info, id: str) -> Optional[UploadJob]:
+        """Progress of one of the current user's background uploads."""
+        current_user = await info.context.get_current_user()
+        if not current_user:
+            raise Exception("Authentication required")
+
+        job = await get_job(id)
+        if job is None or job.user_id != current_user.id:
+            return None
+        return upload_job_to_graphql(job)
+
+    @strawberry.field(name="portfolioSentiment")
+    async def portfolio_sentiment(self, info: Info, days: int = 7) -> PortfolioSentiment:
+        """Per-security sentiment over the last `days` with a market-value-weighted score."""
+        current_user = await info.context.get_current_user()
+        if not current_user:
+            raise Exception("Authentication required")
+
+        view = await PortfolioSentimentService.get(info.context.read_db, current_user.id, days)
+        return PortfolioSentiment(
+            days=view.days,
+            score=view.score,
+            label=sentiment_label(view.score),
+            holdings=[
+                HoldingSentiment(
+                    ticker=s.key,
+                    companyName=s.company_name,
+                    isin=s.isin,
+                    marketValue=s.market_value,
+                    weight=s.weight,
+                    articleCount=s.article_count,
+                    averageScore=s.average_score,
+                    strongBuyCount=s.recommendations["strong_buy"],
+                    buyCount=s.recommendations["buy"],
+                    holdCount=s.recommendations["hold"],
+                    sellCount=s.recommendations["sell"],
+                    strongSellCount=s.recommendations["strong_sell"],
+                )
+                for s in view.securities
+            ],
+        )
+
+    @strawberry.field
+    async def holdings_connection(
+        self, info: Info, first: int = 50, after: Optional[str] = None
+    ) -> Connection[Holding]:
+        current_user = await info.context.get_current_user()
+        if not current_user:
+            raise Exception("Authentication required")
+        db = info.context.read_db
+        first = clamp_page_size(first)
+
+        rows, has_next_page = await keyset_page(
+            db,
+            select(HoldingModel).where(HoldingModel.user_id == current_user.id),
+            (HoldingModel.id,),
+            first,
+            decode_cursor(after, int) if after else None,
+        )
+        return build_connection(
+            rows,
+            has_next_page,
+            lambda h: encode_cursor(h.id),
+            holding_to_graphql,
+        )
+
 @strawberry.type
 class Mutation:
     @strawberry.field
     async def login(self, info: Info, input: LoginInput) -> AuthPayload:
-        db = info.context["db"]
+        db = info.context.db
         user = await authenticate_user(db, input.email, input.password)
         if not user:
             raise Exception("Invalid email or password. Please check your credentials and try again.")
@@ -290,7 +384,7 @@ class Mutation:
             if len(input.password) < 8:
                 raise Exception("Password must be at least 8 characters long. Please choose a stronger password.")
 
-            db = info.context["db"]
+            db = info.context.db
 
             existing_user = await db.execute(
                 select(UserModel).where(UserModel.email == input.email)
@@ -298,7 +392,7 @@ class Mutation:
             if existing_user.scalar_one_or_none():
                 raise Exception("An account with this email address already exists. Please use a different email or try logging in.")
 
-            hashed_password = get_password_hash(input.password)
+            hashed_password = await get_password_hash_async(input.password)
             user = UserModel(
                 email=input.email,
                 hashed_password=hashed_password,
@@ -326,11 +420,11 @@ class Mutation:
 
     @strawberry.field
     async def add_holding(self, info: Info, input: HoldingInput) -> Holding:
-        current_user = info.context.get("current_user")
+        current_user = await info.context.get_current_user()
         if not current_user:
             raise Exception("Authentication required")
 
-        db = info.context["db"]
+        db = info.context.db
 
         holding = HoldingModel(
             user_id=current_user.id,
@@ -344,32 +438,35 @@ class Mutation:
             market_value=input.market_value,
             overall_gain_loss=input.overall_gain_loss,
             client_id=input.client_id,
+            ticker=input.ticker,
             market_cap=input.market_cap,
             stcg_quantity=input.stcg_quantity,
             stcg_value=input.stcg_value,
         )
 
         db.add(holding)
+        try:
+            await db.flush()
+        except IntegrityError:
+            # uq_holdings_user_isin_client: one row per security per client account
+            await db.rollback()
+            raise Exception(
+                "You already hold this security under this client ID. Update or remove the existing holding instead."
+            )
+        await PortfolioSummaryService.apply_delta(db, current_user.id, added=[holding])
         await db.commit()
         await db.refresh(holding)
 
-        # Invalidate dashboard cache after adding holding
-        try:
-            cache_key = f"dashboard:user:{current_user.id}"
-            async with get_redis() as redis:
-                await redis.delete(cache_key)
-                logger.info(f"Dashboard cache invalidated after adding holding for user {current_user.id}")
-        except Exception as e:
-            logger.warning(f"Failed to invalidate cache for user {current_user.id}: {e}")
-
         return holding_to_graphql(holding)
 
     @strawberry.field
-    async def upload_holdings(self, info: Info, file: Upload) -> UploadHoldingsResponse:
+    async def upload_holdings(
+        self, info: Info, file: Upload, replace: bool = False
+    ) -> UploadHoldingsResponse:
         logger.info("=== UPLOAD_HOLDINGS MUTATION STARTED ===")
         
         try:
-            current_user = info.context.get("current_user")
+            current_user = await info.context.get_current_user()
             if not current_user:
                 logger.error("No current user found in context")
                 raise ValidationError("Authentication required")
@@ -385,39 +482,47 @@ class Mutation:
                 logger.error(f"Invalid file type: {file.filename}")
                 raise ValidationError("Only Excel (.xlsx) or CSV files are allowed")
             
-            # Read file content to check size
-            content = await file.read()
-            file_size = len(content)
-            logger.info(f"File size: {file_size} bytes ({file_size / (1024*1024):.2f} MB)")
-            
-            # Reset file pointer
-            await file.seek(0)
-            
-            # Validate file size (10MB limit)
-            if file_size > 10 * 1024 * 1024:
-                raise ValidationError("File size must be less than 10MB")
-            
-            # Process file
-            logger.info("Starting Excel processing...")
-            excel_service = ExcelService()
-            holdings_data = await excel_service.read_excel(file, file.filename)
-            logger.info(f"Excel processing completed. Found {len(holdings_data)} records")
-            
-            # Store holdings
-            logger.info("Starting database operations...")
-            holding_service = HoldingService()
-            result = await holding_service.bulk_create_or_update_holdings(
-                info.context["db"],
-                holdings_data,
-                current_user.id
-            )
+            # Spool to disk in fixed-size reads; the size limit is enforced
+            # while reading, so an oversized upload is never held in full.
+            # The file is fingerprinted on the way so re-uploads can be skipped
+            digest = hashlib.sha256()
+            try:
+                spooled = await ExcelService.spool_upload(file, settings.max_file_size, digest=digest)
+            except UploadTooLarge:
+                raise ValidationError(
+                    f"File size must be less than {settings.max_file_size // (1024 * 1024)}MB"
+                )
+
+            # Parse in a worker process and store chunk by chunk
+            logger.info("Starting streaming ingest...")
+            try:
+                async with aclosing(
+                    parse_pool.parse(spooled.name, file.filename, settings.upload_chunk_rows)
+                ) as chunks:
+                    result = await HoldingService.ingest_chunks(
+                        info.context.db,
+                        chunks,
+                        current_user.id,
+                        replace=replace,
+                        file_sha256=digest.hexdigest()
+                    )
+            except ParserBusy as e:
+                raise ValidationError(str(e))
+            except ParseTimeout:
+                raise ValidationError("The file took too long to process")
+            except ParseError as e:
+                raise ValidationError(f"Could not read the file: {e}")
+            finally:
+                spooled.close()
             
             created_count = result['created']
             updated_count = result['updated']
             skipped_count = result['skipped']
+            deleted_count = result['deleted']
+            unchanged_count = result['unchanged']
             total_processed = result['total_processed']
             
-            logger.info(f"Database operations completed. Created: {created_count}, Updated: {updated_count}, Skipped: {skipped_count}")
+            logger.info(f"Database operations completed. Created: {created_count}, Updated: {updated_count}, Deleted: {deleted_count}, Unchanged: {unchanged_count}, Skipped: {skipped_count}")
             
             # Create detailed message
             message_parts = []
@@ -425,19 +530,19 @@ class Mutation:
                 message_parts.append(f"{created_count} new holdings created")
             if updated_count > 0:
                 message_parts.append(f"{updated_count} existing holdings updated")
+            if deleted_count > 0:
+                message_parts.append(f"{deleted_count} holdings no longer in the file removed")
+            if unchanged_count > 0:
+                message_parts.append(f"{unchanged_count} holdings unchanged")
             if skipped_count > 0:
                 message_parts.append(f"{skipped_count} duplicates skipped")
             
-            message = "Successfully processed: " + ", ".join(message_parts)
-            
-            # Invalidate dashboard cache after successful upload
-            try:
-                cache_key = f"dashboard:user:{current_user.id}"
-                async with get_redis() as redis:
-                    await redis.delete(cache_key)
-                    logger.info(f"Dashboard cache invalidated for user {current_user.id}")
-            except Exception as e:
-                logger.warning(f"Failed to invalidate cache for user {current_user.id}: {e}")
+            if result['duplicate']:
+                message = "This file was already uploaded and your holdings are unchanged since"
+            elif message_parts:
+                message = "Successfully processed: " + ", ".join(message_parts)
+            else:
+                message = "Successfully processed: the file had no holdings"
             
             logger.info("=== UPLOAD_HOLDINGS MUTATION COMPLETED SUCCESSFULLY ===")
             return UploadHoldingsResponse(
@@ -446,7 +551,10 @@ class Mutation:
                 count=total_processed,
                 created=created_count,
                 updated=updated_count,
-                skipped=skipped_count
+                deleted=deleted_count,
+                skipped=skipped_count,
+                unchanged=unchanged_count,
+                duplicate=result['duplicate']
             )
 
         except ValidationError as e:
@@ -464,12 +572,47 @@ class Mutation:
                 count=0
             )
     @strawberry.field
+    async def enqueue_holdings_upload(
+        self, info: Info, file: Upload, replace: bool = False
+    ) -> UploadJob:
+        """
+        Store the file and process it in the background; follow the returned
+        job through `uploadJob` or the `uploadJobProgress` subscription.
+        """
+        current_user = await info.context.get_current_user()
+        if not current_user:
+            raise Exception("Authentication required")
+
+        if not file.filename.lower().endswith(('.xlsx', '.csv')):
+            raise Exception("Only Excel (.xlsx) or CSV files are allowed")
+
+        digest = hashlib.sha256()
+        try:
+            spooled = await ExcelService.spool_upload(file, settings.max_file_size, digest=digest)
+        except UploadTooLarge:
+            raise Exception(
+                f"File size must be less than {settings.max_file_size // (1024 * 1024)}MB"
+            )
+
+        try:
+            job = await enqueue_upload(
+                current_user.id, file.filename, spooled,
+                replace=replace, file_sha256=digest.hexdigest()
+            )
+        except UploadJobsBusy as e:
+            raise Exception(str(e))
+        finally:
+            spooled.close()
+
+        return upload_job_to_graphql(job)
+
+    @strawberry.field
     async def add_to_watchlist(self, info: Info, input: WatchlistInput) -> Watchlist:
-        current_user = info.context.get("current_user")
+        current_user = await info.context.get_current_user()
         if not current_user:
             raise Exception("Authentication required")
 
-        db = info.context["db"]
+        db = info.context.db
 
         watchlist = WatchlistModel(
             user_id=current_user.id,
@@ -486,11 +629,11 @@ class Mutation:
 
     @strawberry.field
     async def remove_holding(self, info: Info, id: int) -> bool:
-        current_user = info.context.get("current_user")
+        current_user = await info.context.get_current_user()
         if not current_user:
             raise Exception("Authentication required")
 
-        db = info.context["db"]
+        db = info.context.db
 
         result = await db.execute(
             select(HoldingModel).where(
@@ -502,27 +645,19 @@ class Mutation:
         if not holding:
             return False
 
+        await PortfolioSummaryService.apply_delta(db, current_user.id, removed=[holding])
         await db.delete(holding)
         await db.commit()
         
-        # Invalidate dashboard cache after removing holding
-        try:
-            cache_key = f"dashboard:user:{current_user.id}"
-            async with get_redis() as redis:
-                await redis.delete(cache_key)
-                logger.info(f"Dashboard cache invalidated after removing holding for user {current_user.id}")
-        except Exception as e:
-            logger.warning(f"Failed to invalidate cache for user {current_user.id}: {e}")
-        
         return True
 
     @strawberry.field
     async def remove_from_watchlist(self, info: Info, id: int) -> bool:
-        current_user = info.context.get("current_user")
+        current_user = await info.context.get_current_user()
         if not current_user:
             raise Exception("Authentication required")
 
-        db = info.context["db"]
+        db = info.context.db
 
         result = await db.execute(
             select(WatchlistModel).where(
@@ -540,11 +675,11 @@ class Mutation:
 
     @strawberry.field
     async def update_profile(self, info: Info, input: UpdateProfileInput) -> User:
-        current_user = info.context.get("current_user")
+        current_user = await info.context.get_current_user()
         if not current_user:
             raise Exception("Authentication required")
         
-        db = info.context["db"]
+        db = info.context.db
         
         # Get the user from database
         result = await db.execute(
@@ -572,16 +707,17 @@ class Mutation:
         
         await db.commit()
         await db.refresh(user)
+        await publish_user_invalidation(user.id)
         
         return user_to_graphql(user)
 
     @strawberry.field
     async def change_password(self, info: Info, input: ChangePasswordInput) -> bool:
-        current_user = info.context.get("current_user")
+        current_user = await info.context.get_current_user()
         if not current_user:
             raise Exception("Authentication required")
         
-        db = info.context["db"]
+        db = info.context.db
         
         # Get the user from database
         result = await db.execute(
@@ -592,23 +728,47 @@ class Mutation:
             raise Exception("User not found")
         
         # Verify current password
-        from passlib.context import CryptContext
-        pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-        
-        if not pwd_context.verify(input.current_password, user.hashed_password):
+        if not await verify_password_async(input.current_password, user.hashed_password):
             raise Exception("Current password is incorrect. Please verify your current password and try again.")
         
         # Update password
-        user.hashed_password = get_password_hash(input.new_password)
+        user.hashed_password = await get_password_hash_async(input.new_password)
         await db.commit()
+        await publish_user_invalidation(user.id)
         
         logger.info(f"Password changed for user {current_user.id}")
         return True
 
+@strawberry.type
+class Subscription:
+    @strawberry.subscription(name="uploadJobProgress")
+    async def upload_job_progress(self, info: Info, id: str) -> AsyncGenerator[UploadJob, None]:
+        """The job's state now and after each change, ending once it finishes."""
+        current_user = await info.context.get_current_user()
+        if not current_user:
+            raise Exception("Authentication required")
+
+        async with aclosing(watch_job(id)) as states:
+            async for job in states:
+                if job.user_id != current_user.id:
+                    return
+                yield upload_job_to_graphql(job)
+
+
 from strawberry.schema.config import StrawberryConfig
+from strawberry.extensions import ParserCache, QueryDepthLimiter, ValidationCache
+from .extensions import QueryCostLimiter
 
 schema = strawberry.Schema(
     query=Query, 
     mutation=Mutation, 
-    config=StrawberryConfig(auto_camel_case=False)
+    subscription=Subscription,
+    config=StrawberryConfig(auto_camel_case=False),
+    extensions=[
+        # Persisted and repeated queries skip re-parsing and re-validation
+        lambda: ParserCache(maxsize=settings.GRAPHQL_DOCUMENT_CACHE_SIZE),
+        lambda: ValidationCache(maxsize=settings.GRAPHQL_DOCUMENT_CACHE_SIZE),
+        lambda: QueryDepthLimiter(max_depth=settings.GRAPHQL_MAX_DEPTH),
+        QueryCostLimiter,
+    ],
 )
@@ -1,4 +1,4 @@
 import strawberry
-from .resolver import Query, Mutation
+from .resolver import Query, Mutation, Subscription
 
-schema = strawberry.Schema(query=Query, mutation=Mutation)
+schema = strawberry.Schema(query=Query, mutation=Mutation, subscription=Subscription)
@@ -1,7 +1,9 @@
 import strawberry
 from strawberry.file_uploads import Upload
-from typing import List, Optional
-from datetime import datetime
+from strawberry.types import Info
+from typing import Generic, List, Optional, TypeVar
+from datetime import date, datetime
+from enum import Enum
 
 # Auth Types
 @strawberry.type
@@ -61,9 +63,13 @@ class Holding:
     
     # Optional fields that might not always be present
     client_id: Optional[str] = strawberry.field(name="client_id", default=None)
+    ticker: Optional[str] = strawberry.field(name="ticker", default=None)
     market_cap: Optional[float] = strawberry.field(name="market_cap", default=None)
     stcg_quantity: Optional[int] = strawberry.field(name="stcg_quantity", default=None)
     stcg_value: Optional[float] = strawberry.field(name="stcg_value", default=None)
+
+    # What sentiments and articles are filed under (HoldingModel.sentiment_key)
+    sentiment_key: strawberry.Private[Optional[str]] = None
     
     # Commented fields for future use
     # free_quantity: Optional[int] = strawberry.field(name="free_quantity", default=None)
@@ -75,6 +81,19 @@ class Holding:
     # ltcg_quantity: Optional[int] = strawberry.field(name="ltcg_quantity", default=None)
     # ltcg_value: Optional[float] = strawberry.field(name="ltcg_value", default=None)
 
+    # Nested news/sentiment fields, batched per request through DataLoaders
+    @strawberry.field(name="latestSentiment")
+    async def latest_sentiment(self, info: Info) -> Optional["Sentiment"]:
+        return await info.context.loaders.latest_sentiment.load(self.sentiment_key)
+
+    @strawberry.field(name="sentimentSummary")
+    async def sentiment_summary(self, info: Info, days: int = 7) -> "SentimentSummary":
+        return await info.context.loaders.sentiment_summary(days).load(self.sentiment_key)
+
+    @strawberry.field(name="recentArticles")
+    async def recent_articles(self, info: Info, limit: int = 5) -> List["Article"]:
+        return await info.context.loaders.recent_articles(limit).load(self.sentiment_key)
+
 @strawberry.input
 class HoldingInput:
     company_name: str
@@ -89,6 +108,7 @@ class HoldingInput:
     
     # Optional fields
     client_id: Optional[str] = None
+    ticker: Optional[str] = None
     market_cap: Optional[float] = None
     stcg_quantity: Optional[int] = None
     stcg_value: Optional[float] = None
@@ -105,6 +125,7 @@ class HoldingUpdateInput:
     market_value: Optional[float] = None
     overall_gain_loss: Optional[float] = None
     client_id: Optional[str] = None
+    ticker: Optional[str] = None
     market_cap: Optional[float] = None
     stcg_quantity: Optional[int] = None
     stcg_value: Optional[float] = None
@@ -119,6 +140,18 @@ class Watchlist:
     sector: Optional[str] = None
     created_at: datetime
 
+    @strawberry.field(name="latestSentiment")
+    async def latest_sentiment(self, info: Info) -> Optional["Sentiment"]:
+        return await info.context.loaders.latest_sentiment.load(self.ticker)
+
+    @strawberry.field(name="sentimentSummary")
+    async def sentiment_summary(self, info: Info, days: int = 7) -> "SentimentSummary":
+        return await info.context.loaders.sentiment_summary(days).load(self.ticker)
+
+    @strawberry.field(name="recentArticles")
+    async def recent_articles(self, info: Info, limit: int = 5) -> List["Article"]:
+        return await info.context.loaders.recent_articles(limit).load(self.ticker)
+
 @strawberry.input
 class WatchlistInput:
     ticker: str
@@ -152,6 +185,56 @@ class Sentiment:
     analysis_model: str
     created_at: datetime
 
+@strawberry.type
+class SentimentSummary:
+    ticker: str
+    days: int
+    articleCount: int = 0
+    averageScore: Optional[float] = None
+    averageConfidence: Optional[float] = None
+    positiveCount: int = 0
+    negativeCount: int = 0
+    neutralCount: int = 0
+    latestAt: Optional[datetime] = None
+
+@strawberry.type
+class HoldingSentiment:
+    ticker: str
+    companyName: Optional[str] = None
+    isin: Optional[str] = None
+    marketValue: float
+    weight: float
+    articleCount: int = 0
+    averageScore: Optional[float] = None
+    strongBuyCount: int = 0
+    buyCount: int = 0
+    holdCount: int = 0
+    sellCount: int = 0
+    strongSellCount: int = 0
+
+@strawberry.type
+class PortfolioSentiment:
+    days: int
+    score: Optional[float] = None
+    label: str
+    holdings: List[HoldingSentiment]
+
+@strawberry.enum
+class TrendBucket(Enum):
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+
+@strawberry.type
+class SentimentTrendPoint:
+    bucketStart: date
+    articleCount: int
+    averageScore: Optional[float] = None
+    scoreStddev: Optional[float] = None
+    positiveCount: int = 0
+    negativeCount: int = 0
+    neutralCount: int = 0
+
 @strawberry.type
 class PortfolioSummary:
     totalMarketValue: float
@@ -163,6 +246,42 @@ class PortfolioSummary:
     totalDividends: float
     avgGainLossPercent: float
     
+@strawberry.type
+class AllocationSlice:
+    label: str
+    marketValue: float
+    weight: float
+
+@strawberry.type
+class PortfolioHistoryPoint:
+    bucketStart: date
+    day: date
+    marketValue: float
+    investedValue: float
+    gainLoss: float
+    gainLossPercent: float
+    holdingsCount: int
+    sectorAllocation: List[AllocationSlice]
+
+@strawberry.type
+class PercentileValue:
+    percentile: int
+    value: float
+
+@strawberry.type
+class HoldingPerformance:
+    id: int
+    companyName: str
+    isin: str
+    clientId: Optional[str] = None
+    gainLoss: float
+    gainLossPercent: Optional[float] = None
+
+@strawberry.type
+class StcgExposure:
+    value: float
+    weight: float
+
 @strawberry.type
 class DashboardData:
     portfolio: PortfolioSummary
@@ -172,6 +291,40 @@ class DashboardData:
     totalStocks: int
     sectorsCount: int
     holdings: List[Holding]
+    overallSentimentScore: Optional[float] = None
+    sectorAllocation: List[AllocationSlice] = strawberry.field(default_factory=list)
+    marketCapAllocation: List[AllocationSlice] = strawberry.field(default_factory=list)
+    concentrationHhi: float = 0.0
+    sectorHhi: float = 0.0
+    gainLossPercentiles: List[PercentileValue] = strawberry.field(default_factory=list)
+    topHoldings: List[HoldingPerformance] = strawberry.field(default_factory=list)
+    bottomHoldings: List[HoldingPerformance] = strawberry.field(default_factory=list)
+    stcgExposure: Optional[StcgExposure] = None
+
+@strawberry.enum
+class UploadJobStage(Enum):
+    QUEUED = "queued"
+    PARSING = "parsing"
+    MERGING = "merging"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+@strawberry.type
+class UploadJob:
+    id: str
+    stage: UploadJobStage
+    fileName: str
+    rowsParsed: int = 0
+    rowsUpserted: int = 0
+    created: int = 0
+    updated: int = 0
+    deleted: int = 0
+    skipped: int = 0
+    unchanged: int = 0
+    duplicate: bool = False
+    error: Optional[str] = None
+    createdAt: Optional[datetime] = None
+    updatedAt: Optional[datetime] = None
 
 @strawberry.type
 class UploadHoldingsResponse:
@@ -180,4 +333,25 @@ class UploadHoldingsResponse:
     count: Optional[int] = 0
     created: Optional[int] = 0
     updated: Optional[int] = 0
-    skipped: Optional[int] = 0
\ No newline at end of file
+    deleted: Optional[int] = 0
+    skipped: Optional[int] = 0
+    unchanged: Optional[int] = 0
+    duplicate: Optional[bool] = False
+
+# Relay-style connections
+T = TypeVar("T")
+
+@strawberry.type
+class PageInfo:
+    hasNextPage: bool
+    endCursor: Optional[str] = None
+
+@strawberry.type
+class Edge(Generic[T]):
+    cursor: str
+    node: T
+
+@strawberry.type
+class Connection(Generic[T]):
+    edges: List[Edge[T]]
+    pageInfo: PageInfo
@@ -1,22 +1,32 @@
-from fastapi import FastAPI, Depends, Request, HTTPException
+from fastapi import FastAPI, Depends, Request
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncGenerator
+import asyncio
 import logging
 
 from strawberry.fastapi import GraphQLRouter
 from strawberry.file_uploads import Upload
 
 # Import database dependencies
-from .database import get_db
-from .models.user import User  
-from .auth.auth import get_current_user  
+from .database import close_db
+from .auth.token_cache import listen_for_invalidations
+from .cache import listen_for_cache_invalidations
+from .workers.price_feed import configured_consumer
+from .workers.scheduler import configured_snapshot_scheduler
+from .workers.upload_jobs import configured_upload_workers
+from .metrics import metrics
+from .graphql_api.context import GraphQLContext
+from .graphql_api.persisted_queries import PersistedQueryMiddleware
 from .graphql_api.resolver import schema
 
 # Initialize FastAPI app and security
 app = FastAPI()
 security = HTTPBearer(auto_error=False)
 
+# Expands persisted-query hashes; added before CORS so CORS wraps its responses too
+app.add_middleware(PersistedQueryMiddleware, path="/graphql")
 
 app.add_middleware(
     CORSMiddleware,
@@ -47,23 +57,22 @@ async def add_file_upload_headers(request: Request, call_next):
     
     return response
 
+async def get_credentials(request: Request = None) -> HTTPAuthorizationCredentials | None:
+    # No Request on websocket connections: subscriptions authenticate through
+    # their connection_init payload instead, see GraphQLContext
+    if request is None:
+        return None
+    return await security(request)
+
 async def get_context(
-    request: Request,
-    db: AsyncSession = Depends(get_db),
-    creds: HTTPAuthorizationCredentials | None = Depends(security),
-) -> dict:
-    current_user: User | None = None
-    if creds:
-        try:
-            current_user = await get_current_user(credentials=creds, db=db)
-        except HTTPException:
-            current_user = None
-
-    return {
-        "request": request,
-        "db": db,
-        "current_user": current_user,
-    }
+    creds: HTTPAuthorizationCredentials | None = Depends(get_credentials),
+) -> AsyncGenerator[GraphQLContext, None]:
+    # Sessions and the current user are created lazily by the resolvers that need them
+    context = GraphQLContext(credentials=creds)
+    try:
+        yield context
+    finally:
+        await context.close()
 
 # Create GraphQL router with multipart upload support
 graphql_app = GraphQLRouter(
@@ -74,6 +83,11 @@ graphql_app = GraphQLRouter(
 
 app.include_router(graphql_app, prefix="/graphql")
 
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint() -> str:
+    return metrics.render()
+
 # Add logging configuration
 logging.basicConfig(
     level=logging.DEBUG,  # Changed to DEBUG for more detailed logs
@@ -85,9 +99,25 @@ logger = logging.getLogger(__name__)
 @app.on_event("startup")
 async def startup_event():
     logger.info("Application starting up...")
-    pass
+    app.state.background_tasks = [
+        asyncio.create_task(listen_for_invalidations()),
+        asyncio.create_task(listen_for_cache_invalidations()),
+    ]
+    price_feed = configured_consumer()
+    if price_feed is not None:
+        app.state.background_tasks.append(asyncio.create_task(price_feed.run()))
+    upload_workers = configured_upload_workers()
+    if upload_workers is not None:
+        app.state.background_tasks.append(asyncio.create_task(upload_workers.run()))
+    app.state.snapshot_scheduler = configured_snapshot_scheduler()
+    if app.state.snapshot_scheduler is not None:
+        app.state.snapshot_scheduler.start()
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("Application shutting down...")
-    pass
\ No newline at end of file
+    for task in app.state.background_tasks:
+        task.cancel()
+    if app.state.snapshot_scheduler is not None:
+        app.state.snapshot_scheduler.shutdown()
+    await close_db()
\ No newline at end of file
@@ -0,0 +1,75 @@
+import threading
+from typing import Callable, Dict, Tuple
+
+
+LabelSet = Tuple[Tuple[str, str], ...]
+
+
+class MetricsRegistry:
+    """
+    Minimal in-process metrics store rendered in the Prometheus text format.
+
+    Counters only go up, summaries track count/sum/max of observations and
+    gauges are callables sampled at scrape time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, LabelSet], float] = {}
+        self._summaries: Dict[Tuple[str, LabelSet], list] = {}
+        self._gauges: Dict[Tuple[str, LabelSet], Callable[[], float]] = {}
+
+    @staticmethod
+    def _key(name: str, labels: Dict[str, str]) -> Tuple[str, LabelSet]:
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name: str, value: float = 1.0, **labels) -> None:
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = self._key(name, labels)
+        with self._lock:
+            summary = self._summaries.setdefault(key, [0, 0.0, 0.0])
+            summary[0] += 1
+            summary[1] += value
+            summary[2] = max(summary[2], value)
+
+    def gauge(self, name: str, fn: Callable[[], float], **labels) -> None:
+        with self._lock:
+            self._gauges[self._key(name, labels)] = fn
+
+    def counter_value(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get(self._key(name, labels), 0.0)
+
+    @staticmethod
+    def _format(name: str, labels: LabelSet, value: float) -> str:
+        if labels:
+            label_str = ",".join(f'{k}="{v}"' for k, v in labels)
+            return f"{name}{{{label_str}}} {value}"
+        return f"{name} {value}"
+
+    def render(self) -> str:
+        with self._lock:
+            counters = list(self._counters.items())
+            summaries = [(key, list(values)) for key, values in self._summaries.items()]
+            gauges = list(self._gauges.items())
+
+        lines = []
+        for (name, labels), value in sorted(counters):
+            lines.append(self._format(name, labels, value))
+        for (name, labels), (count, total, peak) in sorted(summaries):
+            lines.append(self._format(f"{name}_count", labels, count))
+            lines.append(self._format(f"{name}_sum", labels, total))
+            lines.append(self._format(f"{name}_max", labels, peak))
+        for (name, labels), fn in sorted(gauges, key=lambda item: item[0]):
+            try:
+                lines.append(self._format(name, labels, float(fn())))
+            except Exception:
+                continue
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
@@ -1,7 +1,12 @@
 from .article import Article
 from .holding import Holding
+from .holding_upload import HoldingUploadState
+from .portfolio_snapshot import PortfolioSnapshot
+from .portfolio_summary import PortfolioSectorCount, PortfolioSummary
+from .security_price import SecurityPrice
 from .sentiment import Sentiment
+from .sentiment_daily import SentimentDaily
 from .user import User
 from .watchlist import Watchlist
 
-__all__ = ["Article", "Holding", "Sentiment", "User", "Watchlist"]
+__all__ = ["Article", "Holding", "HoldingUploadState", "PortfolioSectorCount", "PortfolioSnapshot", "PortfolioSummary", "SecurityPrice", "Sentiment", "SentimentDaily", "User", "Watchlist"]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from ..database import Base
@@ -6,6 +6,11 @@ from ..database import Base
 
 class Article(Base):
     __tablename__ = "articles"
+    __table_args__ = (
+        # Keyset pagination: newest-first by (published_at, id), optionally per ticker
+        Index("ix_articles_published_at_id", "published_at", "id"),
+        Index("ix_articles_ticker_published_at_id", "ticker", "published_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
@@ -14,7 +19,7 @@ class Article(Base):
     source = Column(String, nullable=False)
     author = Column(String)
     published_at = Column(DateTime(timezone=True), nullable=False)
-    ticker = Column(String, index=True)
+    ticker = Column(String)  # indexed by ix_articles_ticker_published_at_id
     sector = Column(String)
     is_processed = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Index, func, literal_column
 from sqlalchemy.orm import relationship
+from sqlalchemy.ext.hybrid import hybrid_property
 from ..database import Base
 
 class Holding(Base):
@@ -11,6 +12,7 @@ class Holding(Base):
     client_id = Column(String, nullable=True)  # Changed to String to match Excel data
     company_name = Column(String, index=True)
     isin = Column(String, index=True)  # Removed unique=True since ISINs can appear multiple times for different clients
+    ticker = Column(String, nullable=True, index=True)  # Exchange symbol, matched against news sentiment
     market_cap = Column(Float, nullable=True)  # Made nullable since it might not always be present
     sector = Column(String)
     total_quantity = Column(Integer)
@@ -29,9 +31,37 @@ class Holding(Base):
     # ltcg_value = Column(Float)
     stcg_quantity = Column(Integer, nullable=True)
     stcg_value = Column(Float, nullable=True)
+    # Digest of the row as last uploaded; re-uploads skip rows whose digest matches
+    row_hash = Column(String(32), nullable=True)
     
     # Corrected relationship to match UserModel
     user = relationship("User", back_populates="holdings")
+
+    __table_args__ = (
+        # One row per security per client account; a missing client_id counts as ''
+        Index(
+            "uq_holdings_user_isin_client",
+            "user_id",
+            "isin",
+            func.coalesce(client_id, literal_column("''")),
+            unique=True,
+        ),
+        # Per-user lookups and portfolio totals without touching the heap
+        Index(
+            "ix_holdings_user_id_values",
+            "user_id",
+            postgresql_include=["market_value", "invested_value", "overall_gain_loss"],
+        ),
+    )
     
+    @hybrid_property
+    def sentiment_key(self):
+        # Sentiments are stored per ticker; fall back to the ISIN when no symbol is known
+        return self.ticker or self.isin
+
+    @sentiment_key.expression
+    def sentiment_key(cls):
+        return func.coalesce(cls.ticker, cls.isin)
+
     def __repr__(self):
         return f"<Holding(company_name='{self.company_name}', isin='{self.isin}', total_quantity={self.total_quantity})>"
\ No newline at end of file
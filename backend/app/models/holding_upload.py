@@ -0,0 +1,22 @@
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, String
+from sqlalchemy.sql import func
+from ..database import Base
+
+
+class HoldingUploadState(Base):
+    """
+    Fingerprint of each user's last stored holdings upload.
+
+    ``file_sha256`` identifies the uploaded file and ``holdings_digest`` the
+    user's holdings right after it was stored (row IDs and row hashes, so
+    price revaluations do not change it but manual edits do). Uploading the
+    same file again while both still match is a no-op.
+    """
+    __tablename__ = "holding_upload_state"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    file_sha256 = Column(String(64), nullable=False)
+    replace = Column(Boolean, nullable=False, default=False)
+    holdings_digest = Column(String(32), nullable=False)
+    holdings_count = Column(Integer, nullable=False, default=0)
+    uploaded_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
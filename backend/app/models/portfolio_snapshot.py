@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, Float, Date, DateTime, ForeignKey, String, REAL
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.sql import func
+from ..database import Base
+
+
+class PortfolioSnapshot(Base):
+    """
+    One row per user per trading day with the portfolio totals and sector mix.
+
+    Sector weights are stored as two parallel arrays (names and fractions of
+    market value, largest first) instead of a row per sector or holding.
+    Snapshots taken later in the same day overwrite the row, so a past day
+    keeps its last intraday snapshot.
+    """
+    __tablename__ = "portfolio_snapshots"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)  # trading day, in PRICE_FEED_TIMEZONE
+    taken_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    market_value = Column(Float, nullable=False, default=0.0)
+    invested_value = Column(Float, nullable=False, default=0.0)
+    gain_loss = Column(Float, nullable=False, default=0.0)
+    holdings_count = Column(Integer, nullable=False, default=0)
+    sectors = Column(ARRAY(String), nullable=False, default=list)
+    sector_weights = Column(ARRAY(REAL), nullable=False, default=list)
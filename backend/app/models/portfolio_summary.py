@@ -0,0 +1,42 @@
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from ..database import Base
+
+
+class PortfolioSummary(Base):
+    """
+    Running per-user portfolio aggregates, maintained with deltas in the same
+    transaction as every holdings write so the dashboard reads one row.
+
+    Top/worst performers are kept as candidates: an added holding can only
+    improve them, but removing or changing the current top or worst holding
+    sets `extremes_stale` and the next read re-derives both with LIMIT 1 queries.
+    """
+    __tablename__ = "portfolio_summary"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    holdings_count = Column(Integer, nullable=False, default=0)
+    sectors_count = Column(Integer, nullable=False, default=0)
+    total_market_value = Column(Float, nullable=False, default=0.0)
+    total_invested_value = Column(Float, nullable=False, default=0.0)
+    total_gain_loss = Column(Float, nullable=False, default=0.0)
+    # Sum and count of per-holding gain % (holdings with invested value only)
+    gain_percent_sum = Column(Float, nullable=False, default=0.0)
+    gain_percent_count = Column(Integer, nullable=False, default=0)
+    top_holding_id = Column(Integer, nullable=True)
+    top_company_name = Column(String, nullable=True)
+    top_gain_loss = Column(Float, nullable=True)
+    worst_holding_id = Column(Integer, nullable=True)
+    worst_company_name = Column(String, nullable=True)
+    worst_gain_loss = Column(Float, nullable=True)
+    extremes_stale = Column(Boolean, nullable=False, default=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class PortfolioSectorCount(Base):
+    """Holdings per sector per user; backs PortfolioSummary.sectors_count."""
+    __tablename__ = "portfolio_sector_counts"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    sector = Column(String, primary_key=True)
+    holdings_count = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, String, Float, DateTime
+from sqlalchemy.sql import func
+from ..database import Base
+
+
+class SecurityPrice(Base):
+    """
+    Latest traded price per security, as consumed from the price feed.
+
+    When the first tick of a new trading day arrives, the previous day's last
+    price moves to `prev_close`, so a holding's day change is
+    quantity * (price - prev_close).
+    """
+    __tablename__ = "security_prices"
+
+    isin = Column(String, primary_key=True)
+    price = Column(Float, nullable=False)
+    price_at = Column(DateTime(timezone=True), nullable=False)
+    prev_close = Column(Float, nullable=True)
+    prev_close_at = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<SecurityPrice(isin='{self.isin}', price={self.price}, price_at={self.price_at})>"
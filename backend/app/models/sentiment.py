@@ -1,15 +1,27 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index, case
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
+from sqlalchemy.ext.hybrid import hybrid_property
 from ..database import Base
 
 
 class Sentiment(Base):
     __tablename__ = "sentiments"
+    __table_args__ = (
+        # Keyset pagination and time-window scans per ticker; the included
+        # columns let the per-ticker summaries run as index-only scans
+        Index(
+            "ix_sentiments_ticker_created_at_id",
+            "ticker",
+            "created_at",
+            "id",
+            postgresql_include=["sentiment_score", "sentiment_label", "confidence"],
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     article_id = Column(Integer, ForeignKey("articles.id"), nullable=False)
-    ticker = Column(String, nullable=False, index=True)
+    ticker = Column(String, nullable=False)  # indexed by ix_sentiments_ticker_created_at_id
     sentiment_score = Column(Float, nullable=False)  # -1 to 1
     sentiment_label = Column(String, nullable=False)  # positive, negative, neutral
     confidence = Column(Float, nullable=False)
@@ -19,3 +31,22 @@ class Sentiment(Base):
 
     # Relationships
     article = relationship("Article", back_populates="sentiments")
+
+    @hybrid_property
+    def signed_score(self):
+        # Direction from the label, strength from the score; anything else is neutral
+        label = (self.sentiment_label or "").upper()
+        if label == "POSITIVE":
+            return self.sentiment_score
+        if label == "NEGATIVE":
+            return -self.sentiment_score
+        return 0.0
+
+    @signed_score.expression
+    def signed_score(cls):
+        label = func.upper(cls.sentiment_label)
+        return case(
+            (label == "POSITIVE", cls.sentiment_score),
+            (label == "NEGATIVE", -cls.sentiment_score),
+            else_=0.0,
+        )
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime
+from sqlalchemy.sql import func
+from ..database import Base
+
+
+class SentimentDaily(Base):
+    """
+    Per-ticker, per-day, per-model rollup of `sentiments`.
+
+    Only additive quantities are stored (counts, sum and sum of squares of the
+    score) so rows can be merged with a plain addition when new sentiments
+    arrive, and any coarser bucket is a SUM over the daily rows.
+    """
+    __tablename__ = "sentiment_daily"
+
+    ticker = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)  # UTC day of sentiments.created_at
+    model = Column(String, primary_key=True)  # sentiments.analysis_model
+    count = Column(Integer, nullable=False, default=0)
+    score_sum = Column(Float, nullable=False, default=0.0)
+    score_sq_sum = Column(Float, nullable=False, default=0.0)
+    positive_count = Column(Integer, nullable=False, default=0)
+    negative_count = Column(Integer, nullable=False, default=0)
+    neutral_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
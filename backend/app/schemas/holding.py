@@ -15,6 +15,7 @@ class HoldingBase(BaseModel):
     
     # Optional fields that might not always be present (aligned with SQLAlchemy model)
     client_id: Optional[str] = None
+    ticker: Optional[str] = None
     market_cap: Optional[float] = None
     stcg_quantity: Optional[int] = None
     stcg_value: Optional[float] = None
@@ -67,6 +68,7 @@ class HoldingUpdate(BaseModel):
     market_value: Optional[float] = None
     overall_gain_loss: Optional[float] = None
     client_id: Optional[str] = None
+    ticker: Optional[str] = None
     market_cap: Optional[float] = None
     stcg_quantity: Optional[int] = None
     stcg_value: Optional[float] = None
@@ -1,180 +1,301 @@
+import asyncio
+import logging
+import tempfile
+from typing import IO, Any, AsyncIterator, Dict, Iterator, List, Optional
+
 import pandas as pd
+from openpyxl import load_workbook
 from strawberry.file_uploads import Upload
-import io
-import logging
-from typing import List, Dict, Any
 
 logger = logging.getLogger(__name__)
 
+# Broker exports carry 14 rows of account details above the column headers
+XLSX_HEADER_ROW = 15
+
+# Bytes pulled from the upload per read while spooling it to disk
+UPLOAD_READ_SIZE = 1024 * 1024
+
+# Rows per cleaned chunk; bounds parser memory independently of file size
+DEFAULT_CHUNK_ROWS = 5000
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
 class ExcelService:
     @staticmethod
     async def read_excel(upload: Upload, filename: str) -> List[Dict[str, Any]]:
         """
         Read Excel file from Strawberry Upload object
         """
+        df = await ExcelService.read_frame(upload, filename)
+        holdings_data = ExcelService.frame_to_records(df)
+
+        logger.info(f"Successfully processed {len(holdings_data)} holdings")
+
+        # Log a sample record for debugging
+        if holdings_data:
+            logger.info(f"Sample record: {holdings_data[0]}")
+
+        return holdings_data
+
+    @staticmethod
+    def frame_to_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+        """
+        Convert a cleaned holdings DataFrame to a list of dicts with NaN mapped to None
+        """
+        return df.astype(object).where(df.notna(), None).to_dict('records')
+
+    @staticmethod
+    async def read_frame(upload: Upload, filename: str) -> pd.DataFrame:
+        """
+        Read and clean a whole Excel/CSV upload into one holdings DataFrame.
+
+        Loads every row at once; prefer `spool_upload` + `read_chunks` for
+        anything that may be large.
+        """
+        source = await ExcelService.spool_upload(upload)
         try:
-            logger.info(f"Processing file: {filename}")
-            
-            # Read file content
-            file_content = await upload.read()
-            logger.info(f"File size: {len(file_content)} bytes")
-            
-            # Reset file pointer for potential re-reading
-            await upload.seek(0)
-            
-            # Create BytesIO object for pandas
-            file_buffer = io.BytesIO(file_content)
-            
-            # Determine file type and read accordingly
-            if filename.lower().endswith('.xlsx'):
-                # Read Excel file - skip first 14 rows, then use row 15 as header (which becomes header=0 after skipping)
-                df = pd.read_excel(file_buffer, engine='openpyxl', skiprows=14, header=0)
-                logger.info("Reading Excel file: skipping first 14 rows, using row 15 as headers")
-            elif filename.lower().endswith('.csv'):
-                # Read CSV file
-                df = pd.read_csv(file_buffer)
-            else:
-                raise ValueError("Unsupported file format. Only .xlsx and .csv are supported.")
-            
-            logger.info(f"Successfully read file with {len(df)} rows and {len(df.columns)} columns")
-            logger.info(f"Original columns: {list(df.columns)}")
-            
-            # Clean column names (remove whitespace, convert to lowercase, replace spaces with underscores)
-            df.columns = df.columns.str.strip().str.lower().str.replace(' ', '_').str.replace('/', '_').str.replace('(', '').str.replace(')', '').str.replace('%', 'pct')
-            
-            logger.info(f"Cleaned columns: {list(df.columns)}")
-            
-            # Map actual column names to expected names based on the file structure
-            column_mapping = {
-                # Direct mappings from the Excel file structure (after cleaning)
-                'client_id': 'client_id',
-                'company_name': 'company_name',
-                'isin': 'isin',
-                'marketcap': 'market_cap',
-                'sector': 'sector',
-                'total_quantity': 'total_quantity',
-                'avg_trading_price': 'avg_trading_price',
-                'ltp': 'ltp',
-                'invested_value': 'invested_value',
-                'market_value': 'market_value',
-                'overall_gain_loss': 'overall_gain_loss',
-                'stcg_quantity': 'stcg_quantity',
-                'stcg_value': 'stcg_value',
-                
-                # Commented fields for future use - uncomment when model is updated
-                # 'free_quantity': 'free_quantity',
-                # 'unsettled_quantity': 'unsettled_quantity',
-                # 'margin_pledged_quantity': 'margin_pledged_quantity',
-                # 'paylatermtf_quantity': 'paylater_mtf_quantity',
-                # 'unpaidcusa_qty': 'unpaid_cusa_qty',
-                # 'blocked_qty': 'blocked_qty',
-                # 'ltcg_quantity': 'ltcg_quantity',
-                # 'ltcg_value': 'ltcg_value',
-                
-                # Handle variations that might occur after cleaning
-                'gain_loss': 'overall_gain_loss'
-            }
-            
-            # Rename columns based on mapping (only if they exist)
-            for old_name, new_name in column_mapping.items():
-                if old_name in df.columns:
-                    df.rename(columns={old_name: new_name}, inplace=True)
-            
-            logger.info(f"Final columns after mapping: {list(df.columns)}")
-            
-            # Validate required columns (aligned with model)
-            required_columns = [
-                'company_name', 'isin', 'sector', 'total_quantity',
-                'avg_trading_price', 'ltp', 'invested_value', 
-                'market_value', 'overall_gain_loss'
-            ]
-            
-            missing_columns = [col for col in required_columns if col not in df.columns]
-            if missing_columns:
-                logger.error(f"Missing required columns: {missing_columns}")
-                logger.error(f"Available columns: {list(df.columns)}")
-                raise ValueError(f"Missing required columns: {missing_columns}")
-            
-            # Clean and validate data
-            # Remove rows where Client ID is 'Total' (summary rows)
-            if 'client_id' in df.columns:
-                df = df[df['client_id'] != 'Total']
-                df = df[df['client_id'].notna()]  # Remove NaN client IDs
-                # Convert client_id to string to match model
-                df['client_id'] = df['client_id'].astype(str)
-            
-            # Remove rows without essential data
-            df = df.dropna(subset=['company_name', 'isin'])
-            df = df[df['company_name'].astype(str).str.strip() != '']
-            
-            # Handle ISIN codes (they appear to be truncated to 'INE' in this file)
-            logger.info("Note: ISIN codes in this file appear to be truncated to 'INE' prefix")
-            
-            # Convert numeric columns (aligned with model fields)
-            numeric_columns = [
-                'market_cap', 'total_quantity', 'avg_trading_price', 
-                'ltp', 'invested_value', 'market_value', 'overall_gain_loss',              
-                'stcg_quantity', 'stcg_value'
+            chunks = [chunk async for chunk in ExcelService.read_chunks(source, filename)]
+        finally:
+            source.close()
+        if not chunks:
+            return pd.DataFrame()
+        return pd.concat(chunks, ignore_index=True)
+
+    @staticmethod
+    async def spool_upload(
+        upload: Upload, max_bytes: Optional[int] = None, digest: Optional[Any] = None
+    ) -> IO[bytes]:
+        """
+        Copy an upload to a temporary file in fixed-size reads, failing with
+        UploadTooLarge as soon as it exceeds ``max_bytes``. A ``hashlib``
+        object passed as ``digest`` is fed the same reads.
+
+        The caller owns the returned file (positioned at 0); closing it
+        deletes it. Its ``name`` is a path other processes can open.
+        """
+        spooled = tempfile.NamedTemporaryFile(prefix="upload-")
+        size = 0
+        try:
+            while True:
+                block = await upload.read(UPLOAD_READ_SIZE)
+                if not block:
+                    break
+                size += len(block)
+                if max_bytes is not None and size > max_bytes:
+                    raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+                spooled.write(block)
+                if digest is not None:
+                    digest.update(block)
+        except BaseException:
+            spooled.close()
+            raise
+        spooled.seek(0)
+        logger.info(f"File size: {size} bytes ({size / (1024*1024):.2f} MB)")
+        return spooled
+
+    @staticmethod
+    async def read_chunks(
+        source: IO[bytes], filename: str, chunk_rows: int = DEFAULT_CHUNK_ROWS
+    ) -> AsyncIterator[pd.DataFrame]:
+        """
+        Cleaned holdings chunks from a spooled upload. Parsing runs in a worker
+        thread one chunk at a time, so at most one chunk is held per pull.
+        """
+        chunks = ExcelService.iter_chunks(source, filename, chunk_rows)
+        try:
+            while True:
+                chunk = await asyncio.to_thread(next, chunks, None)
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            # Closes the workbook if the consumer stopped early
+            await asyncio.to_thread(chunks.close)
+
+    @staticmethod
+    def iter_chunks(
+        source: IO[bytes], filename: str, chunk_rows: int = DEFAULT_CHUNK_ROWS
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Parse an Excel/CSV file into cleaned holdings DataFrames of at most
+        ``chunk_rows`` rows each, without loading the whole sheet.
+        """
+        logger.info(f"Processing file: {filename}")
+        if filename.lower().endswith('.xlsx'):
+            raw_chunks = ExcelService._iter_xlsx(source, chunk_rows)
+        elif filename.lower().endswith('.csv'):
+            raw_chunks = ExcelService._iter_csv(source, chunk_rows)
+        else:
+            raise ValueError("Unsupported file format. Only .xlsx and .csv are supported.")
+
+        total = 0
+        for raw in raw_chunks:
+            df = ExcelService.clean_frame(raw)
+            total += len(df)
+            if len(df):
+                yield df
+        logger.info(f"Successfully cleaned {total} holdings rows")
+
+    @staticmethod
+    def _iter_xlsx(source: IO[bytes], chunk_rows: int) -> Iterator[pd.DataFrame]:
+        # Read-only mode streams rows from the sheet XML instead of building
+        # the cell tree; the row after the account details is the header
+        workbook = load_workbook(source, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(min_row=XLSX_HEADER_ROW, values_only=True)
+            header = next(rows, None)
+            if header is None:
+                raise ValueError(f"No header row found at row {XLSX_HEADER_ROW}")
+            # Same placeholder names pandas gives unnamed columns
+            columns = [
+                str(name) if name is not None else f"Unnamed: {i}"
+                for i, name in enumerate(header)
             ]
+            width = len(columns)
+            logger.info(f"Reading Excel file: skipping first {XLSX_HEADER_ROW - 1} rows, using row {XLSX_HEADER_ROW} as headers")
+            logger.info(f"Original columns: {columns}")
+
+            batch: List[tuple] = []
+            yielded = False
+            for row in rows:
+                # Read-only rows can be ragged; pad or trim them to the header
+                batch.append(tuple(row[:width]) + (None,) * (width - len(row)))
+                if len(batch) >= chunk_rows:
+                    yield pd.DataFrame.from_records(batch, columns=columns)
+                    yielded = True
+                    batch = []
+            # Header-only sheets still yield a chunk so their columns get validated
+            if batch or not yielded:
+                yield pd.DataFrame.from_records(batch, columns=columns)
+        finally:
+            workbook.close()
+
+    @staticmethod
+    def _iter_csv(source: IO[bytes], chunk_rows: int) -> Iterator[pd.DataFrame]:
+        # Strings throughout: the numeric cleaning below handles thousands
+        # separators, and IDs keep their text form in every chunk. A
+        # header-only file still yields one empty chunk with its columns.
+        with pd.read_csv(source, chunksize=chunk_rows, dtype=str) as reader:
+            yield from reader
+
+    @staticmethod
+    def clean_frame(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Apply the column cleaning, mapping and row validation rules to one
+        parsed chunk of a holdings export.
+        """
+        # Clean column names (remove whitespace, convert to lowercase, replace spaces with underscores)
+        df.columns = df.columns.str.strip().str.lower().str.replace(' ', '_').str.replace('/', '_').str.replace('(', '').str.replace(')', '').str.replace('%', 'pct')
+        
+        logger.debug(f"Cleaned columns: {list(df.columns)}")
+        
+        # Map actual column names to expected names based on the file structure
+        column_mapping = {
+            # Direct mappings from the Excel file structure (after cleaning)
+            'client_id': 'client_id',
+            'company_name': 'company_name',
+            'isin': 'isin',
+            'symbol': 'ticker',
+            'ticker': 'ticker',
+            'trading_symbol': 'ticker',
+            'tradingsymbol': 'ticker',
+            'marketcap': 'market_cap',
+            'sector': 'sector',
+            'total_quantity': 'total_quantity',
+            'avg_trading_price': 'avg_trading_price',
+            'ltp': 'ltp',
+            'invested_value': 'invested_value',
+            'market_value': 'market_value',
+            'overall_gain_loss': 'overall_gain_loss',
+            'stcg_quantity': 'stcg_quantity',
+            'stcg_value': 'stcg_value',
             
             # Commented fields for future use - uncomment when model is updated
-            # numeric_columns.extend([
-            #     'free_quantity', 'unsettled_quantity', 'margin_pledged_quantity',
-            #     'paylater_mtf_quantity', 'unpaid_cusa_qty', 'blocked_qty',
-            #     'ltcg_quantity', 'ltcg_value'
-            # ])
+            # 'free_quantity': 'free_quantity',
+            # 'unsettled_quantity': 'unsettled_quantity',
+            # 'margin_pledged_quantity': 'margin_pledged_quantity',
+            # 'paylatermtf_quantity': 'paylater_mtf_quantity',
+            # 'unpaidcusa_qty': 'unpaid_cusa_qty',
+            # 'blocked_qty': 'blocked_qty',
+            # 'ltcg_quantity': 'ltcg_quantity',
+            # 'ltcg_value': 'ltcg_value',
             
-            for col in numeric_columns:
-                if col in df.columns:
-                    # Handle string numbers with commas
-                    if df[col].dtype == 'object':
-                        df[col] = df[col].astype(str).str.replace(',', '')
-                    
-                    # Convert to numeric, handling nullable fields appropriately
-                    if col in ['market_cap', 'stcg_quantity', 'stcg_value']:
-                        # These are nullable fields
-                        df[col] = pd.to_numeric(df[col], errors='coerce')
-                    else:
-                        # These are required fields
-                        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-            
-            # Add some validation
-            valid_rows = df[
-                (df['total_quantity'] > 0) & 
-                (df['company_name'].str.len() > 0) &
-                (df['invested_value'] > 0)
-            ]
-            
-            if len(valid_rows) != len(df):
-                logger.warning(f"Filtered out {len(df) - len(valid_rows)} invalid rows")
-                df = valid_rows
-            
-            # Convert to list of dictionaries
-            holdings_data = df.to_dict('records')
-            
-            # Clean up None values for optional fields to ensure proper handling
-            for holding in holdings_data:
-                # Convert NaN to None for optional fields
-                for field in ['market_cap', 'client_id', 'stcg_quantity', 'stcg_value']:
-                    if field in holding and pd.isna(holding[field]):
-                        holding[field] = None
-                        
-                # Commented fields for future use - uncomment when model is updated
-                # for field in ['free_quantity', 'unsettled_quantity', 'margin_pledged_quantity',
-                #               'paylater_mtf_quantity', 'unpaid_cusa_qty', 'blocked_qty',
-                #               'ltcg_quantity', 'ltcg_value']:
-                #     if field in holding and pd.isna(holding[field]):
-                #         holding[field] = None
-            
-            logger.info(f"Successfully processed {len(holdings_data)} holdings")
-            
-            # Log a sample record for debugging
-            if holdings_data:
-                logger.info(f"Sample record: {holdings_data[0]}")
-            
-            return holdings_data
-            
-        except Exception as e:
-            logger.error(f"Error processing Excel file: {str(e)}")
-            logger.error(f"Error type: {type(e).__name__}")
-            raise e
\ No newline at end of file
+            # Handle variations that might occur after cleaning
+            'gain_loss': 'overall_gain_loss'
+        }
+        
+        # Rename columns based on mapping (only if they exist)
+        for old_name, new_name in column_mapping.items():
+            if old_name in df.columns:
+                df.rename(columns={old_name: new_name}, inplace=True)
+        
+        logger.debug(f"Final columns after mapping: {list(df.columns)}")
+        
+        # Validate required columns (aligned with model)
+        required_columns = [
+            'company_name', 'isin', 'sector', 'total_quantity',
+            'avg_trading_price', 'ltp', 'invested_value', 
+            'market_value', 'overall_gain_loss'
+        ]
+        
+        missing_columns = [col for col in required_columns if col not in df.columns]
+        if missing_columns:
+            logger.error(f"Missing required columns: {missing_columns}")
+            logger.error(f"Available columns: {list(df.columns)}")
+            raise ValueError(f"Missing required columns: {missing_columns}")
+        
+        # Clean and validate data
+        # Remove rows where Client ID is 'Total' (summary rows)
+        if 'client_id' in df.columns:
+            df = df[df['client_id'] != 'Total']
+            df = df[df['client_id'].notna()]  # Remove NaN client IDs
+            # Convert client_id to string to match model
+            df['client_id'] = df['client_id'].astype(str)
+        
+        # Remove rows without essential data
+        df = df.dropna(subset=['company_name', 'isin'])
+        df = df[df['company_name'].astype(str).str.strip() != '']
+        
+        # Convert numeric columns (aligned with model fields)
+        numeric_columns = [
+            'market_cap', 'total_quantity', 'avg_trading_price', 
+            'ltp', 'invested_value', 'market_value', 'overall_gain_loss',              
+            'stcg_quantity', 'stcg_value'
+        ]
+        
+        # Commented fields for future use - uncomment when model is updated
+        # numeric_columns.extend([
+        #     'free_quantity', 'unsettled_quantity', 'margin_pledged_quantity',
+        #     'paylater_mtf_quantity', 'unpaid_cusa_qty', 'blocked_qty',
+        #     'ltcg_quantity', 'ltcg_value'
+        # ])
+        
+        for col in numeric_columns:
+            if col in df.columns:
+                # Handle string numbers with commas
+                if not pd.api.types.is_numeric_dtype(df[col]):
+                    df[col] = df[col].astype(str).str.replace(',', '')
+                
+                # Convert to numeric, handling nullable fields appropriately
+                if col in ['market_cap', 'stcg_quantity', 'stcg_value']:
+                    # These are nullable fields
+                    df[col] = pd.to_numeric(df[col], errors='coerce')
+                else:
+                    # These are required fields
+                    df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+        
+        # Add some validation
+        valid_rows = df[
+            (df['total_quantity'] > 0) & 
+            (df['company_name'].astype(str).str.len() > 0) &
+            (df['invested_value'] > 0)
+        ]
+        
+        if len(valid_rows) != len(df):
+            logger.warning(f"Filtered out {len(df) - len(valid_rows)} invalid rows")
+            df = valid_rows
+
+        return df
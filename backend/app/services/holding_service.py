@@ -1,123 +1,497 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
-from sqlalchemy import and_
-from typing import List, Dict, Any
+from sqlalchemy import String, bindparam, func, literal_column, select, text
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+import pandas as pd
 from ..models.holding import Holding
+from ..models.holding_upload import HoldingUploadState
+from ..config import settings
+from .excel_service import ExcelService
+from .portfolio_summary_service import PortfolioSummaryService
+from ..cache import add_cache_tags, user_holdings_tag
+import hashlib
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Fields that are currently active in the SQLAlchemy model
+HOLDING_FIELDS = (
+    'client_id', 'company_name', 'isin', 'ticker', 'market_cap', 'sector',
+    'total_quantity', 'avg_trading_price', 'ltp', 'invested_value',
+    'market_value', 'overall_gain_loss', 'stcg_quantity', 'stcg_value'
+)
+
+INTEGER_FIELDS = {'total_quantity', 'stcg_quantity'}
+FLOAT_FIELDS = {
+    'market_cap', 'avg_trading_price', 'ltp', 'invested_value',
+    'market_value', 'overall_gain_loss', 'stcg_value'
+}
+
+# Must match the expression of the uq_holdings_user_isin_client index exactly
+HOLDING_CONFLICT_KEY = [
+    Holding.user_id,
+    Holding.isin,
+    func.coalesce(Holding.client_id, literal_column("''")),
+]
+
+# Each row binds the holding fields plus user_id and row_hash; size chunks
+# from that so statements stay at half of asyncpg's 32767 parameter cap
+MAX_BIND_PARAMS = 32767
+UPSERT_CHUNK_SIZE = MAX_BIND_PARAMS // 2 // (len(HOLDING_FIELDS) + 2)
+
+HOLDING_COLUMN_TYPES = {
+    'client_id': 'varchar', 'company_name': 'varchar', 'isin': 'varchar',
+    'ticker': 'varchar',
+    'market_cap': 'double precision', 'sector': 'varchar',
+    'total_quantity': 'integer', 'avg_trading_price': 'double precision',
+    'ltp': 'double precision', 'invested_value': 'double precision',
+    'market_value': 'double precision', 'overall_gain_loss': 'double precision',
+    'stcg_quantity': 'integer', 'stcg_value': 'double precision'
+}
+
+STAGING_TABLE = "holdings_staging"
+
+# Row IDs and row hashes only: price revaluations leave it alone, while any
+# holding added, removed or re-uploaded since changes it
+HOLDINGS_DIGEST_SQL = text("""
+    SELECT count(*) AS holdings_count,
+           md5(coalesce(string_agg(id || ':' || coalesce(row_hash, ''), ',' ORDER BY id), '')) AS digest
+    FROM holdings
+    WHERE user_id = :user_id
+""")
+
+DELETE_MISSING_SQL = text("""
+    DELETE FROM holdings h
+    WHERE h.user_id = :user_id
+      AND NOT EXISTS (
+          SELECT 1 FROM unnest(:isins, :client_ids) AS k(isin, client_id)
+          WHERE k.isin = h.isin AND k.client_id = coalesce(h.client_id, '')
+      )
+""").bindparams(
+    bindparam("isins", type_=ARRAY(String)),
+    bindparam("client_ids", type_=ARRAY(String)),
+)
+
+
+def _row_hash(fields: Sequence[str], values: Sequence[Any]) -> str:
+    """
+    Digest of one upload row's cleaned values. Both storage paths hash the
+    same values, so a row hashes equal whichever path stored it; missing
+    columns and empty cells hash alike since neither sets a value.
+    """
+    payload = "\x1f".join(f"{f}={v!r}" for f, v in zip(fields, values) if v is not None)
+    return hashlib.md5(payload.encode(), usedforsecurity=False).hexdigest()
+
+
+def _result(created: int = 0, updated: int = 0, deleted: int = 0, skipped: int = 0,
+            unchanged: int = 0, duplicate: bool = False) -> Dict[str, Any]:
+    return {
+        'created': created,
+        'updated': updated,
+        'deleted': deleted,
+        'skipped': skipped,
+        'unchanged': unchanged,
+        'duplicate': duplicate,
+        'total_processed': created + updated
+    }
+
+
+async def _frames(
+    *frames: pd.DataFrame, rest: Optional[AsyncIterator[pd.DataFrame]] = None
+) -> AsyncIterator[pd.DataFrame]:
+    """Chain already-parsed frames and an optional stream of further chunks."""
+    for frame in frames:
+        yield frame
+    if rest is not None:
+        async for frame in rest:
+            yield frame
+
+
+def _frame_column(frame: pd.DataFrame, field: str) -> List[Any]:
+    """
+    Convert one DataFrame column to plain Python values: NaN to None, whole
+    number fields rounded to the nearest integer, numbers as float, the rest
+    as str. Both storage paths convert through this, so a row is stored and
+    hashed the same whichever path an upload takes.
+    """
+    if field not in frame.columns:
+        return [None] * len(frame)
+    series = frame[field]
+    if field in INTEGER_FIELDS:
+        series = pd.to_numeric(series, errors='coerce').round().astype('Int64')
+    elif field in FLOAT_FIELDS:
+        series = pd.to_numeric(series, errors='coerce').astype('float64')
+    else:
+        series = series.where(series.isna(), series.astype(str))
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
 class HoldingService:
     @staticmethod
     async def bulk_create_or_update_holdings(
         db: AsyncSession,
         holdings_data: List[Dict[str, Any]],
-        user_id: int
-    ) -> Dict[str, int]:
+        user_id: int,
+        replace: bool = False,
+        file_sha256: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Upsert holdings with one INSERT ... ON CONFLICT DO UPDATE per chunk.
+
+        Rows are keyed on (user_id, isin, client_id) and only rewritten when
+        their row hash differs from the stored one. When ``replace`` is set,
+        holdings missing from the upload are deleted in the same transaction.
+        """
         try:
             logger.info(f"Processing {len(holdings_data)} holdings for user {user_id}")
 
-            # Get existing holdings for the user
-            existing_holdings_result = await db.execute(
-                select(Holding).where(Holding.user_id == user_id)
-            )
-            existing_holdings = existing_holdings_result.scalars().all()
-            
-            # Create a map of existing holdings by ISIN and client_id for faster lookup
-            existing_map = {}
-            for holding in existing_holdings:
-                key = f"{holding.isin}_{holding.client_id or 'none'}"
-                existing_map[key] = holding
-
-            # Define the fields that are currently active in the SQLAlchemy model
-            allowed_fields = {
-                'client_id', 'company_name', 'isin', 'market_cap', 'sector',
-                'total_quantity', 'avg_trading_price', 'ltp', 'invested_value',
-                'market_value', 'overall_gain_loss', 'stcg_quantity', 'stcg_value'
-            }
-            
-            # Fields that are commented out in the model (will be filtered out)
-            commented_fields = {
-                'free_quantity', 'unsettled_quantity', 'margin_pledged_quantity',
-                'paylater_mtf_quantity', 'unpaid_cusa_qty', 'blocked_qty',
-                'ltcg_quantity', 'ltcg_value'
-            }
-
-            new_holdings = []
-            updated_holdings = []
+            # Only overwrite the columns the upload actually carries
+            sample = holdings_data[0] if holdings_data else {}
+            present_fields = [
+                field for field in HOLDING_FIELDS
+                if field in sample or field in ('isin', 'client_id')
+            ]
+
+            # Keep the first occurrence of each ISIN/client ID within the upload;
+            # a single statement cannot touch the same row twice anyway
+            rows: Dict[tuple, Dict[str, Any]] = {}
             skipped_count = 0
-            
-            # Keep track of processed ISINs to handle duplicates within the excel
-            processed_keys = set()
-
-            for data in holdings_data:
-                isin = data.get('isin')
-                client_id = data.get('client_id')
-                
-                if not isin:
-                    logger.warning(f"Skipping entry with missing ISIN")
+
+            frame = pd.DataFrame.from_records(holdings_data, columns=present_fields)
+            for values in zip(*(_frame_column(frame, field) for field in present_fields)):
+                row = dict(zip(present_fields, values))
+                if not row['isin']:
                     skipped_count += 1
                     continue
-                
-                # Create unique key for this holding
-                key = f"{isin}_{client_id or 'none'}"
-                
-                # Skip if we've already processed this exact combination in this upload
-                if key in processed_keys:
-                    logger.warning(f"Skipping duplicate within excel: ISIN {isin}, Client ID {client_id}")
+
+                key = (row['isin'], row.get('client_id') or '')
+                if key in rows:
+                    logger.debug(f"Skipping duplicate within excel: ISIN {key[0]}, Client ID {key[1]}")
                     skipped_count += 1
                     continue
-                
-                processed_keys.add(key)
-
-                # Filter out commented fields from the data
-                filtered_data = {k: v for k, v in data.items() if k in allowed_fields}
-                
-                # Log filtered out fields for debugging
-                filtered_out = {k: v for k, v in data.items() if k in commented_fields}
-                if filtered_out:
-                    logger.debug(f"Filtered out commented fields for {isin}: {list(filtered_out.keys())}")
-
-                # Check if this holding already exists
-                if key in existing_map:
-                    # Update existing holding
-                    existing_holding = existing_map[key]
-                    
-                    # Update all allowed fields from the excel data
-                    for field, value in filtered_data.items():
-                        if field != 'isin':  # Don't update the ISIN itself
-                            setattr(existing_holding, field, value)
-                    
-                    updated_holdings.append(existing_holding)
-                    logger.info(f"Updated existing holding: {existing_holding.company_name} (ISIN: {isin})")
-                else:
-                    # Create new holding
-                    holding = Holding(user_id=user_id, **filtered_data)
-                    new_holdings.append(holding)
-                    logger.info(f"Creating new holding: {holding.company_name} (ISIN: {isin})")
-
-            # Save all changes
-            if new_holdings:
-                db.add_all(new_holdings)
-            
-            if new_holdings or updated_holdings:
-                await db.commit()
-                logger.info(f"Successfully processed holdings: {len(new_holdings)} created, {len(updated_holdings)} updated, {skipped_count} skipped.")
-            else:
-                logger.info("No holdings to process.")
-
-            return {
-                'created': len(new_holdings),
-                'updated': len(updated_holdings),
-                'skipped': skipped_count,
-                'total_processed': len(new_holdings) + len(updated_holdings)
-            }
-            
+
+                row['row_hash'] = _row_hash(present_fields, [row[f] for f in present_fields])
+                row['user_id'] = user_id
+                rows[key] = row
+
+            if skipped_count:
+                logger.warning(f"Skipped {skipped_count} rows with a missing or duplicate ISIN/Client ID")
+
+            created_count = 0
+            updated_count = 0
+            deleted_count = 0
+
+            update_fields = [f for f in present_fields if f not in ('isin', 'client_id')]
+            batch = list(rows.values())
+
+            for start in range(0, len(batch), UPSERT_CHUNK_SIZE):
+                stmt = insert(Holding).values(batch[start:start + UPSERT_CHUNK_SIZE])
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=HOLDING_CONFLICT_KEY,
+                    set_={field: stmt.excluded[field] for field in update_fields + ['row_hash']},
+                    # Unchanged rows are left alone: no new tuple, no WAL, not returned
+                    where=Holding.row_hash.is_distinct_from(stmt.excluded.row_hash),
+                ).returning(
+                    # xmax is 0 only for freshly inserted tuples
+                    literal_column("(xmax = 0)").label("inserted"),
+                )
+                result = await db.execute(stmt)
+
+                for (inserted,) in result.all():
+                    if inserted:
+                        created_count += 1
+                    else:
+                        updated_count += 1
+
+            unchanged_count = len(rows) - created_count - updated_count
+
+            if replace and rows:
+                result = await db.execute(
+                    DELETE_MISSING_SQL,
+                    {
+                        "user_id": user_id,
+                        "isins": [key[0] for key in rows],
+                        "client_ids": [key[1] for key in rows],
+                    },
+                )
+                deleted_count = result.rowcount or 0
+            elif replace:
+                logger.warning(f"Replace requested for user {user_id} but the upload had no valid rows; nothing deleted")
+
+            await HoldingService._finish_upload(
+                db, user_id, created_count + updated_count + deleted_count, file_sha256, replace
+            )
+            logger.info(
+                f"Successfully processed holdings: {created_count} created, {updated_count} updated, "
+                f"{deleted_count} deleted, {unchanged_count} unchanged, {skipped_count} skipped."
+            )
+
+            return _result(created_count, updated_count, deleted_count, skipped_count, unchanged_count)
+
         except Exception as e:
             logger.error(f"Error in bulk_create_or_update_holdings: {str(e)}")
             await db.rollback()
             raise e
 
+    @staticmethod
+    async def ingest_frame(
+        db: AsyncSession,
+        frame: pd.DataFrame,
+        user_id: int,
+        replace: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Store a cleaned holdings DataFrame, picking COPY for large uploads on asyncpg.
+        """
+        return await HoldingService.ingest_chunks(db, _frames(frame), user_id, replace=replace)
+
+    @staticmethod
+    async def ingest_chunks(
+        db: AsyncSession,
+        chunks: AsyncIterator[pd.DataFrame],
+        user_id: int,
+        replace: bool = False,
+        file_sha256: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Store cleaned holdings chunks as one upload.
+
+        Chunks are buffered until ``bulk_copy_min_rows`` is reached; smaller
+        uploads go through the multi-row upsert, larger ones switch to COPY
+        and stream the buffered and remaining chunks into staging. Other
+        drivers always take the upsert path, which holds the whole upload.
+
+        With the file's ``file_sha256``, re-uploading the user's last file
+        while their holdings are as it left them returns before a single
+        chunk is pulled, so the file is never even parsed.
+        """
+        if file_sha256:
+            unchanged = await HoldingService.find_duplicate_upload(db, user_id, file_sha256, replace)
+            if unchanged is not None:
+                logger.info(f"Upload for user {user_id} matches their last one; nothing to do")
+                return _result(unchanged=unchanged, duplicate=True)
+
+        use_copy = db.get_bind().dialect.driver == "asyncpg"
+        buffered: List[pd.DataFrame] = []
+        rows = 0
+        async for chunk in chunks:
+            buffered.append(chunk)
+            rows += len(chunk)
+            if use_copy and rows >= settings.bulk_copy_min_rows:
+                return await HoldingService.copy_upsert_chunks(
+                    db, _frames(*buffered, rest=chunks), user_id,
+                    replace=replace, file_sha256=file_sha256
+                )
+
+        holdings_data: List[Dict[str, Any]] = []
+        for chunk in buffered:
+            holdings_data.extend(ExcelService.frame_to_records(chunk))
+        return await HoldingService.bulk_create_or_update_holdings(
+            db, holdings_data, user_id, replace=replace, file_sha256=file_sha256
+        )
+
+    @staticmethod
+    async def copy_upsert_holdings(
+        db: AsyncSession,
+        frame: pd.DataFrame,
+        user_id: int,
+        replace: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Stream DataFrame columns into a temporary staging table with binary COPY,
+        then merge them into holdings with a single INSERT ... SELECT ... ON CONFLICT.
+        """
+        return await HoldingService.copy_upsert_chunks(db, _frames(frame), user_id, replace=replace)
+
+    @staticmethod
+    async def copy_upsert_chunks(
+        db: AsyncSession,
+        chunks: AsyncIterator[pd.DataFrame],
+        user_id: int,
+        replace: bool = False,
+        file_sha256: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        COPY each chunk into a temporary staging table as it arrives, then merge
+        the whole upload into holdings with a single INSERT ... SELECT ... ON CONFLICT.
+
+        The columns are taken from the first chunk; every chunk of an upload
+        comes from the same header. ``client_id`` is always staged.
+        """
+        try:
+            fields: Optional[List[str]] = None
+            total_rows = 0
+
+            async for frame in chunks:
+                if fields is None:
+                    if 'isin' not in frame.columns:
+                        raise ValueError("Missing required columns: ['isin']")
+                    # client_id is part of the conflict key, so it is always
+                    # staged (NULL when the export has no such column), as in
+                    # the row-wise path
+                    fields = [
+                        f for f in HOLDING_FIELDS
+                        if f in frame.columns or f in ('isin', 'client_id')
+                    ]
+                    await HoldingService._create_staging(db, fields)
+                if not len(frame):
+                    continue
+
+                # Runs through the session's connection so COPY lands in its transaction
+                connection = await db.connection()
+                raw_connection = await connection.get_raw_connection()
+                values = [_frame_column(frame, f) for f in fields]
+                hashes = [_row_hash(fields, row) for row in zip(*values)]
+                columns = [range(total_rows, total_rows + len(frame))] + values + [hashes]
+                await raw_connection.driver_connection.copy_records_to_table(
+                    STAGING_TABLE,
+                    records=zip(*columns),
+                    columns=['row_no'] + fields + ['row_hash'],
+                )
+                total_rows += len(frame)
+                logger.debug(f"Copied {total_rows} holdings rows for user {user_id} into staging")
+
+            if fields is None:
+                logger.warning(f"Upload for user {user_id} had no rows; nothing stored")
+                return _result()
+
+            logger.info(f"Copied {total_rows} holdings for user {user_id} into staging")
+
+            column_list = ", ".join(fields)
+            update_fields = [f for f in fields if f not in ('isin', 'client_id')]
+            update_list = ", ".join(f"{f} = EXCLUDED.{f}" for f in update_fields)
+            # First occurrence of an ISIN/client ID in the file wins, as in the
+            # row-wise path; rows whose hash matches the stored one are not rewritten
+            merge = await db.execute(
+                text(f"""
+                    WITH upload AS (
+                        SELECT DISTINCT ON (isin, coalesce(client_id, ''))
+                               {column_list}, row_hash
+                        FROM {STAGING_TABLE}
+                        WHERE isin IS NOT NULL AND isin <> ''
+                        ORDER BY isin, coalesce(client_id, ''), row_no
+                    ),
+                    merged AS (
+                        INSERT INTO holdings (user_id, {column_list}, row_hash)
+                        SELECT CAST(:user_id AS integer), {column_list}, row_hash
+                        FROM upload
+                        ON CONFLICT (user_id, isin, coalesce(client_id, ''))
+                        DO UPDATE SET {update_list}, row_hash = EXCLUDED.row_hash
+                        WHERE holdings.row_hash IS DISTINCT FROM EXCLUDED.row_hash
+                        RETURNING (xmax = 0) AS inserted
+                    )
+                    SELECT (SELECT count(*) FROM upload),
+                           count(*) FILTER (WHERE inserted),
+                           count(*) FILTER (WHERE NOT inserted)
+                    FROM merged
+                """),
+                {"user_id": user_id},
+            )
+            distinct_count, created_count, updated_count = merge.one()
+            skipped_count = total_rows - distinct_count
+            unchanged_count = distinct_count - created_count - updated_count
+
+            deleted_count = 0
+            if replace and distinct_count:
+                result = await db.execute(
+                    text(f"""
+                        DELETE FROM holdings h
+                        WHERE h.user_id = :user_id
+                          AND NOT EXISTS (
+                              SELECT 1 FROM {STAGING_TABLE} s
+                              WHERE s.isin = h.isin
+                                AND coalesce(s.client_id, '') = coalesce(h.client_id, '')
+                          )
+                    """),
+                    {"user_id": user_id},
+                )
+                deleted_count = result.rowcount or 0
+            elif replace:
+                logger.warning(f"Replace requested for user {user_id} but the upload had no valid rows; nothing deleted")
+
+            await HoldingService._finish_upload(
+                db, user_id, created_count + updated_count + deleted_count, file_sha256, replace
+            )
+            logger.info(
+                f"Successfully merged holdings: {created_count} created, {updated_count} updated, "
+                f"{deleted_count} deleted, {unchanged_count} unchanged, {skipped_count} skipped."
+            )
+
+            return _result(created_count, updated_count, deleted_count, skipped_count, unchanged_count)
+
+        except Exception as e:
+            logger.error(f"Error in copy_upsert_chunks: {str(e)}")
+            await db.rollback()
+            raise e
+
+    @staticmethod
+    async def _create_staging(db: AsyncSession, fields: List[str]) -> None:
+        # Runs through the session first so the temp table lives in its transaction
+        column_defs = ", ".join(f"{f} {HOLDING_COLUMN_TYPES[f]}" for f in fields)
+        await db.execute(text(
+            f"CREATE TEMP TABLE {STAGING_TABLE} (row_no integer, {column_defs}, row_hash varchar) ON COMMIT DROP"
+        ))
+
+    @staticmethod
+    async def find_duplicate_upload(
+        db: AsyncSession, user_id: int, file_sha256: str, replace: bool = False
+    ) -> Optional[int]:
+        """
+        The number of holdings an upload would leave untouched when the file is
+        the user's last upload and their holdings have not changed since;
+        None when it has to be processed.
+        """
+        result = await db.execute(
+            select(HoldingUploadState).where(HoldingUploadState.user_id == user_id)
+        )
+        state = result.scalar_one_or_none()
+        # A replace can still remove holdings that a plain upload of the same file kept
+        if state is None or state.file_sha256 != file_sha256 or (replace and not state.replace):
+            return None
+
+        holdings_count, digest = await HoldingService._holdings_digest(db, user_id)
+        if digest != state.holdings_digest:
+            return None
+        return holdings_count
+
+    @staticmethod
+    async def _holdings_digest(db: AsyncSession, user_id: int) -> Tuple[int, str]:
+        row = (await db.execute(HOLDINGS_DIGEST_SQL, {"user_id": user_id})).one()
+        return row.holdings_count, row.digest
+
+    @staticmethod
+    async def _finish_upload(
+        db: AsyncSession, user_id: int, changed: int, file_sha256: Optional[str], replace: bool
+    ) -> None:
+        """Refresh derived data if anything changed, remember the file, and commit."""
+        if changed:
+            await PortfolioSummaryService.recompute(db, user_id)
+            add_cache_tags(db, user_holdings_tag(user_id))
+        else:
+            logger.info(f"Upload for user {user_id} changed no holdings; caches kept")
+
+        if file_sha256:
+            holdings_count, digest = await HoldingService._holdings_digest(db, user_id)
+            stmt = insert(HoldingUploadState).values(
+                user_id=user_id,
+                file_sha256=file_sha256,
+                replace=replace,
+                holdings_digest=digest,
+                holdings_count=holdings_count,
+                uploaded_at=func.now(),
+            )
+            await db.execute(stmt.on_conflict_do_update(
+                index_elements=[HoldingUploadState.user_id],
+                set_={
+                    'file_sha256': stmt.excluded.file_sha256,
+                    'replace': stmt.excluded.replace,
+                    'holdings_digest': stmt.excluded.holdings_digest,
+                    'holdings_count': stmt.excluded.holdings_count,
+                    'uploaded_at': stmt.excluded.uploaded_at,
+                },
+            ))
+        await db.commit()
+
     # Keep the old method for backward compatibility
     @staticmethod
     async def bulk_create_holdings(
@@ -127,4 +501,4 @@ class HoldingService:
     ) -> List[Holding]:
         result = await HoldingService.bulk_create_or_update_holdings(db, holdings_data, user_id)
         # Return empty list for compatibility, actual results are in the result dict
-        return []
\ No newline at end of file
+        return []
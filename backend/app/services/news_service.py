@@ -1,6 +1,8 @@
 from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
+from sqlalchemy import tuple_
 from sqlalchemy.future import select
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from ..models.article import Article
 from ..schemas.article import ArticleCreate
 from newsapi import NewsApiClient
@@ -31,9 +33,22 @@ class NewsService:
 
     @staticmethod
     async def get_articles(
-        db: AsyncSession, skip: int = 0, limit: int = 100
+        db: AsyncSession,
+        limit: int = 100,
+        after: Optional[Tuple[datetime, int]] = None,
+        ticker: Optional[str] = None,
     ) -> List[Article]:
-        result = await db.execute(select(Article).offset(skip).limit(limit))
+        """
+        Newest articles first. `after` is the (published_at, id) of the last
+        article of the previous page, so deep pages cost the same as the first.
+        """
+        query = select(Article)
+        if ticker:
+            query = query.where(Article.ticker == ticker)
+        if after is not None:
+            query = query.where(tuple_(Article.published_at, Article.id) < tuple_(*after))
+        query = query.order_by(Article.published_at.desc(), Article.id.desc()).limit(limit)
+        result = await db.execute(query)
         return result.scalars().all()
 
     @staticmethod
@@ -0,0 +1,255 @@
+import asyncio
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.holding import Holding
+
+# Market-cap buckets, in the crore units the broker export uses:
+# Large >= 20,000 Cr, Mid 5,000-20,000 Cr, Small < 5,000 Cr
+MARKET_CAP_EDGES = (5_000.0, 20_000.0)
+MARKET_CAP_LABELS = ("Small Cap", "Mid Cap", "Large Cap")
+UNKNOWN_LABEL = "Unknown"
+
+DEFAULT_PERCENTILES = (10, 25, 50, 75, 90)
+DEFAULT_TOP_N = 5
+
+ANALYTICS_COLUMNS = (
+    Holding.id,
+    Holding.isin,
+    Holding.client_id,
+    Holding.company_name,
+    Holding.sector,
+    Holding.sentiment_key,
+    Holding.market_value,
+    Holding.invested_value,
+    Holding.overall_gain_loss,
+    Holding.market_cap,
+    Holding.stcg_value,
+)
+
+
+@dataclass
+class PortfolioArrays:
+    """A user's holdings as column arrays, one element per holding row."""
+    ids: np.ndarray
+    isins: np.ndarray
+    client_ids: np.ndarray
+    company_names: np.ndarray
+    sectors: np.ndarray
+    sentiment_keys: np.ndarray
+    market_value: np.ndarray
+    invested_value: np.ndarray
+    gain_loss: np.ndarray
+    market_cap: np.ndarray
+    stcg_value: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Sequence[Any]]) -> "PortfolioArrays":
+        columns = list(zip(*rows)) if rows else [()] * len(ANALYTICS_COLUMNS)
+
+        def floats(values) -> np.ndarray:
+            # None -> NaN so the arrays stay float64
+            return np.array(values, dtype=float) if values else np.empty(0)
+
+        def labels(values) -> np.ndarray:
+            # Fixed-width unicode sorts (np.unique) much faster than object arrays
+            return np.array([v or "" for v in values], dtype=str)
+
+        return cls(
+            ids=np.array(columns[0], dtype=np.int64),
+            isins=labels(columns[1]),
+            client_ids=labels(columns[2]),
+            company_names=labels(columns[3]),
+            sectors=labels(columns[4]),
+            sentiment_keys=labels(columns[5]),
+            market_value=floats(columns[6]),
+            invested_value=floats(columns[7]),
+            gain_loss=floats(columns[8]),
+            market_cap=floats(columns[9]),
+            stcg_value=floats(columns[10]),
+        )
+
+
+@dataclass
+class Allocation:
+    label: str
+    market_value: float
+    weight: float
+
+
+@dataclass
+class HoldingPerformance:
+    id: int
+    company_name: str
+    isin: str
+    client_id: Optional[str]
+    gain_loss: float
+    gain_loss_percent: Optional[float]
+
+
+@dataclass
+class PortfolioAnalytics:
+    holdings_count: int = 0
+    total_market_value: float = 0.0
+    sector_allocation: List[Allocation] = field(default_factory=list)
+    market_cap_allocation: List[Allocation] = field(default_factory=list)
+    # Herfindahl-Hirschman index of position weights (positions are
+    # securities, summed across client accounts) and of sector weights, 0..1
+    concentration_hhi: float = 0.0
+    sector_hhi: float = 0.0
+    gain_loss_percentiles: Dict[int, float] = field(default_factory=dict)
+    top_holdings: List[HoldingPerformance] = field(default_factory=list)
+    bottom_holdings: List[HoldingPerformance] = field(default_factory=list)
+    stcg_value: float = 0.0
+    stcg_weight: float = 0.0
+    # Market value per sentiment key (ticker or ISIN), for sentiment weighting
+    market_value_by_key: Dict[str, float] = field(default_factory=dict)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "PortfolioAnalytics":
+        data = dict(data)
+        for key in ("sector_allocation", "market_cap_allocation"):
+            data[key] = [Allocation(**a) for a in data.get(key, [])]
+        for key in ("top_holdings", "bottom_holdings"):
+            data[key] = [HoldingPerformance(**h) for h in data.get(key, [])]
+        # JSON turns the integer percentile keys into strings
+        data["gain_loss_percentiles"] = {
+            int(p): v for p, v in data.get("gain_loss_percentiles", {}).items()
+        }
+        return cls(**data)
+
+
+async def load_portfolio_rows(db: AsyncSession, user_id: int, *extra_columns: Any) -> Sequence[Any]:
+    """
+    The analytics columns of every holding of a user, followed by
+    ``extra_columns``, in one query. ``PortfolioArrays.from_rows`` ignores
+    the extra columns, so callers that need more of each holding can reuse
+    the rows instead of loading the holdings twice.
+    """
+    result = await db.execute(
+        select(*ANALYTICS_COLUMNS, *extra_columns).where(Holding.user_id == user_id)
+    )
+    return result.all()
+
+
+async def load_portfolio_arrays(db: AsyncSession, user_id: int) -> PortfolioArrays:
+    """Fetch the analytics columns of every holding of a user in one query."""
+    rows = await load_portfolio_rows(db, user_id)
+    # Column conversion is CPU-bound; keep large accounts off the event loop
+    return await asyncio.to_thread(PortfolioArrays.from_rows, rows)
+
+
+def _group_sum(labels: np.ndarray, values: np.ndarray):
+    keys, inverse = np.unique(labels, return_inverse=True)
+    return keys, np.bincount(inverse, weights=values, minlength=len(keys))
+
+
+def _allocation(keys: np.ndarray, sums: np.ndarray, total: float) -> List[Allocation]:
+    order = np.argsort(-sums, kind="stable")
+    return [
+        Allocation(
+            label=str(keys[i]) or UNKNOWN_LABEL,
+            market_value=float(sums[i]),
+            weight=float(sums[i] / total) if total > 0 else 0.0,
+        )
+        for i in order
+    ]
+
+
+def _hhi(sums: np.ndarray) -> float:
+    total = sums.sum()
+    if total <= 0:
+        return 0.0
+    weights = sums / total
+    return float(np.dot(weights, weights))
+
+
+def _extreme_rows(arrays: PortfolioArrays, gain_percent: np.ndarray, n: int, largest: bool) -> List[HoldingPerformance]:
+    scored = np.flatnonzero(~np.isnan(arrays.gain_loss))
+    if n <= 0 or scored.size == 0:
+        return []
+    values = arrays.gain_loss[scored]
+    keys = -values if largest else values
+    n = min(n, scored.size)
+    # O(rows) selection of the n extremes, then sort only those n
+    picked = np.argpartition(keys, n - 1)[:n]
+    picked = picked[np.argsort(keys[picked], kind="stable")]
+    rows = scored[picked]
+    return [
+        HoldingPerformance(
+            id=int(arrays.ids[i]),
+            company_name=str(arrays.company_names[i]),
+            isin=str(arrays.isins[i]),
+            client_id=str(arrays.client_ids[i]) or None,
+            gain_loss=float(arrays.gain_loss[i]),
+            gain_loss_percent=None if np.isnan(gain_percent[i]) else float(gain_percent[i]),
+        )
+        for i in rows
+    ]
+
+
+def compute_analytics(
+    arrays: PortfolioArrays,
+    top_n: int = DEFAULT_TOP_N,
+    percentiles: Sequence[int] = DEFAULT_PERCENTILES,
+) -> PortfolioAnalytics:
+    """Allocation, concentration and performance statistics in vectorized passes."""
+    if len(arrays) == 0:
+        return PortfolioAnalytics()
+
+    market_value = np.nan_to_num(arrays.market_value)
+    total = float(market_value.sum())
+
+    sector_keys, sector_sums = _group_sum(arrays.sectors, market_value)
+    _, position_sums = _group_sum(arrays.isins, market_value)
+    sentiment_keys, sentiment_sums = _group_sum(arrays.sentiment_keys, market_value)
+
+    # Bucket codes 0 = Small, 1 = Mid, 2 = Large, 3 = Unknown (no market cap)
+    cap_codes = np.where(
+        np.isnan(arrays.market_cap),
+        len(MARKET_CAP_LABELS),
+        np.digitize(np.nan_to_num(arrays.market_cap), MARKET_CAP_EDGES),
+    )
+    cap_sums = np.bincount(cap_codes, weights=market_value, minlength=len(MARKET_CAP_LABELS) + 1)
+    cap_keys = np.array(MARKET_CAP_LABELS + (UNKNOWN_LABEL,))
+    present = cap_sums > 0
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gain_percent = np.where(
+            arrays.invested_value > 0, arrays.gain_loss / arrays.invested_value * 100, np.nan
+        )
+    valid_percent = gain_percent[~np.isnan(gain_percent)]
+    gain_loss_percentiles = {}
+    if valid_percent.size:
+        gain_loss_percentiles = dict(
+            zip(percentiles, (float(v) for v in np.percentile(valid_percent, percentiles)))
+        )
+
+    stcg_value = float(np.nansum(arrays.stcg_value))
+
+    return PortfolioAnalytics(
+        holdings_count=len(arrays),
+        total_market_value=total,
+        sector_allocation=_allocation(sector_keys, sector_sums, total),
+        market_cap_allocation=_allocation(cap_keys[present], cap_sums[present], total),
+        concentration_hhi=_hhi(position_sums),
+        sector_hhi=_hhi(sector_sums),
+        gain_loss_percentiles=gain_loss_percentiles,
+        top_holdings=_extreme_rows(arrays, gain_percent, top_n, largest=True),
+        bottom_holdings=_extreme_rows(arrays, gain_percent, top_n, largest=False),
+        stcg_value=stcg_value,
+        stcg_weight=stcg_value / total if total > 0 else 0.0,
+        market_value_by_key={
+            str(k): float(v) for k, v in zip(sentiment_keys, sentiment_sums) if k
+        },
+    )
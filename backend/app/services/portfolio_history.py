@@ -0,0 +1,144 @@
+import logging
+from dataclasses import dataclass
+from datetime import date
+from typing import List
+
+from sqlalchemy import Date, cast, func, literal_column, select, text
+from sqlalchemy.dialects.postgresql import distinct_on
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from ..models.portfolio_snapshot import PortfolioSnapshot
+from .portfolio_analytics import UNKNOWN_LABEL
+
+logger = logging.getLogger(__name__)
+
+HISTORY_RESOLUTIONS = ("day", "week", "month")
+
+# Every user's snapshot for the current trading day in one statement: a single
+# pass over holdings grouped by (user, sector), rolled up per user with the
+# sectors as parallel arrays, largest first. Re-running it during the day
+# overwrites the day's row, so each past day keeps its last snapshot.
+SNAPSHOT_SQL = text("""
+WITH by_sector AS (
+    SELECT user_id,
+           coalesce(nullif(sector, ''), :unknown) AS sector,
+           count(*) AS holdings_count,
+           sum(coalesce(market_value, 0)) AS market_value,
+           sum(coalesce(invested_value, 0)) AS invested_value,
+           sum(coalesce(overall_gain_loss, 0)) AS gain_loss,
+           sum(sum(coalesce(market_value, 0))) OVER (PARTITION BY user_id) AS user_market_value
+    FROM holdings
+    WHERE user_id IS NOT NULL
+    GROUP BY 1, 2
+)
+INSERT INTO portfolio_snapshots AS s (
+    user_id, day, taken_at, market_value, invested_value, gain_loss,
+    holdings_count, sectors, sector_weights
+)
+SELECT user_id,
+       (now() AT TIME ZONE :tz)::date,
+       now(),
+       sum(market_value),
+       sum(invested_value),
+       sum(gain_loss),
+       sum(holdings_count),
+       array_agg(sector ORDER BY market_value DESC, sector),
+       array_agg(
+           CASE WHEN user_market_value > 0 THEN market_value / user_market_value ELSE 0 END::real
+           ORDER BY market_value DESC, sector
+       )
+FROM by_sector
+GROUP BY user_id
+ON CONFLICT (user_id, day) DO UPDATE SET
+    taken_at = excluded.taken_at,
+    market_value = excluded.market_value,
+    invested_value = excluded.invested_value,
+    gain_loss = excluded.gain_loss,
+    holdings_count = excluded.holdings_count,
+    sectors = excluded.sectors,
+    sector_weights = excluded.sector_weights
+""")
+
+
+@dataclass
+class HistoryPoint:
+    bucket_start: date
+    day: date  # the snapshot standing for the bucket: its last day
+    market_value: float
+    invested_value: float
+    gain_loss: float
+    holdings_count: int
+    sectors: List[str]
+    sector_weights: List[float]
+
+
+class PortfolioHistoryService:
+    @staticmethod
+    async def take_snapshots(db: AsyncSession) -> int:
+        """Snapshot every user with holdings for today; returns the rows written."""
+        try:
+            result = await db.execute(
+                SNAPSHOT_SQL, {"tz": settings.PRICE_FEED_TIMEZONE, "unknown": UNKNOWN_LABEL}
+            )
+            await db.commit()
+        except Exception as e:
+            logger.error(f"Error taking portfolio snapshots: {str(e)}")
+            await db.rollback()
+            raise e
+        return result.rowcount
+
+    @staticmethod
+    async def get_history(
+        db: AsyncSession,
+        user_id: int,
+        start: date,
+        end: date,
+        resolution: str = "day",
+    ) -> List[HistoryPoint]:
+        """
+        The user's snapshots between two trading days, inclusive, downsampled
+        to one point per day/week/month: the last snapshot in each bucket.
+        """
+        if resolution not in HISTORY_RESOLUTIONS:
+            raise ValueError(f"Unsupported resolution '{resolution}'")
+
+        bucket_start = cast(
+            func.date_trunc(literal_column(f"'{resolution}'"), PortfolioSnapshot.day), Date
+        ).label("bucket_start")
+        # DISTINCT ON keeps the first row per bucket in ORDER BY order, i.e.
+        # the latest day; the primary key range scan feeds it in that order
+        query = (
+            select(
+                bucket_start,
+                PortfolioSnapshot.day,
+                PortfolioSnapshot.market_value,
+                PortfolioSnapshot.invested_value,
+                PortfolioSnapshot.gain_loss,
+                PortfolioSnapshot.holdings_count,
+                PortfolioSnapshot.sectors,
+                PortfolioSnapshot.sector_weights,
+            )
+            .where(
+                PortfolioSnapshot.user_id == user_id,
+                PortfolioSnapshot.day >= start,
+                PortfolioSnapshot.day <= end,
+            )
+            .ext(distinct_on(bucket_start))
+            .order_by(bucket_start, PortfolioSnapshot.day.desc())
+        )
+
+        result = await db.execute(query)
+        return [
+            HistoryPoint(
+                bucket_start=row.bucket_start,
+                day=row.day,
+                market_value=float(row.market_value),
+                invested_value=float(row.invested_value),
+                gain_loss=float(row.gain_loss),
+                holdings_count=int(row.holdings_count),
+                sectors=list(row.sectors),
+                sector_weights=[float(w) for w in row.sector_weights],
+            )
+            for row in result.all()
+        ]
@@ -0,0 +1,118 @@
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.holding import Holding
+from ..models.sentiment import Sentiment
+
+RECOMMENDATIONS = ("strong_buy", "buy", "hold", "sell", "strong_sell")
+
+
+@dataclass
+class SecuritySentiment:
+    key: str  # ticker, or ISIN when the holding has no ticker
+    company_name: Optional[str]
+    isin: Optional[str]
+    market_value: float
+    weight: float
+    article_count: int = 0
+    average_score: Optional[float] = None
+    recommendations: dict = field(default_factory=dict)
+
+
+@dataclass
+class PortfolioSentimentView:
+    days: int
+    score: Optional[float]
+    securities: List[SecuritySentiment]
+
+
+def portfolio_sentiment_query(user_id: int, since: datetime):
+    """
+    One statement: the user's holdings grouped by security, joined to that
+    security's sentiment aggregated over the window, with the portfolio score
+    computed by window functions over the joined rows.
+    """
+    key = Holding.sentiment_key
+    positions = (
+        select(
+            key.label("key"),
+            func.min(Holding.company_name).label("company_name"),
+            func.min(Holding.isin).label("isin"),
+            func.coalesce(func.sum(Holding.market_value), 0.0).label("market_value"),
+        )
+        .where(Holding.user_id == user_id, key.isnot(None))
+        .group_by(key)
+        .cte("positions")
+    )
+
+    recommendation = func.lower(Sentiment.recommendation)
+    scores = (
+        select(
+            Sentiment.ticker.label("ticker"),
+            func.count().label("article_count"),
+            func.avg(Sentiment.signed_score).label("average_score"),
+            *(
+                func.count().filter(recommendation == r).label(r)
+                for r in RECOMMENDATIONS
+            ),
+        )
+        .where(
+            Sentiment.ticker.in_(select(positions.c.key)),
+            Sentiment.created_at >= since,
+        )
+        .group_by(Sentiment.ticker)
+        .cte("scores")
+    )
+
+    scored = scores.c.average_score.isnot(None)
+    weighted_sum = func.sum(positions.c.market_value * scores.c.average_score).over()
+    scored_value = func.sum(positions.c.market_value).filter(scored).over()
+    total_value = func.sum(positions.c.market_value).over()
+    return (
+        select(
+            positions.c.key,
+            positions.c.company_name,
+            positions.c.isin,
+            positions.c.market_value,
+            (positions.c.market_value / func.nullif(total_value, 0.0)).label("weight"),
+            func.coalesce(scores.c.article_count, 0).label("article_count"),
+            scores.c.average_score,
+            *(func.coalesce(scores.c[r], 0).label(r) for r in RECOMMENDATIONS),
+            # Only securities with news in the window count towards the score
+            (weighted_sum / func.nullif(scored_value, 0.0)).label("portfolio_score"),
+        )
+        .select_from(positions.outerjoin(scores, scores.c.ticker == positions.c.key))
+        .order_by(positions.c.market_value.desc(), positions.c.key)
+    )
+
+
+class PortfolioSentimentService:
+    @staticmethod
+    async def get(db: AsyncSession, user_id: int, days: int = 7) -> PortfolioSentimentView:
+        since = datetime.utcnow() - timedelta(days=days)
+        result = await db.execute(portfolio_sentiment_query(user_id, since))
+        rows = result.mappings().all()
+
+        securities = [
+            SecuritySentiment(
+                key=row["key"],
+                company_name=row["company_name"],
+                isin=row["isin"],
+                market_value=float(row["market_value"]),
+                weight=float(row["weight"] or 0.0),
+                article_count=int(row["article_count"]),
+                average_score=float(row["average_score"]) if row["average_score"] is not None else None,
+                recommendations={r: int(row[r]) for r in RECOMMENDATIONS},
+            )
+            for row in rows
+        ]
+        score = rows[0]["portfolio_score"] if rows else None
+        return PortfolioSentimentView(
+            days=days,
+            score=float(score) if score is not None else None,
+            securities=securities,
+        )
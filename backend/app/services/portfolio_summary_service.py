@@ -0,0 +1,281 @@
+import logging
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import Integer, and_, any_, bindparam, case, delete, func, literal, or_, select, update
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.holding import Holding
+from ..models.portfolio_summary import PortfolioSectorCount, PortfolioSummary
+
+logger = logging.getLogger(__name__)
+
+# Columns merged by addition when a delta is applied
+SUM_FIELDS = (
+    "holdings_count",
+    "sectors_count",
+    "total_market_value",
+    "total_invested_value",
+    "total_gain_loss",
+    "gain_percent_sum",
+    "gain_percent_count",
+)
+EXTREME_FIELDS = {
+    "top": ("top_holding_id", "top_company_name", "top_gain_loss"),
+    "worst": ("worst_holding_id", "worst_company_name", "worst_gain_loss"),
+}
+# Relative tolerance for float sums when verifying against a recompute
+VERIFY_TOLERANCE = 1e-6
+
+
+def _gain_percent(holding: Any) -> Optional[float]:
+    if holding.overall_gain_loss is None or not holding.invested_value or holding.invested_value <= 0:
+        return None
+    return holding.overall_gain_loss / holding.invested_value * 100
+
+
+def _aggregate_query(user_id: int):
+    """One-row aggregate of a user's holdings, in SUM_FIELDS order."""
+    has_percent = and_(Holding.invested_value > 0, Holding.overall_gain_loss.isnot(None))
+    return select(
+        literal(user_id, Integer).label("user_id"),
+        func.count(Holding.id),
+        func.count(func.distinct(Holding.sector)).filter(Holding.sector != ""),
+        func.coalesce(func.sum(Holding.market_value), 0.0),
+        func.coalesce(func.sum(Holding.invested_value), 0.0),
+        func.coalesce(func.sum(Holding.overall_gain_loss), 0.0),
+        func.coalesce(
+            func.sum(Holding.overall_gain_loss / Holding.invested_value * 100).filter(has_percent), 0.0
+        ),
+        func.count().filter(has_percent),
+    ).where(Holding.user_id == user_id)
+
+
+class PortfolioSummaryService:
+    @staticmethod
+    async def apply_delta(
+        db: AsyncSession,
+        user_id: int,
+        added: Iterable[Any] = (),
+        removed: Iterable[Any] = (),
+    ) -> None:
+        """
+        Fold added and removed holdings into the user's summary.
+
+        Call inside the transaction that writes the holdings, after a flush
+        for added rows (their ids are needed) and with the old values for
+        removed or changed rows. An update is a remove of the old values plus
+        an add of the new ones.
+        """
+        added, removed = list(added), list(removed)
+        deltas: Dict[str, float] = dict.fromkeys(SUM_FIELDS, 0)
+        sector_deltas: Counter = Counter()
+        for sign, holdings in ((1, added), (-1, removed)):
+            for h in holdings:
+                deltas["holdings_count"] += sign
+                deltas["total_market_value"] += sign * (h.market_value or 0.0)
+                deltas["total_invested_value"] += sign * (h.invested_value or 0.0)
+                deltas["total_gain_loss"] += sign * (h.overall_gain_loss or 0.0)
+                percent = _gain_percent(h)
+                if percent is not None:
+                    deltas["gain_percent_sum"] += sign * percent
+                    deltas["gain_percent_count"] += sign
+                if h.sector:
+                    sector_deltas[h.sector] += sign
+
+        sector_deltas = Counter({s: d for s, d in sector_deltas.items() if d})
+        if sector_deltas:
+            deltas["sectors_count"] = await PortfolioSummaryService._apply_sector_deltas(
+                db, user_id, sector_deltas
+            )
+
+        scored = [h for h in added if h.overall_gain_loss is not None]
+        candidates = {
+            "top": max(scored, key=lambda h: h.overall_gain_loss, default=None),
+            "worst": min(scored, key=lambda h: h.overall_gain_loss, default=None),
+        }
+        values: Dict[str, Any] = dict(deltas, user_id=user_id, extremes_stale=False)
+        for kind, holding in candidates.items():
+            id_field, name_field, gain_field = EXTREME_FIELDS[kind]
+            values[id_field] = holding.id if holding is not None else None
+            values[name_field] = holding.company_name if holding is not None else None
+            values[gain_field] = holding.overall_gain_loss if holding is not None else None
+
+        stmt = insert(PortfolioSummary).values(**values)
+        current, incoming = PortfolioSummary.__table__.c, stmt.excluded
+        set_: Dict[str, Any] = {f: current[f] + incoming[f] for f in SUM_FIELDS}
+
+        # Removing (or changing) the current top/worst holding invalidates it;
+        # the next read re-derives both instead of scanning here
+        removed_ids = [h.id for h in removed if h.id is not None]
+        stale = current.extremes_stale
+        if removed_ids:
+            ids = bindparam("removed_ids", removed_ids, type_=ARRAY(Integer))
+            stale = or_(stale, current.top_holding_id == any_(ids), current.worst_holding_id == any_(ids))
+        set_["extremes_stale"] = stale
+
+        for kind, holding in candidates.items():
+            if holding is None:
+                continue
+            id_field, name_field, gain_field = EXTREME_FIELDS[kind]
+            if kind == "top":
+                beats = incoming[gain_field] > current[gain_field]
+            else:
+                beats = incoming[gain_field] < current[gain_field]
+            better = or_(current[gain_field].is_(None), beats)
+            for field in (id_field, name_field, gain_field):
+                set_[field] = case((better, incoming[field]), else_=current[field])
+
+        await db.execute(stmt.on_conflict_do_update(index_elements=[PortfolioSummary.user_id], set_=set_))
+
+    @staticmethod
+    async def _apply_sector_deltas(db: AsyncSession, user_id: int, sector_deltas: Counter) -> int:
+        """Apply per-sector count deltas; returns the change in distinct sectors."""
+        stmt = insert(PortfolioSectorCount).values(
+            [{"user_id": user_id, "sector": s, "holdings_count": d} for s, d in sector_deltas.items()]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[PortfolioSectorCount.user_id, PortfolioSectorCount.sector],
+            set_={"holdings_count": PortfolioSectorCount.holdings_count + stmt.excluded.holdings_count},
+        ).returning(PortfolioSectorCount.sector, PortfolioSectorCount.holdings_count)
+        result = await db.execute(stmt)
+
+        change = 0
+        for sector, count in result.all():
+            before = count - sector_deltas[sector]
+            if before <= 0 < count:
+                change += 1
+            elif count <= 0 < before:
+                change -= 1
+
+        await db.execute(
+            delete(PortfolioSectorCount).where(
+                PortfolioSectorCount.user_id == user_id,
+                PortfolioSectorCount.holdings_count <= 0,
+            )
+        )
+        return change
+
+    @staticmethod
+    async def recompute(db: AsyncSession, user_id: int) -> None:
+        """
+        Rebuild a user's summary from their holdings with set-based queries.
+
+        Used after bulk writes, where one recompute is cheaper than per-row
+        deltas, and to repair drift. The caller commits.
+        """
+        await db.execute(delete(PortfolioSectorCount).where(PortfolioSectorCount.user_id == user_id))
+        await db.execute(
+            insert(PortfolioSectorCount).from_select(
+                ["user_id", "sector", "holdings_count"],
+                select(literal(user_id, Integer), Holding.sector, func.count())
+                .where(Holding.user_id == user_id, Holding.sector.isnot(None), Holding.sector != "")
+                .group_by(Holding.sector),
+            )
+        )
+
+        # Top/worst are filled in by refresh_extremes below
+        stmt = insert(PortfolioSummary).from_select(
+            ["user_id", *SUM_FIELDS, "extremes_stale"],
+            _aggregate_query(user_id).add_columns(literal(True)),
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[PortfolioSummary.user_id],
+            set_={f: stmt.excluded[f] for f in (*SUM_FIELDS, "extremes_stale")},
+        )
+        await db.execute(stmt)
+        await PortfolioSummaryService.refresh_extremes(db, user_id)
+
+    @staticmethod
+    async def refresh_extremes(db: AsyncSession, user_id: int) -> None:
+        """Re-derive top/worst holdings with two indexed LIMIT 1 queries."""
+        # Lock the summary row so a concurrent delta cannot slip in between
+        # reading the holdings and clearing the stale flag
+        await db.execute(
+            select(PortfolioSummary.user_id).where(PortfolioSummary.user_id == user_id).with_for_update()
+        )
+
+        values: Dict[str, Any] = {"extremes_stale": False}
+        for kind, order in (("top", Holding.overall_gain_loss.desc()), ("worst", Holding.overall_gain_loss.asc())):
+            result = await db.execute(
+                select(Holding.id, Holding.company_name, Holding.overall_gain_loss)
+                .where(Holding.user_id == user_id, Holding.overall_gain_loss.isnot(None))
+                .order_by(order, Holding.id)
+                .limit(1)
+            )
+            row = result.first()
+            for field, value in zip(EXTREME_FIELDS[kind], row or (None, None, None)):
+                values[field] = value
+
+        await db.execute(
+            update(PortfolioSummary).where(PortfolioSummary.user_id == user_id).values(**values)
+        )
+
+    @staticmethod
+    async def get(db: AsyncSession, user_id: int) -> PortfolioSummary:
+        """
+        The user's summary, repairing it first if it is missing or its
+        top/worst candidates are stale. Needs a writable session.
+        """
+        query = (
+            select(PortfolioSummary)
+            .where(PortfolioSummary.user_id == user_id)
+            .execution_options(populate_existing=True)
+        )
+        summary = (await db.execute(query)).scalar_one_or_none()
+        if summary is not None and not summary.extremes_stale:
+            return summary
+
+        if summary is None:
+            await PortfolioSummaryService.recompute(db, user_id)
+        else:
+            await PortfolioSummaryService.refresh_extremes(db, user_id)
+        await db.commit()
+        return (await db.execute(query)).scalar_one()
+
+    @staticmethod
+    async def verify(db: AsyncSession, user_id: int) -> List[str]:
+        """
+        Compare the stored summary with a fresh aggregate of the holdings.
+
+        Returns human-readable mismatches; an empty list means consistent.
+        """
+        stored = (
+            await db.execute(select(PortfolioSummary).where(PortfolioSummary.user_id == user_id))
+        ).scalar_one_or_none()
+        if stored is None:
+            return ["summary row missing"]
+
+        fresh = (await db.execute(_aggregate_query(user_id))).one()
+        problems = []
+        for field, expected in zip(SUM_FIELDS, fresh[1:]):
+            actual = getattr(stored, field)
+            if abs((actual or 0) - (expected or 0)) > VERIFY_TOLERANCE * max(1.0, abs(expected or 0)):
+                problems.append(f"{field}: stored {actual}, actual {expected}")
+
+        sectors = await db.execute(
+            select(Holding.sector, func.count())
+            .where(Holding.user_id == user_id, Holding.sector.isnot(None), Holding.sector != "")
+            .group_by(Holding.sector)
+        )
+        stored_sectors = await db.execute(
+            select(PortfolioSectorCount.sector, PortfolioSectorCount.holdings_count)
+            .where(PortfolioSectorCount.user_id == user_id)
+        )
+        if dict(sectors.all()) != dict(stored_sectors.all()):
+            problems.append("sector counts differ")
+
+        if not stored.extremes_stale:
+            for kind, order in (("top", Holding.overall_gain_loss.desc()), ("worst", Holding.overall_gain_loss.asc())):
+                best = (
+                    await db.execute(
+                        select(Holding.overall_gain_loss)
+                        .where(Holding.user_id == user_id, Holding.overall_gain_loss.isnot(None))
+                        .order_by(order)
+                        .limit(1)
+                    )
+                ).scalar_one_or_none()
+                if getattr(stored, EXTREME_FIELDS[kind][2]) != best:
+                    problems.append(f"{kind} holding differs")
+        return problems
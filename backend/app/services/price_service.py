@@ -0,0 +1,194 @@
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import Float, String, DateTime, bindparam, func, select, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from ..models.holding import Holding
+from ..models.security_price import SecurityPrice
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PriceTick:
+    isin: str
+    price: float
+    ts: datetime
+
+
+@dataclass
+class RevaluationResult:
+    prices_updated: int
+    holdings_revalued: int
+    users_affected: List[int]
+
+
+# One round-trip per batch, all in data-modifying CTEs over the same snapshot:
+#   prices     upsert the latest price per ISIN; the first tick of a new trading
+#              day (in the exchange's time zone) rolls the old price into
+#              prev_close, and ticks older than the stored one are ignored
+#   locked     lock every holding of the updated ISINs across all users,
+#              through the holdings ISIN index, and read its current values.
+#              FOR UPDATE waits out a concurrent upload and returns the row as
+#              it committed, so the deltas below never include that upload's
+#              own change (which its summary recompute already counted)
+#   revalued   re-mark the locked holdings and return the change against the
+#              values read under the lock
+#   summaries  fold the per-user changes into portfolio_summary (holding and
+#              sector counts cannot change; top/worst can, so they go stale)
+REVALUE_SQL = text("""
+WITH ticks AS (
+    SELECT * FROM unnest(:isins, :prices, :stamps) AS t(isin, price, price_at)
+),
+prices AS (
+    INSERT INTO security_prices AS p (isin, price, price_at)
+    SELECT isin, price, price_at FROM ticks
+    ON CONFLICT (isin) DO UPDATE SET
+        prev_close = CASE WHEN (excluded.price_at AT TIME ZONE :tz)::date > (p.price_at AT TIME ZONE :tz)::date
+                          THEN p.price ELSE p.prev_close END,
+        prev_close_at = CASE WHEN (excluded.price_at AT TIME ZONE :tz)::date > (p.price_at AT TIME ZONE :tz)::date
+                             THEN p.price_at ELSE p.prev_close_at END,
+        price = excluded.price,
+        price_at = excluded.price_at,
+        updated_at = now()
+    WHERE excluded.price_at >= p.price_at
+    RETURNING p.isin, p.price
+),
+locked AS (
+    SELECT h.id, pr.price, h.market_value, h.invested_value, h.overall_gain_loss
+    FROM holdings h
+    JOIN prices pr ON pr.isin = h.isin
+    WHERE h.ltp IS DISTINCT FROM pr.price
+    ORDER BY h.id
+    FOR UPDATE OF h
+),
+revalued AS (
+    UPDATE holdings h
+    SET ltp = old.price,
+        market_value = h.total_quantity * old.price,
+        overall_gain_loss = h.total_quantity * old.price - h.invested_value
+    FROM locked old
+    WHERE old.id = h.id
+    RETURNING
+        h.user_id,
+        coalesce(h.market_value, 0) - coalesce(old.market_value, 0) AS market_value_delta,
+        coalesce(h.overall_gain_loss, 0) - coalesce(old.overall_gain_loss, 0) AS gain_loss_delta,
+        CASE WHEN h.invested_value > 0 AND h.overall_gain_loss IS NOT NULL
+             THEN h.overall_gain_loss / h.invested_value * 100 ELSE 0 END
+          - CASE WHEN old.invested_value > 0 AND old.overall_gain_loss IS NOT NULL
+                 THEN old.overall_gain_loss / old.invested_value * 100 ELSE 0 END AS gain_percent_delta,
+        coalesce(h.invested_value > 0 AND h.overall_gain_loss IS NOT NULL, false)::int
+          - coalesce(old.invested_value > 0 AND old.overall_gain_loss IS NOT NULL, false)::int
+          AS gain_percent_count_delta
+),
+deltas AS (
+    SELECT user_id,
+           count(*) AS holdings_revalued,
+           sum(market_value_delta) AS market_value_delta,
+           sum(gain_loss_delta) AS gain_loss_delta,
+           sum(gain_percent_delta) AS gain_percent_delta,
+           sum(gain_percent_count_delta) AS gain_percent_count_delta
+    FROM revalued
+    WHERE user_id IS NOT NULL
+    GROUP BY user_id
+),
+summaries AS (
+    UPDATE portfolio_summary s
+    SET total_market_value = s.total_market_value + d.market_value_delta,
+        total_gain_loss = s.total_gain_loss + d.gain_loss_delta,
+        gain_percent_sum = s.gain_percent_sum + d.gain_percent_delta,
+        gain_percent_count = s.gain_percent_count + d.gain_percent_count_delta,
+        extremes_stale = true,
+        updated_at = now()
+    FROM deltas d
+    WHERE s.user_id = d.user_id
+)
+SELECT
+    (SELECT count(*) FROM prices) AS prices_updated,
+    (SELECT coalesce(sum(holdings_revalued), 0) FROM deltas) AS holdings_revalued,
+    (SELECT coalesce(array_agg(user_id ORDER BY user_id), '{}') FROM deltas) AS user_ids
+""").bindparams(
+    bindparam("isins", type_=ARRAY(String)),
+    bindparam("prices", type_=ARRAY(Float)),
+    bindparam("stamps", type_=ARRAY(DateTime(timezone=True))),
+)
+
+
+def coalesce_ticks(ticks: Iterable[PriceTick]) -> Dict[str, PriceTick]:
+    """Keep the newest tick per ISIN."""
+    latest: Dict[str, PriceTick] = {}
+    for tick in ticks:
+        current = latest.get(tick.isin)
+        if current is None or tick.ts >= current.ts:
+            latest[tick.isin] = tick
+    return latest
+
+
+class PriceService:
+    @staticmethod
+    async def apply_ticks(db: AsyncSession, ticks: Iterable[PriceTick]) -> RevaluationResult:
+        """
+        Store the newest price per ISIN and revalue every affected holding,
+        with their owners' summaries, in one statement and one transaction.
+        """
+        # ON CONFLICT cannot touch a row twice, and a fixed ISIN order keeps
+        # concurrent batches from locking prices in opposite orders
+        batch = sorted(coalesce_ticks(ticks).values(), key=lambda t: t.isin)
+        if not batch:
+            return RevaluationResult(0, 0, [])
+
+        try:
+            result = await db.execute(
+                REVALUE_SQL,
+                {
+                    "isins": [t.isin for t in batch],
+                    "prices": [float(t.price) for t in batch],
+                    "stamps": [
+                        t.ts if t.ts.tzinfo is not None else t.ts.replace(tzinfo=timezone.utc)
+                        for t in batch
+                    ],
+                    "tz": settings.PRICE_FEED_TIMEZONE,
+                },
+            )
+            row = result.one()
+            users = list(row.user_ids)
+            # No cache invalidation: a live feed revalues most users every
+            # flush, which would void their dashboard and holdings entries
+            # continuously. Price-only changes reach the caches through the
+            # fresh TTL and stale-while-revalidate instead.
+            await db.commit()
+        except Exception as e:
+            logger.error(f"Error applying {len(batch)} price ticks: {str(e)}")
+            await db.rollback()
+            raise e
+
+        return RevaluationResult(
+            prices_updated=row.prices_updated,
+            holdings_revalued=int(row.holdings_revalued),
+            users_affected=users,
+        )
+
+    @staticmethod
+    async def day_change(db: AsyncSession, user_id: int) -> Tuple[float, float]:
+        """
+        (change since previous close, previous-close value) of the user's
+        holdings that have both a feed price and a previous close.
+        """
+        result = await db.execute(
+            select(
+                func.coalesce(
+                    func.sum(Holding.total_quantity * (SecurityPrice.price - SecurityPrice.prev_close)), 0.0
+                ),
+                func.coalesce(func.sum(Holding.total_quantity * SecurityPrice.prev_close), 0.0),
+            )
+            .select_from(Holding)
+            .join(SecurityPrice, SecurityPrice.isin == Holding.isin)
+            .where(Holding.user_id == user_id, SecurityPrice.prev_close.isnot(None))
+        )
+        change, base = result.one()
+        return float(change), float(base)
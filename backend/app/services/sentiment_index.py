@@ -0,0 +1,199 @@
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Mapping, Optional, Sequence, Tuple
+
+from ..config import settings
+from ..database import get_redis
+from ..metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "sentiment:index:"
+
+# Fold one observation into an index hash {s: decayed sum of value*weight,
+# w: decayed sum of weights, t: time of the newest observation}. Observations
+# older than t are decayed themselves instead of rewinding the index.
+# ARGV: value, weight, timestamp, decay rate (1/s), ttl (s)
+UPDATE_SCRIPT = """
+local state = redis.call('HMGET', KEYS[1], 's', 'w', 't')
+local value = tonumber(ARGV[1])
+local weight = tonumber(ARGV[2])
+local ts = tonumber(ARGV[3])
+local rate = tonumber(ARGV[4])
+local s = tonumber(state[1]) or 0
+local w = tonumber(state[2]) or 0
+local t = tonumber(state[3]) or ts
+if ts >= t then
+  local decay = math.exp(-rate * (ts - t))
+  s = s * decay + value * weight
+  w = w * decay + weight
+  t = ts
+else
+  local decay = math.exp(-rate * (t - ts))
+  s = s + value * weight * decay
+  w = w + weight * decay
+end
+redis.call('HSET', KEYS[1], 's', tostring(s), 'w', tostring(w), 't', tostring(t))
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[5]))
+return tostring(s / w)
+"""
+
+
+@dataclass(frozen=True)
+class IndexReading:
+    value: float  # decayed mean signed score, -1..1
+    weight: float  # decayed observation weight as of now; ~1 per fresh article
+
+    @property
+    def confidence(self) -> float:
+        # Saturates at one fresh article so a busy ticker does not drown the rest
+        return min(1.0, self.weight)
+
+
+def _fold(
+    state: Optional[Tuple[float, float, float]],
+    value: float,
+    weight: float,
+    ts: float,
+    rate: float,
+) -> Tuple[float, float, float]:
+    """Python twin of UPDATE_SCRIPT, used for the in-process fallback."""
+    if state is None:
+        return value * weight, weight, ts
+    s, w, t = state
+    if ts >= t:
+        decay = math.exp(-rate * (ts - t))
+        return s * decay + value * weight, w * decay + weight, ts
+    decay = math.exp(-rate * (t - ts))
+    return s + value * weight * decay, w + weight * decay, t
+
+
+def _epoch(value: Optional[datetime]) -> float:
+    if value is None:
+        return time.time()
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class SentimentIndex:
+    """
+    Exponentially time-decayed sentiment per ticker.
+
+    Each update is O(1): the stored sums are decayed to the new observation's
+    time and the observation is added, atomically in a Redis Lua script. The
+    index value is the ratio of the two sums, so reading it needs no history.
+    Every update is also folded into an in-process copy that serves reads
+    when Redis is unavailable.
+    """
+
+    def __init__(self, half_life_hours: float):
+        self.decay_rate = math.log(2) / (half_life_hours * 3600)
+        # After ten half-lives an index carries < 0.1% of its weight
+        self.ttl_seconds = int(half_life_hours * 3600 * 10)
+        self._lock = threading.Lock()
+        self._local: Dict[str, Tuple[float, float, float]] = {}
+
+    async def record_many(self, observations: Sequence[Tuple[str, float, Optional[datetime]]]) -> None:
+        """Fold (ticker, signed score, observed at) observations into the index."""
+        if not observations:
+            return
+
+        updates = [(ticker, float(value), _epoch(at)) for ticker, value, at in observations]
+        with self._lock:
+            for ticker, value, ts in updates:
+                self._local[ticker] = _fold(self._local.get(ticker), value, 1.0, ts, self.decay_rate)
+
+        try:
+            async with get_redis() as redis:
+                script = redis.register_script(UPDATE_SCRIPT)
+                async with redis.pipeline(transaction=False) as pipe:
+                    for ticker, value, ts in updates:
+                        await script(
+                            keys=[KEY_PREFIX + ticker],
+                            args=[value, 1.0, ts, self.decay_rate, self.ttl_seconds],
+                            client=pipe,
+                        )
+                    await pipe.execute()
+            metrics.inc("sentiment_index_updates_total", value=len(updates), store="redis")
+        except Exception as e:
+            logger.warning(f"Sentiment index update fell back to in-process state: {e}")
+            metrics.inc("sentiment_index_updates_total", value=len(updates), store="local")
+
+    async def record(self, ticker: str, signed_score: float, observed_at: Optional[datetime] = None) -> None:
+        await self.record_many([(ticker, signed_score, observed_at)])
+
+    def _reading(self, state: Tuple[float, float, float], now: float) -> Optional[IndexReading]:
+        s, w, t = state
+        if w <= 0:
+            return None
+        return IndexReading(
+            value=s / w,
+            weight=w * math.exp(-self.decay_rate * max(0.0, now - t)),
+        )
+
+    async def get_many(self, tickers: Sequence[str]) -> Dict[str, IndexReading]:
+        """Current readings for the tickers that have one, in one round-trip."""
+        tickers = list(dict.fromkeys(tickers))
+        if not tickers:
+            return {}
+        now = time.time()
+
+        try:
+            async with get_redis() as redis:
+                async with redis.pipeline(transaction=False) as pipe:
+                    for ticker in tickers:
+                        pipe.hmget(KEY_PREFIX + ticker, "s", "w", "t")
+                    rows = await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Sentiment index read fell back to in-process state: {e}")
+            with self._lock:
+                states = {t: self._local[t] for t in tickers if t in self._local}
+        else:
+            states = {
+                ticker: (float(row[0]), float(row[1]), float(row[2]))
+                for ticker, row in zip(tickers, rows)
+                if row and None not in row
+            }
+
+        readings = {}
+        for ticker, state in states.items():
+            reading = self._reading(state, now)
+            if reading is not None:
+                readings[ticker] = reading
+        return readings
+
+    async def portfolio_sentiment(self, market_values: Mapping[str, float]) -> Optional[float]:
+        """
+        Market-value-weighted index over a portfolio's tickers.
+
+        Each ticker also counts by its decayed confidence, so names with no
+        recent news fade out instead of pinning the portfolio to old readings.
+        None when no holding has a reading.
+        """
+        readings = await self.get_many([t for t, mv in market_values.items() if mv and mv > 0])
+        numerator = denominator = 0.0
+        for ticker, reading in readings.items():
+            weight = market_values[ticker] * reading.confidence
+            numerator += weight * reading.value
+            denominator += weight
+        if denominator <= 0:
+            return None
+        return numerator / denominator
+
+
+def sentiment_label(score: Optional[float]) -> str:
+    if score is None:
+        return "N/A"
+    if score >= settings.SENTIMENT_NEUTRAL_BAND:
+        return "Positive"
+    if score <= -settings.SENTIMENT_NEUTRAL_BAND:
+        return "Negative"
+    return "Neutral"
+
+
+sentiment_index = SentimentIndex(settings.SENTIMENT_INDEX_HALF_LIFE_HOURS)
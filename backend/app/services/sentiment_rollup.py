@@ -0,0 +1,173 @@
+import math
+from dataclasses import dataclass
+from datetime import date
+from typing import List, Optional, Sequence
+
+from sqlalchemy import Date, cast, delete, func, literal_column, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.sentiment import Sentiment
+from ..models.sentiment_daily import SentimentDaily
+
+TREND_BUCKETS = ("day", "week", "month")
+
+ROLLUP_COLUMNS = (
+    "ticker",
+    "day",
+    "model",
+    "count",
+    "score_sum",
+    "score_sq_sum",
+    "positive_count",
+    "negative_count",
+    "neutral_count",
+)
+
+
+@dataclass
+class TrendPoint:
+    bucket_start: date
+    count: int
+    score_sum: float
+    score_sq_sum: float
+    positive_count: int
+    negative_count: int
+    neutral_count: int
+
+    @property
+    def average_score(self) -> Optional[float]:
+        return self.score_sum / self.count if self.count else None
+
+    @property
+    def score_stddev(self) -> Optional[float]:
+        if not self.count:
+            return None
+        mean = self.score_sum / self.count
+        # Population variance from the stored moments; clamp float noise at 0
+        return math.sqrt(max(0.0, self.score_sq_sum / self.count - mean * mean))
+
+
+def _daily_aggregate(*criteria):
+    """SELECT producing sentiment_daily rows from the matching raw sentiments."""
+    label = func.upper(Sentiment.sentiment_label)
+    # Literal rather than a bind parameter so the GROUP BY expression matches
+    day = cast(func.timezone(literal_column("'UTC'"), Sentiment.created_at), Date)
+    positive = func.count().filter(label == "POSITIVE")
+    negative = func.count().filter(label == "NEGATIVE")
+    return (
+        select(
+            Sentiment.ticker,
+            day.label("day"),
+            Sentiment.analysis_model,
+            func.count().label("count"),
+            func.sum(Sentiment.sentiment_score),
+            func.sum(Sentiment.sentiment_score * Sentiment.sentiment_score),
+            positive,
+            negative,
+            func.count() - positive - negative,
+        )
+        .where(*criteria)
+        .group_by(Sentiment.ticker, day, Sentiment.analysis_model)
+    )
+
+
+class SentimentRollupService:
+    @staticmethod
+    async def apply_sentiments(db: AsyncSession, sentiment_ids: Sequence[int]) -> None:
+        """
+        Fold newly inserted sentiments into the daily rollup.
+
+        Must run in the transaction that inserted them: the new rows are
+        aggregated in SQL and merged into existing buckets by addition, so the
+        rollup commits (or rolls back) together with the raw rows and
+        concurrent writers for the same bucket cannot lose updates.
+        """
+        if not sentiment_ids:
+            return
+
+        stmt = insert(SentimentDaily).from_select(
+            ROLLUP_COLUMNS, _daily_aggregate(Sentiment.id == func.any(list(sentiment_ids)))
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[SentimentDaily.ticker, SentimentDaily.day, SentimentDaily.model],
+            set_={
+                column: getattr(SentimentDaily, column) + getattr(stmt.excluded, column)
+                for column in ROLLUP_COLUMNS[3:]
+            }
+            | {"updated_at": func.now()},
+        )
+        await db.execute(stmt)
+
+    @staticmethod
+    async def rebuild(db: AsyncSession, ticker: Optional[str] = None) -> int:
+        """
+        Recompute the rollup from raw sentiments, for one ticker or all of them.
+
+        Returns the number of daily rows written. The caller commits.
+        """
+        clear = delete(SentimentDaily)
+        criteria = []
+        if ticker is not None:
+            clear = clear.where(SentimentDaily.ticker == ticker)
+            criteria.append(Sentiment.ticker == ticker)
+        await db.execute(clear)
+
+        result = await db.execute(
+            insert(SentimentDaily)
+            .from_select(ROLLUP_COLUMNS, _daily_aggregate(*criteria))
+            .returning(literal_column("1"))
+        )
+        return len(result.all())
+
+    @staticmethod
+    async def get_trend(
+        db: AsyncSession,
+        ticker: str,
+        start: date,
+        end: date,
+        bucket: str = "day",
+        model: Optional[str] = None,
+    ) -> List[TrendPoint]:
+        """Sentiment per day/week/month for `ticker` between two UTC days, inclusive."""
+        if bucket not in TREND_BUCKETS:
+            raise ValueError(f"Unsupported bucket '{bucket}'")
+
+        bucket_start = cast(
+            func.date_trunc(literal_column(f"'{bucket}'"), SentimentDaily.day), Date
+        ).label("bucket_start")
+        query = (
+            select(
+                bucket_start,
+                func.sum(SentimentDaily.count),
+                func.sum(SentimentDaily.score_sum),
+                func.sum(SentimentDaily.score_sq_sum),
+                func.sum(SentimentDaily.positive_count),
+                func.sum(SentimentDaily.negative_count),
+                func.sum(SentimentDaily.neutral_count),
+            )
+            .where(
+                SentimentDaily.ticker == ticker,
+                SentimentDaily.day >= start,
+                SentimentDaily.day <= end,
+            )
+            .group_by(bucket_start)
+            .order_by(bucket_start)
+        )
+        if model is not None:
+            query = query.where(SentimentDaily.model == model)
+
+        result = await db.execute(query)
+        return [
+            TrendPoint(
+                bucket_start=row[0],
+                count=int(row[1]),
+                score_sum=float(row[2]),
+                score_sq_sum=float(row[3]),
+                positive_count=int(row[4]),
+                negative_count=int(row[5]),
+                neutral_count=int(row[6]),
+            )
+            for row in result.all()
+        ]
+
@@ -4,6 +4,8 @@ from typing import List
 from ..models.sentiment import Sentiment
 from ..schemas.sentiment import SentimentCreate # Make sure this schema exists
 from ..nlp.sentiment_analyzer import SentimentAnalyzer
+from .sentiment_rollup import SentimentRollupService
+from .sentiment_index import sentiment_index
 import logging
 
 logger = logging.getLogger(__name__)
@@ -48,8 +50,13 @@ class SentimentService:
     async def create_sentiment(db: AsyncSession, sentiment: SentimentCreate) -> Sentiment:
         db_sentiment = Sentiment(**sentiment.dict())
         db.add(db_sentiment)
+        await db.flush()
+        await SentimentRollupService.apply_sentiments(db, [db_sentiment.id])
         await db.commit()
         await db.refresh(db_sentiment)
+        await sentiment_index.record(
+            db_sentiment.ticker, db_sentiment.signed_score, db_sentiment.created_at
+        )
         return db_sentiment
 
     def get_recommendation(self, label: str, score: float) -> str:
@@ -1,3 +1,3 @@
-from .scheduler import NewsScheduler
+from .scheduler import NewsScheduler, PortfolioSnapshotScheduler
 
-__all__ = ["NewsScheduler"]
\ No newline at end of file
+__all__ = ["NewsScheduler", "PortfolioSnapshotScheduler"]
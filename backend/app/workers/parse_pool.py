@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from multiprocessing.connection import Connection
+from typing import AsyncIterator, Optional
+
+import pandas as pd
+
+from ..config import settings
+from ..metrics import metrics
+from ..services.excel_service import ExcelService
+
+try:
+    import resource
+except ImportError:  # not available on Windows; parsing runs without a memory cap
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Worker processes come from a forkserver: a clean single-threaded process
+# with the parser preloaded, so each fork is cheap and never inherits the
+# API process's event loop, threads or held locks
+_context = multiprocessing.get_context("forkserver")
+_context.set_forkserver_preload([__name__])
+
+
+class ParseError(ValueError):
+    pass
+
+
+class ParseTimeout(ParseError):
+    pass
+
+
+class ParserBusy(Exception):
+    pass
+
+
+def _parse_worker(conn: Connection, path: str, filename: str, chunk_rows: int, memory_limit: int) -> None:
+    """Worker process entry point: parse the file and send cleaned chunks back."""
+    try:
+        if memory_limit > 0 and resource is not None:
+            resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+        with open(path, "rb") as source:
+            for chunk in ExcelService.iter_chunks(source, filename, chunk_rows):
+                conn.send(("chunk", chunk))
+        conn.send(("done", None))
+    except MemoryError:
+        conn.send(("error", "The file needs more memory to process than is allowed"))
+    except Exception as e:
+        conn.send(("error", str(e)))
+    finally:
+        conn.close()
+
+
+class ParsePool:
+    """
+    Parses uploads in separate processes, at most ``workers`` at a time.
+
+    Each job gets its own process, so a job that runs past ``timeout``
+    seconds of parsing, exceeds ``memory_limit_mb`` of address space or is
+    cancelled is killed outright without affecting the others. Chunks come
+    back over a pipe one at a time; while the caller is busy storing one, the
+    worker blocks on the pipe instead of parsing ahead.
+    """
+
+    def __init__(self, workers: int, max_pending: int, timeout: float, memory_limit_mb: int):
+        self.timeout = timeout
+        self.memory_limit = memory_limit_mb * 1024 * 1024
+        self.max_pending = max_pending
+        self._slots = asyncio.Semaphore(workers)
+        self._pending = 0
+
+    async def parse(self, path: str, filename: str, chunk_rows: int) -> AsyncIterator[pd.DataFrame]:
+        """Cleaned holdings chunks of the file at ``path``, parsed in a worker process."""
+        if self._pending >= self.max_pending:
+            metrics.inc("upload_parse_rejected_total")
+            raise ParserBusy("Too many uploads are being processed. Please try again in a moment.")
+
+        self._pending += 1
+        try:
+            async with self._slots:
+                async for chunk in self._run(path, filename, chunk_rows):
+                    yield chunk
+        finally:
+            self._pending -= 1
+
+    async def _run(self, path: str, filename: str, chunk_rows: int) -> AsyncIterator[pd.DataFrame]:
+        receiver, sender = _context.Pipe(duplex=False)
+        process = _context.Process(
+            target=_parse_worker,
+            args=(sender, path, filename, chunk_rows, self.memory_limit),
+            daemon=True,
+        )
+        start = time.perf_counter()
+        # Only time spent waiting on the worker counts against the timeout,
+        # not time the caller spends storing the chunks it was handed
+        remaining = self.timeout
+        try:
+            # Off the loop: the first start waits for the forkserver to boot
+            await asyncio.to_thread(process.start)
+            sender.close()
+            while True:
+                waited = time.perf_counter()
+                message = await self._receive(receiver, remaining)
+                remaining -= time.perf_counter() - waited
+                if message is None:
+                    process.join(timeout=1)
+                    raise ParseError(f"Parser process exited unexpectedly (exit code {process.exitcode})")
+
+                kind, payload = message
+                if kind == "chunk":
+                    yield payload
+                elif kind == "done":
+                    break
+                else:
+                    raise ParseError(payload)
+            metrics.observe("upload_parse_seconds", time.perf_counter() - start)
+        except ParseTimeout:
+            metrics.inc("upload_parse_timeouts_total")
+            raise
+        finally:
+            # Also reached on cancellation and when the caller stops early
+            receiver.close()
+            sender.close()
+            if process.pid is not None:
+                if process.is_alive():
+                    process.kill()
+                process.join(timeout=5)
+
+    async def _receive(self, receiver: Connection, timeout: float) -> Optional[tuple]:
+        """Next message from the worker; None once it has closed its end."""
+        loop = asyncio.get_running_loop()
+        readable = loop.create_future()
+        loop.add_reader(receiver.fileno(), lambda: readable.done() or readable.set_result(None))
+        try:
+            await asyncio.wait_for(readable, timeout=max(0.0, timeout))
+        except asyncio.TimeoutError:
+            raise ParseTimeout(f"Parsing the file took longer than {self.timeout:g} seconds")
+        finally:
+            loop.remove_reader(receiver.fileno())
+
+        # The worker writes each message whole, so once the pipe is readable
+        # this only waits on the transfer; unpickling runs off the loop
+        try:
+            return await asyncio.to_thread(receiver.recv)
+        except EOFError:
+            return None
+
+
+parse_pool = ParsePool(
+    workers=settings.UPLOAD_PARSE_WORKERS,
+    max_pending=settings.UPLOAD_PARSE_MAX_PENDING,
+    timeout=settings.UPLOAD_PARSE_TIMEOUT,
+    memory_limit_mb=settings.UPLOAD_PARSE_MEMORY_LIMIT_MB,
+)
@@ -0,0 +1,163 @@
+import asyncio
+import csv
+import logging
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional, Protocol
+
+from ..config import settings
+from ..database import AsyncSessionLocal
+from ..metrics import metrics
+from ..services.price_service import PriceService, PriceTick
+
+logger = logging.getLogger(__name__)
+
+
+class PriceSource(Protocol):
+    """Anything that yields price ticks; a broker or exchange feed in production."""
+
+    def ticks(self) -> AsyncIterator[PriceTick]:
+        ...
+
+
+def _parse_ts(value: str) -> datetime:
+    ts = datetime.fromisoformat(value.strip())
+    return ts if ts.tzinfo is not None else ts.replace(tzinfo=timezone.utc)
+
+
+class ReplayFileSource:
+    """
+    Replays ticks from a CSV file with ``isin,price,ts`` columns (ts in ISO
+    8601, UTC when no offset is given), in file order.
+
+    ``speed`` 0 replays as fast as the consumer takes them; 1 keeps the
+    recorded gaps between ticks, 10 plays them ten times faster.
+    """
+
+    def __init__(self, path: str, speed: float = 0.0):
+        self.path = Path(path)
+        self.speed = speed
+
+    async def ticks(self) -> AsyncIterator[PriceTick]:
+        previous: Optional[datetime] = None
+        with self.path.open(newline="") as f:
+            for line_no, row in enumerate(csv.DictReader(f), start=2):
+                try:
+                    tick = PriceTick(
+                        isin=row["isin"].strip(),
+                        price=float(row["price"]),
+                        ts=_parse_ts(row["ts"]),
+                    )
+                except (KeyError, ValueError, AttributeError) as e:
+                    logger.warning(f"Skipping malformed tick on line {line_no} of {self.path}: {e}")
+                    continue
+
+                if self.speed > 0 and previous is not None:
+                    gap = (tick.ts - previous).total_seconds() / self.speed
+                    if gap > 0:
+                        await asyncio.sleep(gap)
+                previous = tick.ts
+                yield tick
+                if self.speed <= 0:
+                    # Let the flusher run between ticks of a fast replay
+                    await asyncio.sleep(0)
+
+
+class PriceFeedConsumer:
+    """
+    Coalesces ticks per ISIN and applies them in batches.
+
+    Only the newest tick per ISIN within a batch matters, so a busy feed
+    collapses to at most one revaluation per security per flush. A batch is
+    flushed every ``flush_interval`` seconds, or sooner once it holds
+    ``max_batch`` ISINs. Ticks pass through a bounded queue, so while a slow
+    flush runs the source is paused instead of memory growing.
+    """
+
+    def __init__(self, source: PriceSource, flush_interval: float = 1.0, max_batch: int = 5000):
+        self.source = source
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._pending: Dict[str, PriceTick] = {}
+
+    def _add(self, tick: PriceTick) -> None:
+        current = self._pending.get(tick.isin)
+        if current is None or tick.ts >= current.ts:
+            self._pending[tick.isin] = tick
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+        batch = list(self._pending.values())
+        self._pending = {}
+
+        start = time.perf_counter()
+        try:
+            async with AsyncSessionLocal() as db:
+                result = await PriceService.apply_ticks(db, batch)
+        except Exception as e:
+            # Keep the newer ticks that arrived since; otherwise retry these
+            for tick in batch:
+                self._pending.setdefault(tick.isin, tick)
+            metrics.inc("price_feed_flush_errors_total")
+            logger.error(f"Price batch of {len(batch)} ISINs failed, will retry: {e}")
+            return
+
+        metrics.observe("price_feed_flush_seconds", time.perf_counter() - start)
+        metrics.inc("price_feed_prices_updated_total", value=result.prices_updated)
+        metrics.inc("price_feed_holdings_revalued_total", value=result.holdings_revalued)
+        logger.debug(
+            f"Applied {len(batch)} prices: {result.prices_updated} updated, "
+            f"{result.holdings_revalued} holdings of {len(result.users_affected)} users revalued"
+        )
+
+    async def _read(self, queue: "asyncio.Queue[Optional[PriceTick]]") -> None:
+        try:
+            async for tick in self.source.ticks():
+                await queue.put(tick)
+        finally:
+            await queue.put(None)
+
+    async def run(self) -> None:
+        """Consume the source until it ends, flushing whatever is left."""
+        queue: "asyncio.Queue[Optional[PriceTick]]" = asyncio.Queue(maxsize=self.max_batch)
+        # Reading in its own task: timing out a wait on the queue is safe,
+        # cancelling the source's generator mid-step is not
+        reader = asyncio.create_task(self._read(queue))
+        deadline = time.monotonic() + self.flush_interval
+        try:
+            while True:
+                try:
+                    tick = await asyncio.wait_for(
+                        queue.get(), timeout=max(0.0, deadline - time.monotonic())
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                else:
+                    if tick is None:
+                        break
+                    metrics.inc("price_feed_ticks_total")
+                    self._add(tick)
+
+                if len(self._pending) >= self.max_batch or time.monotonic() >= deadline:
+                    await self.flush()
+                    deadline = time.monotonic() + self.flush_interval
+            await self.flush()
+        except BaseException:
+            reader.cancel()
+            raise
+        # The reader queues the end marker on failure too; surface the error
+        await reader
+
+
+def configured_consumer() -> Optional[PriceFeedConsumer]:
+    """The consumer for the configured source, or None when no feed is set up."""
+    if not settings.PRICE_FEED_REPLAY_FILE:
+        return None
+    source = ReplayFileSource(settings.PRICE_FEED_REPLAY_FILE, speed=settings.PRICE_FEED_REPLAY_SPEED)
+    return PriceFeedConsumer(
+        source,
+        flush_interval=settings.PRICE_FEED_FLUSH_INTERVAL,
+        max_batch=settings.PRICE_FEED_MAX_BATCH,
+    )
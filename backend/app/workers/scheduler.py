@@ -1,7 +1,14 @@
+import logging
+from datetime import datetime
+
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from ..config import settings
 from ..services.news_service import NewsService
+from ..services.portfolio_history import PortfolioHistoryService
 from ..database import get_db
 
+logger = logging.getLogger(__name__)
+
 
 class NewsScheduler:
     def __init__(self, news_service: NewsService):
@@ -20,3 +27,40 @@ class NewsScheduler:
 
     def shutdown(self):
         self.scheduler.shutdown()
+
+
+class PortfolioSnapshotScheduler:
+    """
+    Snapshots every user's portfolio on an interval. Each run overwrites the
+    current day's rows, so running it in several processes is harmless.
+    """
+
+    def __init__(self, interval_minutes: int):
+        self.scheduler = AsyncIOScheduler()
+        self.interval_minutes = interval_minutes
+
+    async def snapshot_job(self):
+        async for db in get_db():
+            rows = await PortfolioHistoryService.take_snapshots(db)
+            logger.info(f"Took {rows} portfolio snapshots")
+
+    def start(self):
+        self.scheduler.add_job(
+            self.snapshot_job,
+            "interval",
+            minutes=self.interval_minutes,
+            next_run_time=datetime.now(),
+            max_instances=1,
+            coalesce=True,
+        )
+        self.scheduler.start()
+
+    def shutdown(self):
+        self.scheduler.shutdown()
+
+
+def configured_snapshot_scheduler():
+    """The snapshot scheduler, or None when snapshots are disabled."""
+    if settings.PORTFOLIO_SNAPSHOT_INTERVAL <= 0:
+        return None
+    return PortfolioSnapshotScheduler(settings.PORTFOLIO_SNAPSHOT_INTERVAL)
@@ -0,0 +1,509 @@
+import asyncio
+import json
+import logging
+import os
+import shutil
+import uuid
+from contextlib import aclosing, asynccontextmanager, suppress
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import IO, AsyncIterator, Dict, Optional, Set
+
+import pandas as pd
+
+from ..cache import wait_for_invalidations
+from ..config import settings
+from ..database import AsyncSessionLocal, get_redis
+from ..metrics import metrics
+from ..services.holding_service import HoldingService
+from .parse_pool import ParseError, ParserBusy, parse_pool
+
+logger = logging.getLogger(__name__)
+
+# Redis layout: a hash per job, a queue of job IDs and the IDs currently
+# claimed by a worker (so jobs of a crashed worker can be put back), plus per
+# user the jobs not finished yet and the jobs running right now. Running jobs
+# are a set rather than a counter so releasing a slot twice, or after the key
+# expired, cannot push the count below zero
+JOB_KEY = "upload_job:{}"
+QUEUE_KEY = "upload_jobs:queue"
+PROCESSING_KEY = "upload_jobs:processing"
+USER_ACTIVE_KEY = "upload_jobs:user:{}:active"
+USER_RUNNING_KEY = "upload_jobs:user:{}:running_jobs"
+PROGRESS_CHANNEL = "upload_job:{}:progress"
+PROGRESS_PATTERN = PROGRESS_CHANNEL.format("*")
+
+QUEUED = "queued"
+PARSING = "parsing"
+MERGING = "merging"
+COMPLETED = "completed"
+FAILED = "failed"
+FINISHED_STAGES = (COMPLETED, FAILED)
+
+# Seconds a watcher waits for progress before re-reading the job, and before
+# a worker retries a job whose owner is already at the concurrency limit
+QUEUE_POLL_TIMEOUT = 5
+REQUEUE_DELAY = 1.0
+
+# A running job touches its state this often, so a long parse or merge is
+# not mistaken for the job of a dead worker and its user's slot stays held
+HEARTBEAT_INTERVAL = max(1.0, settings.UPLOAD_JOB_STALE_AFTER / 4)
+
+# BLMOVE blocks on the server, so its reply has to arrive well within the
+# client's socket timeout; otherwise every idle poll fails client-side, and a
+# job moved just as the client gives up sits in the processing list unseen
+QUEUE_BLOCK_TIMEOUT = max(0.1, min(2.0, settings.REDIS_SOCKET_TIMEOUT / 2))
+
+# Progress states buffered per watcher; a slow one drops the oldest, since
+# only the latest state matters
+WATCHER_QUEUE_SIZE = 16
+
+
+class UploadJobsBusy(Exception):
+    pass
+
+
+@dataclass
+class UploadJobState:
+    id: str
+    user_id: int
+    filename: str
+    stage: str
+    rows_parsed: int = 0
+    rows_upserted: int = 0
+    created: int = 0
+    updated: int = 0
+    deleted: int = 0
+    skipped: int = 0
+    unchanged: int = 0
+    duplicate: bool = False
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.stage in FINISHED_STAGES
+
+    @classmethod
+    def from_hash(cls, job_id: str, data: Dict) -> "UploadJobState":
+        data = {
+            (k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+            for k, v in data.items()
+        }
+        return cls(
+            id=job_id,
+            user_id=int(data["user_id"]),
+            filename=data.get("filename", ""),
+            stage=data.get("stage", QUEUED),
+            rows_parsed=int(data.get("rows_parsed", 0)),
+            rows_upserted=int(data.get("rows_upserted", 0)),
+            created=int(data.get("created", 0)),
+            updated=int(data.get("updated", 0)),
+            deleted=int(data.get("deleted", 0)),
+            skipped=int(data.get("skipped", 0)),
+            unchanged=int(data.get("unchanged", 0)),
+            duplicate=data.get("duplicate") in ("1", 1, True),
+            error=data.get("error") or None,
+            created_at=_parse_time(data.get("created_at")),
+            updated_at=_parse_time(data.get("updated_at")),
+        )
+
+    def to_json(self) -> str:
+        payload = asdict(self)
+        for field in ("created_at", "updated_at"):
+            if payload[field] is not None:
+                payload[field] = payload[field].isoformat()
+        return json.dumps(payload)
+
+    @classmethod
+    def from_json(cls, raw) -> "UploadJobState":
+        payload = json.loads(raw)
+        return cls.from_hash(payload["id"], {k: v for k, v in payload.items() if v is not None})
+
+
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _job_path(job_id: str, filename: str) -> Path:
+    return Path(settings.upload_dir) / f"{job_id}{Path(filename).suffix.lower()}"
+
+
+async def enqueue_upload(
+    user_id: int,
+    filename: str,
+    source: IO[bytes],
+    replace: bool = False,
+    file_sha256: Optional[str] = None,
+) -> UploadJobState:
+    """
+    Store a spooled upload under ``upload_dir`` and queue a job for it.
+    With the file's ``file_sha256`` the job is skipped when it repeats the
+    user's last upload.
+
+    The file must stay readable by every process running upload workers, so
+    ``upload_dir`` has to be shared storage when there is more than one host.
+    """
+    async with get_redis() as redis:
+        if await redis.scard(USER_ACTIVE_KEY.format(user_id)) >= settings.UPLOAD_JOB_MAX_ACTIVE_PER_USER:
+            raise UploadJobsBusy(
+                "You already have uploads being processed. Please wait for them to finish."
+            )
+
+        job_id = uuid.uuid4().hex
+        path = _job_path(job_id, filename)
+        await asyncio.to_thread(_store_file, source, path)
+
+        now = _now()
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.hset(JOB_KEY.format(job_id), mapping={
+                "user_id": user_id,
+                "filename": filename,
+                "path": str(path),
+                "replace": int(replace),
+                "file_sha256": file_sha256 or "",
+                "stage": QUEUED,
+                "created_at": now,
+                "updated_at": now,
+            })
+            pipe.expire(JOB_KEY.format(job_id), settings.UPLOAD_JOB_TTL)
+            pipe.sadd(USER_ACTIVE_KEY.format(user_id), job_id)
+            pipe.expire(USER_ACTIVE_KEY.format(user_id), settings.UPLOAD_JOB_TTL)
+            pipe.lpush(QUEUE_KEY, job_id)
+            await pipe.execute()
+
+    metrics.inc("upload_jobs_enqueued_total")
+    logger.info(f"Queued upload job {job_id} for user {user_id}: {filename}")
+    return UploadJobState(
+        id=job_id,
+        user_id=user_id,
+        filename=filename,
+        stage=QUEUED,
+        created_at=_parse_time(now),
+        updated_at=_parse_time(now),
+    )
+
+
+def _store_file(source: IO[bytes], path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        # A named spool file on the same filesystem is linked, not copied
+        os.link(source.name, path)
+    except (AttributeError, OSError):
+        source.seek(0)
+        with open(path, "wb") as target:
+            shutil.copyfileobj(source, target)
+
+
+async def get_job(job_id: str) -> Optional[UploadJobState]:
+    async with get_redis() as redis:
+        data = await redis.hgetall(JOB_KEY.format(job_id))
+    return UploadJobState.from_hash(job_id, data) if data else None
+
+
+async def _update_job(job_id: str, **fields) -> Optional[UploadJobState]:
+    """Update a job's hash and announce its new state to subscribers."""
+    fields["updated_at"] = _now()
+    async with get_redis() as redis:
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.hset(JOB_KEY.format(job_id), mapping={
+                k: ("" if v is None else v) for k, v in fields.items()
+            })
+            pipe.hgetall(JOB_KEY.format(job_id))
+            _, data = await pipe.execute()
+        state = UploadJobState.from_hash(job_id, data)
+        await redis.publish(PROGRESS_CHANNEL.format(job_id), state.to_json())
+    return state
+
+
+class ProgressHub:
+    """
+    Fans job progress out to this process's watchers from one pattern
+    subscription, so an open progress subscription costs a local queue
+    rather than a pooled Redis connection. The subscription is only held
+    while someone here is watching.
+    """
+
+    def __init__(self):
+        self._watchers: Dict[str, Set[asyncio.Queue]] = {}
+        self._listener: Optional[asyncio.Task] = None
+        self._subscribed = asyncio.Event()
+
+    @asynccontextmanager
+    async def watch(self, job_id: str) -> AsyncIterator["asyncio.Queue[UploadJobState]"]:
+        queue: "asyncio.Queue[UploadJobState]" = asyncio.Queue(maxsize=WATCHER_QUEUE_SIZE)
+        self._watchers.setdefault(job_id, set()).add(queue)
+        if self._listener is None or self._listener.done():
+            self._subscribed.clear()
+            self._listener = asyncio.create_task(self._listen())
+        try:
+            # Watchers re-read the job when quiet, so a Redis outage only
+            # delays them rather than leaving them waiting here
+            try:
+                await asyncio.wait_for(self._subscribed.wait(), timeout=QUEUE_POLL_TIMEOUT)
+            except asyncio.TimeoutError:
+                pass
+            yield queue
+        finally:
+            queues = self._watchers.get(job_id)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    del self._watchers[job_id]
+            if not self._watchers and self._listener is not None:
+                self._listener.cancel()
+                self._listener = None
+
+    def _dispatch(self, message: Dict) -> None:
+        channel = message["channel"]
+        if isinstance(channel, bytes):
+            channel = channel.decode()
+        queues = self._watchers.get(channel.split(":")[1])
+        if not queues:
+            return
+        try:
+            state = UploadJobState.from_json(message["data"])
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring malformed upload progress on {channel}: {e}")
+            return
+        for queue in queues:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(state)
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with get_redis() as redis:
+                    pubsub = redis.pubsub()
+                    await pubsub.psubscribe(PROGRESS_PATTERN)
+                    self._subscribed.set()
+                    try:
+                        while True:
+                            message = await pubsub.get_message(
+                                ignore_subscribe_messages=True, timeout=1.0
+                            )
+                            if message is not None:
+                                self._dispatch(message)
+                    finally:
+                        self._subscribed.clear()
+                        await pubsub.punsubscribe(PROGRESS_PATTERN)
+                        await pubsub.aclose()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Upload progress listener failed, retrying: {e}")
+                await asyncio.sleep(1)
+
+
+progress_hub = ProgressHub()
+
+
+async def watch_job(job_id: str) -> AsyncIterator[UploadJobState]:
+    """The job's state now and after every change, until it finishes."""
+    async with progress_hub.watch(job_id) as updates:
+        # Read after subscribing so no update can fall in between
+        state = await get_job(job_id)
+        if state is None:
+            return
+        yield state
+        while not state.finished:
+            try:
+                state = await asyncio.wait_for(updates.get(), timeout=QUEUE_POLL_TIMEOUT)
+                yield state
+                continue
+            except asyncio.TimeoutError:
+                pass
+            # Quiet for a while: re-read in case a message was missed
+            latest = await get_job(job_id)
+            if latest is None:
+                return
+            if latest.updated_at != state.updated_at:
+                state = latest
+                yield state
+
+
+class UploadJobWorkers:
+    """
+    Runs queued upload jobs, ``workers`` at a time per process and at most
+    ``UPLOAD_JOB_USER_CONCURRENCY`` at a time per user across all processes.
+    Parsing itself is further bounded by the parse pool.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+
+    async def run(self) -> None:
+        await self.recover_stale_jobs()
+        await asyncio.gather(*(self._work() for _ in range(self.workers)))
+
+    async def recover_stale_jobs(self) -> None:
+        """Queue claimed jobs again whose worker stopped reporting progress."""
+        cutoff = datetime.now(timezone.utc).timestamp() - settings.UPLOAD_JOB_STALE_AFTER
+        async with get_redis() as redis:
+            claimed = await redis.lrange(PROCESSING_KEY, 0, -1)
+            for raw in claimed:
+                job_id = raw.decode() if isinstance(raw, bytes) else raw
+                state = await get_job(job_id)
+                if state is not None and state.updated_at and state.updated_at.timestamp() > cutoff:
+                    continue
+                if await redis.lrem(PROCESSING_KEY, 1, job_id) and state is not None:
+                    logger.warning(f"Re-queueing stale upload job {job_id} ({state.stage})")
+                    await redis.srem(USER_RUNNING_KEY.format(state.user_id), job_id)
+                    await _update_job(job_id, stage=QUEUED)
+                    await redis.lpush(QUEUE_KEY, job_id)
+
+    async def _work(self) -> None:
+        while True:
+            try:
+                async with get_redis() as redis:
+                    raw = await redis.blmove(QUEUE_KEY, PROCESSING_KEY, QUEUE_BLOCK_TIMEOUT, "RIGHT", "LEFT")
+                if raw is None:
+                    continue
+                await self._claim(raw.decode() if isinstance(raw, bytes) else raw)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Upload job worker error: {e}")
+                await asyncio.sleep(REQUEUE_DELAY)
+
+    async def _claim(self, job_id: str) -> None:
+        async with get_redis() as redis:
+            data = await redis.hgetall(JOB_KEY.format(job_id))
+            if not data:
+                await redis.lrem(PROCESSING_KEY, 1, job_id)
+                return
+            state = UploadJobState.from_hash(job_id, data)
+            running_key = USER_RUNNING_KEY.format(state.user_id)
+            async with redis.pipeline(transaction=True) as pipe:
+                pipe.sadd(running_key, job_id)
+                # Expires so the slot of a worker that died mid-job comes back
+                pipe.expire(running_key, settings.UPLOAD_JOB_STALE_AFTER)
+                pipe.scard(running_key)
+                *_, running = await pipe.execute()
+            if running > settings.UPLOAD_JOB_USER_CONCURRENCY:
+                # The owner is at the limit: back of the queue for now
+                await self._requeue(job_id, running_key)
+                return
+
+        finished = False
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, running_key))
+        try:
+            finished = await self._process(state, data)
+        finally:
+            heartbeat.cancel()
+            with suppress(asyncio.CancelledError):
+                await heartbeat
+            if not finished:
+                await self._requeue(job_id, running_key)
+            else:
+                async with get_redis() as redis:
+                    async with redis.pipeline(transaction=True) as pipe:
+                        pipe.srem(running_key, job_id)
+                        pipe.srem(USER_ACTIVE_KEY.format(state.user_id), job_id)
+                        pipe.lrem(PROCESSING_KEY, 1, job_id)
+                        pipe.expire(JOB_KEY.format(job_id), settings.UPLOAD_JOB_TTL)
+                        await pipe.execute()
+
+    async def _requeue(self, job_id: str, running_key: str) -> None:
+        """Give up the claim on a job and put it at the back of the queue."""
+        async with get_redis() as redis:
+            async with redis.pipeline(transaction=True) as pipe:
+                pipe.srem(running_key, job_id)
+                pipe.lrem(PROCESSING_KEY, 1, job_id)
+                pipe.lpush(QUEUE_KEY, job_id)
+                await pipe.execute()
+        await asyncio.sleep(REQUEUE_DELAY)
+
+    async def _heartbeat(self, job_id: str, running_key: str) -> None:
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            try:
+                async with get_redis() as redis:
+                    async with redis.pipeline(transaction=True) as pipe:
+                        pipe.hset(JOB_KEY.format(job_id), "updated_at", _now())
+                        pipe.expire(running_key, settings.UPLOAD_JOB_STALE_AFTER)
+                        await pipe.execute()
+            except Exception as e:
+                logger.warning(f"Upload job {job_id} heartbeat failed: {e}")
+
+    async def _process(self, state: UploadJobState, data: Dict) -> bool:
+        """
+        Run the job to completion or failure. False means it never started
+        because the parse pool was full, and should be queued again.
+        """
+        fields = {
+            (k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+            for k, v in data.items()
+        }
+        path = fields["path"]
+        replace = fields.get("replace") == "1"
+        file_sha256 = fields.get("file_sha256") or None
+        job_id = state.id
+        rows_parsed = 0
+
+        async def tracked_chunks() -> AsyncIterator[pd.DataFrame]:
+            nonlocal rows_parsed
+            async with aclosing(
+                parse_pool.parse(path, state.filename, settings.upload_chunk_rows)
+            ) as chunks:
+                async for chunk in chunks:
+                    rows_parsed += len(chunk)
+                    await _update_job(job_id, rows_parsed=rows_parsed)
+                    yield chunk
+            await _update_job(job_id, stage=MERGING)
+
+        try:
+            await _update_job(job_id, stage=PARSING, error=None)
+            async with AsyncSessionLocal() as db:
+                try:
+                    async with aclosing(tracked_chunks()) as chunks:
+                        result = await HoldingService.ingest_chunks(
+                            db, chunks, state.user_id, replace=replace, file_sha256=file_sha256
+                        )
+                finally:
+                    await wait_for_invalidations(db)
+
+            await _update_job(
+                job_id,
+                stage=COMPLETED,
+                rows_upserted=result['total_processed'],
+                created=result['created'],
+                updated=result['updated'],
+                deleted=result['deleted'],
+                skipped=result['skipped'],
+                unchanged=result['unchanged'],
+                duplicate=int(result['duplicate']),
+            )
+            metrics.inc("upload_jobs_completed_total")
+            if result['duplicate']:
+                metrics.inc("upload_jobs_duplicate_total")
+            logger.info(f"Upload job {job_id} completed: {result}")
+        except ParserBusy:
+            # Raised before the first chunk, so nothing was stored: the job
+            # was accepted and simply waits for a free parser
+            metrics.inc("upload_jobs_requeued_total")
+            await _update_job(job_id, stage=QUEUED)
+            return False
+        except ParseError as e:
+            metrics.inc("upload_jobs_failed_total")
+            await _update_job(job_id, stage=FAILED, error=f"Could not read the file: {e}")
+        except Exception as e:
+            metrics.inc("upload_jobs_failed_total")
+            logger.error(f"Upload job {job_id} failed: {e}", exc_info=True)
+            await _update_job(job_id, stage=FAILED, error="An unexpected error occurred. Please try again.")
+        await asyncio.to_thread(Path(path).unlink, True)
+        return True
+
+
+def configured_upload_workers() -> Optional[UploadJobWorkers]:
+    """The upload job workers for this process, or None when disabled."""
+    if settings.UPLOAD_JOB_WORKERS <= 0:
+        return None
+    return UploadJobWorkers(settings.UPLOAD_JOB_WORKERS)
@@ -0,0 +1,108 @@
+"""Baseline schema
+
+The tables as Base.metadata.create_all() used to create them. Databases that
+were set up that way are stamped at this revision by init_db() instead of
+running it.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("hashed_password", sa.String(), nullable=False),
+        sa.Column("first_name", sa.String(), nullable=False),
+        sa.Column("last_name", sa.String(), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "articles",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("content", sa.Text(), nullable=True),
+        sa.Column("url", sa.String(), nullable=False, unique=True),
+        sa.Column("source", sa.String(), nullable=False),
+        sa.Column("author", sa.String(), nullable=True),
+        sa.Column("published_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("ticker", sa.String(), nullable=True),
+        sa.Column("sector", sa.String(), nullable=True),
+        sa.Column("is_processed", sa.Boolean(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=True),
+    )
+    op.create_index("ix_articles_id", "articles", ["id"])
+    op.create_index("ix_articles_ticker", "articles", ["ticker"])
+
+    op.create_table(
+        "holdings",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("client_id", sa.String(), nullable=True),
+        sa.Column("company_name", sa.String(), nullable=True),
+        sa.Column("isin", sa.String(), nullable=True),
+        sa.Column("market_cap", sa.Float(), nullable=True),
+        sa.Column("sector", sa.String(), nullable=True),
+        sa.Column("total_quantity", sa.Integer(), nullable=True),
+        sa.Column("avg_trading_price", sa.Float(), nullable=True),
+        sa.Column("ltp", sa.Float(), nullable=True),
+        sa.Column("invested_value", sa.Float(), nullable=True),
+        sa.Column("market_value", sa.Float(), nullable=True),
+        sa.Column("overall_gain_loss", sa.Float(), nullable=True),
+        sa.Column("stcg_quantity", sa.Integer(), nullable=True),
+        sa.Column("stcg_value", sa.Float(), nullable=True),
+    )
+    op.create_index("ix_holdings_id", "holdings", ["id"])
+    op.create_index("ix_holdings_company_name", "holdings", ["company_name"])
+    op.create_index("ix_holdings_isin", "holdings", ["isin"])
+
+    op.create_table(
+        "sentiments",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("article_id", sa.Integer(), sa.ForeignKey("articles.id"), nullable=False),
+        sa.Column("ticker", sa.String(), nullable=False),
+        sa.Column("sentiment_score", sa.Float(), nullable=False),
+        sa.Column("sentiment_label", sa.String(), nullable=False),
+        sa.Column("confidence", sa.Float(), nullable=False),
+        sa.Column("recommendation", sa.String(), nullable=False),
+        sa.Column("analysis_model", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=True),
+    )
+    op.create_index("ix_sentiments_id", "sentiments", ["id"])
+    op.create_index("ix_sentiments_ticker", "sentiments", ["ticker"])
+
+    op.create_table(
+        "watchlists",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("ticker", sa.String(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("sector", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=True),
+    )
+    op.create_index("ix_watchlists_id", "watchlists", ["id"])
+    op.create_index("ix_watchlists_ticker", "watchlists", ["ticker"])
+
+
+def downgrade() -> None:
+    op.drop_table("watchlists")
+    op.drop_table("sentiments")
+    op.drop_table("holdings")
+    op.drop_table("articles")
+    op.drop_table("users")
@@ -0,0 +1,47 @@
+"""Holdings ticker column and upsert conflict key
+
+Adds holdings.ticker and the unique (user_id, isin, coalesce(client_id, ''))
+index that the set-based holdings upsert uses as its ON CONFLICT target.
+Duplicate rows left by the old row-by-row upload are collapsed first,
+keeping the most recent one.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("holdings", sa.Column("ticker", sa.String(), nullable=True))
+    op.create_index("ix_holdings_ticker", "holdings", ["ticker"])
+
+    op.execute(
+        """
+        DELETE FROM holdings h
+        USING holdings newer
+        WHERE newer.user_id = h.user_id
+          AND newer.isin = h.isin
+          AND coalesce(newer.client_id, '') = coalesce(h.client_id, '')
+          AND newer.id > h.id
+        """
+    )
+    op.create_index(
+        "uq_holdings_user_isin_client",
+        "holdings",
+        ["user_id", "isin", sa.text("coalesce(client_id, '')")],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("uq_holdings_user_isin_client", table_name="holdings")
+    op.drop_index("ix_holdings_ticker", table_name="holdings")
+    op.drop_column("holdings", "ticker")
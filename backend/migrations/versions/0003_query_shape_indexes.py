@@ -0,0 +1,75 @@
+"""Composite and covering indexes for the API's query shapes
+
+- articles (published_at, id) and (ticker, published_at, id): recent_articles,
+  the articles connection and the per-ticker article loader.
+- sentiments (ticker, created_at, id) INCLUDE (score, label, confidence):
+  sentiment_analysis, the sentiments connection, and the summary loader as an
+  index-only scan.
+- holdings (user_id) INCLUDE (market_value, invested_value, overall_gain_loss):
+  per-user holdings lookups and portfolio totals.
+- watchlists (user_id, ticker): per-user watchlist lookups.
+
+The single-column ticker indexes on articles and sentiments are prefixes of
+the new composites and are dropped. Indexes are built CONCURRENTLY so the
+tables stay writable during the upgrade.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_articles_published_at_id",
+            "articles",
+            ["published_at", "id"],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_articles_ticker_published_at_id",
+            "articles",
+            ["ticker", "published_at", "id"],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_sentiments_ticker_created_at_id",
+            "sentiments",
+            ["ticker", "created_at", "id"],
+            postgresql_include=["sentiment_score", "sentiment_label", "confidence"],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_holdings_user_id_values",
+            "holdings",
+            ["user_id"],
+            postgresql_include=["market_value", "invested_value", "overall_gain_loss"],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_watchlists_user_id_ticker",
+            "watchlists",
+            ["user_id", "ticker"],
+            postgresql_concurrently=True,
+        )
+        op.drop_index("ix_articles_ticker", table_name="articles", postgresql_concurrently=True)
+        op.drop_index("ix_sentiments_ticker", table_name="sentiments", postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index("ix_sentiments_ticker", "sentiments", ["ticker"], postgresql_concurrently=True)
+        op.create_index("ix_articles_ticker", "articles", ["ticker"], postgresql_concurrently=True)
+        op.drop_index("ix_watchlists_user_id_ticker", table_name="watchlists", postgresql_concurrently=True)
+        op.drop_index("ix_holdings_user_id_values", table_name="holdings", postgresql_concurrently=True)
+        op.drop_index("ix_sentiments_ticker_created_at_id", table_name="sentiments", postgresql_concurrently=True)
+        op.drop_index("ix_articles_ticker_published_at_id", table_name="articles", postgresql_concurrently=True)
+        op.drop_index("ix_articles_published_at_id", table_name="articles", postgresql_concurrently=True)
@@ -0,0 +1,58 @@
+"""Daily sentiment rollup
+
+Creates sentiment_daily, keyed by (ticker, day, model), and backfills it from
+the existing sentiments.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "sentiment_daily",
+        sa.Column("ticker", sa.String(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("model", sa.String(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.Column("score_sum", sa.Float(), nullable=False),
+        sa.Column("score_sq_sum", sa.Float(), nullable=False),
+        sa.Column("positive_count", sa.Integer(), nullable=False),
+        sa.Column("negative_count", sa.Integer(), nullable=False),
+        sa.Column("neutral_count", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=True),
+        sa.PrimaryKeyConstraint("ticker", "day", "model"),
+    )
+    op.execute(
+        """
+        INSERT INTO sentiment_daily (
+            ticker, day, model, count, score_sum, score_sq_sum,
+            positive_count, negative_count, neutral_count
+        )
+        SELECT
+            ticker,
+            (created_at AT TIME ZONE 'UTC')::date,
+            analysis_model,
+            count(*),
+            sum(sentiment_score),
+            sum(sentiment_score * sentiment_score),
+            count(*) FILTER (WHERE upper(sentiment_label) = 'POSITIVE'),
+            count(*) FILTER (WHERE upper(sentiment_label) = 'NEGATIVE'),
+            count(*) FILTER (WHERE upper(sentiment_label) NOT IN ('POSITIVE', 'NEGATIVE'))
+        FROM sentiments
+        GROUP BY 1, 2, 3
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("sentiment_daily")
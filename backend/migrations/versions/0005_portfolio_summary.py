@@ -0,0 +1,85 @@
+"""Per-user portfolio summary
+
+Creates portfolio_summary and portfolio_sector_counts and backfills both from
+the current holdings. Top/worst holdings are left stale so the first read
+derives them.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "portfolio_summary",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("holdings_count", sa.Integer(), nullable=False),
+        sa.Column("sectors_count", sa.Integer(), nullable=False),
+        sa.Column("total_market_value", sa.Float(), nullable=False),
+        sa.Column("total_invested_value", sa.Float(), nullable=False),
+        sa.Column("total_gain_loss", sa.Float(), nullable=False),
+        sa.Column("gain_percent_sum", sa.Float(), nullable=False),
+        sa.Column("gain_percent_count", sa.Integer(), nullable=False),
+        sa.Column("top_holding_id", sa.Integer(), nullable=True),
+        sa.Column("top_company_name", sa.String(), nullable=True),
+        sa.Column("top_gain_loss", sa.Float(), nullable=True),
+        sa.Column("worst_holding_id", sa.Integer(), nullable=True),
+        sa.Column("worst_company_name", sa.String(), nullable=True),
+        sa.Column("worst_gain_loss", sa.Float(), nullable=True),
+        sa.Column("extremes_stale", sa.Boolean(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=True),
+    )
+    op.create_table(
+        "portfolio_sector_counts",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("sector", sa.String(), nullable=False),
+        sa.Column("holdings_count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("user_id", "sector"),
+    )
+
+    op.execute(
+        """
+        INSERT INTO portfolio_sector_counts (user_id, sector, holdings_count)
+        SELECT user_id, sector, count(*)
+        FROM holdings
+        WHERE user_id IS NOT NULL AND sector IS NOT NULL AND sector <> ''
+        GROUP BY user_id, sector
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO portfolio_summary (
+            user_id, holdings_count, sectors_count, total_market_value,
+            total_invested_value, total_gain_loss, gain_percent_sum,
+            gain_percent_count, extremes_stale
+        )
+        SELECT
+            u.id,
+            count(h.id),
+            count(DISTINCT h.sector) FILTER (WHERE h.sector <> ''),
+            coalesce(sum(h.market_value), 0),
+            coalesce(sum(h.invested_value), 0),
+            coalesce(sum(h.overall_gain_loss), 0),
+            coalesce(sum(h.overall_gain_loss / h.invested_value * 100)
+                     FILTER (WHERE h.invested_value > 0 AND h.overall_gain_loss IS NOT NULL), 0),
+            count(h.id) FILTER (WHERE h.invested_value > 0 AND h.overall_gain_loss IS NOT NULL),
+            true
+        FROM users u
+        LEFT JOIN holdings h ON h.user_id = u.id
+        GROUP BY u.id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("portfolio_sector_counts")
+    op.drop_table("portfolio_summary")
@@ -0,0 +1,34 @@
+"""Security prices from the price feed
+
+Creates security_prices, the latest price and previous close per ISIN that
+the feed consumer maintains and revalues holdings from. Starts empty: the
+first trading day after deployment has no previous close yet.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "security_prices",
+        sa.Column("isin", sa.String(), primary_key=True),
+        sa.Column("price", sa.Float(), nullable=False),
+        sa.Column("price_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("prev_close", sa.Float(), nullable=True),
+        sa.Column("prev_close_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("security_prices")
@@ -0,0 +1,39 @@
+"""Daily portfolio snapshots
+
+Creates portfolio_snapshots, one row per user per trading day with the
+portfolio totals and the sector weights as parallel arrays. Starts empty;
+history accumulates from the first snapshot job run.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "portfolio_snapshots",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("taken_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("market_value", sa.Float(), nullable=False),
+        sa.Column("invested_value", sa.Float(), nullable=False),
+        sa.Column("gain_loss", sa.Float(), nullable=False),
+        sa.Column("holdings_count", sa.Integer(), nullable=False),
+        sa.Column("sectors", postgresql.ARRAY(sa.String()), nullable=False),
+        sa.Column("sector_weights", postgresql.ARRAY(sa.REAL()), nullable=False),
+        sa.PrimaryKeyConstraint("user_id", "day"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("portfolio_snapshots")
@@ -0,0 +1,38 @@
+"""Idempotent holdings uploads
+
+Adds holdings.row_hash, the digest of each row as last uploaded, and
+holding_upload_state with the fingerprint of each user's last upload.
+Existing rows start without a hash, so the first upload after this
+migration rewrites them once.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("holdings", sa.Column("row_hash", sa.String(32), nullable=True))
+    op.create_table(
+        "holding_upload_state",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("file_sha256", sa.String(64), nullable=False),
+        sa.Column("replace", sa.Boolean(), nullable=False),
+        sa.Column("holdings_digest", sa.String(32), nullable=False),
+        sa.Column("holdings_count", sa.Integer(), nullable=False),
+        sa.Column("uploaded_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.PrimaryKeyConstraint("user_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("holding_upload_state")
+    op.drop_column("holdings", "row_hash")
@@ -0,0 +1,185 @@
+"""
+EXPLAIN checks for the API's hot query shapes.
+
+Runs EXPLAIN (FORMAT JSON) for each query the resolvers and loaders issue and
+fails if the plan does not use the index the migrations added for it.
+Sequential scans are disabled for the session so the checks are meaningful on
+small development databases, where the planner would otherwise prefer them.
+
+Usage (from the backend directory, after `alembic upgrade head`):
+
+    python -m scripts.explain_checks
+"""
+import asyncio
+import json
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Set, Tuple
+
+from sqlalchemy import text
+
+from app.database import engine
+
+NOW = datetime.now(timezone.utc)
+
+# (description, SQL, parameters, index names that satisfy the check)
+CHECKS: List[Tuple[str, str, Dict[str, Any], Set[str]]] = [
+    (
+        "sentiment_analysis: ticker + created_at window, newest first",
+        """
+        SELECT * FROM sentiments
+        WHERE ticker = :ticker AND created_at >= :since
+        ORDER BY created_at DESC
+        """,
+        {"ticker": "INFY", "since": NOW - timedelta(days=7)},
+        {"ix_sentiments_ticker_created_at_id"},
+    ),
+    (
+        "sentiments connection: keyset page per ticker",
+        """
+        SELECT * FROM sentiments
+        WHERE ticker = :ticker AND (created_at, id) < (:created_at, :id)
+        ORDER BY created_at DESC, id DESC
+        LIMIT 21
+        """,
+        {"ticker": "INFY", "created_at": NOW, "id": 1000},
+        {"ix_sentiments_ticker_created_at_id"},
+    ),
+    (
+        "sentimentSummary loader: aggregate over the window",
+        """
+        SELECT ticker, count(id), avg(sentiment_score), avg(confidence), max(created_at)
+        FROM sentiments
+        WHERE ticker = ANY(:tickers) AND created_at >= :since
+        GROUP BY ticker
+        """,
+        {"tickers": ["INFY", "TCS"], "since": NOW - timedelta(days=7)},
+        {"ix_sentiments_ticker_created_at_id"},
+    ),
+    (
+        "sentimentTrend: daily rollup rows for one ticker",
+        """
+        SELECT date_trunc('week', day), sum(count), sum(score_sum)
+        FROM sentiment_daily
+        WHERE ticker = :ticker AND day >= :start AND day <= :end
+        GROUP BY 1
+        """,
+        {"ticker": "INFY", "start": (NOW - timedelta(days=90)).date(), "end": NOW.date()},
+        {"sentiment_daily_pkey"},
+    ),
+    (
+        "recent_articles: newest first",
+        "SELECT * FROM articles ORDER BY published_at DESC LIMIT 10",
+        {},
+        {"ix_articles_published_at_id"},
+    ),
+    (
+        "recent_articles: newest first for one ticker",
+        """
+        SELECT * FROM articles WHERE ticker = :ticker
+        ORDER BY published_at DESC LIMIT 10
+        """,
+        {"ticker": "INFY"},
+        {"ix_articles_ticker_published_at_id"},
+    ),
+    (
+        "articles connection: keyset page",
+        """
+        SELECT * FROM articles
+        WHERE (published_at, id) < (:published_at, :id)
+        ORDER BY published_at DESC, id DESC
+        LIMIT 21
+        """,
+        {"published_at": NOW, "id": 1000},
+        {"ix_articles_published_at_id"},
+    ),
+    (
+        "holdings: rows for one user",
+        "SELECT * FROM holdings WHERE user_id = :user_id",
+        {"user_id": 1},
+        {"ix_holdings_user_id_values", "uq_holdings_user_isin_client"},
+    ),
+    (
+        "dashboard: portfolio totals for one user",
+        """
+        SELECT sum(market_value), sum(invested_value), sum(overall_gain_loss)
+        FROM holdings WHERE user_id = :user_id
+        """,
+        {"user_id": 1},
+        {"ix_holdings_user_id_values"},
+    ),
+    (
+        "price feed: holdings of the ISINs in a tick batch",
+        "SELECT * FROM holdings WHERE isin = ANY(:isins)",
+        {"isins": ["INE009A01021", "INE467B01029"]},
+        {"ix_holdings_isin"},
+    ),
+    (
+        "dashboard: day change over feed prices",
+        """
+        SELECT sum(h.total_quantity * (p.price - p.prev_close))
+        FROM holdings h JOIN security_prices p ON p.isin = h.isin
+        WHERE h.user_id = :user_id AND p.prev_close IS NOT NULL
+        """,
+        {"user_id": 1},
+        {"security_prices_pkey"},
+    ),
+    (
+        "portfolioHistory: one user's snapshots in a day range",
+        """
+        SELECT DISTINCT ON (date_trunc('week', day)) *
+        FROM portfolio_snapshots
+        WHERE user_id = :user_id AND day >= :start AND day <= :end
+        ORDER BY date_trunc('week', day), day DESC
+        """,
+        {"user_id": 1, "start": (NOW - timedelta(days=365)).date(), "end": NOW.date()},
+        {"portfolio_snapshots_pkey"},
+    ),
+    (
+        "watchlist: rows for one user",
+        "SELECT * FROM watchlists WHERE user_id = :user_id",
+        {"user_id": 1},
+        {"ix_watchlists_user_id_ticker"},
+    ),
+]
+
+
+def plan_nodes(node: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield node
+    for child in node.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+async def run_checks() -> int:
+    failures = 0
+    async with engine.connect() as conn:
+        await conn.execute(text("SET enable_seqscan = off"))
+        for description, sql, params, expected in CHECKS:
+            result = await conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"), params)
+            plan = result.scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            nodes = list(plan_nodes(plan[0]["Plan"]))
+            used = {n["Index Name"] for n in nodes if "Index Name" in n}
+            scans = sorted({n["Node Type"] for n in nodes if "Scan" in n["Node Type"]})
+
+            if used & expected:
+                print(f"ok    {description}: {', '.join(sorted(used))} ({', '.join(scans)})")
+            else:
+                failures += 1
+                print(
+                    f"FAIL  {description}: expected one of {sorted(expected)}, "
+                    f"plan used {sorted(used) or 'no index'} ({', '.join(scans)})"
+                )
+    await engine.dispose()
+    return failures
+
+
+def main() -> None:
+    failures = asyncio.run(run_checks())
+    print(f"\n{len(CHECKS) - failures}/{len(CHECKS)} checks passed")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Login-storm load test.
+
+Fires concurrent `login` mutations at the API while a separate set of clients
+keeps issuing a cheap query, then reports the latency percentiles of the cheap
+query. With bcrypt on the event loop the p99 climbs into the hundreds of
+milliseconds; with the hashing executor it should stay close to the baseline.
+
+Usage (from the backend directory, against a running server):
+
+    python -m scripts.load_test_login_storm --email user@example.com --password secret
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List
+
+import httpx
+
+LOGIN_MUTATION = """
+mutation Login($input: LoginInput!) {
+  login(input: $input) { accessToken }
+}
+"""
+
+PROBE_QUERY = "query Probe { recent_articles(limit: 1) { id } }"
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def login_worker(client: httpx.AsyncClient, url: str, email: str, password: str, stop_at: float, stats: dict):
+    payload = {"query": LOGIN_MUTATION, "variables": {"input": {"email": email, "password": password}}}
+    while time.perf_counter() < stop_at:
+        response = await client.post(url, json=payload)
+        body = response.json()
+        stats["errors" if body.get("errors") else "ok"] += 1
+
+
+async def probe_worker(client: httpx.AsyncClient, url: str, stop_at: float, latencies: List[float]):
+    payload = {"query": PROBE_QUERY}
+    while time.perf_counter() < stop_at:
+        start = time.perf_counter()
+        await client.post(url, json=payload)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+async def run_phase(args, storm: bool) -> List[float]:
+    url = f"{args.url.rstrip('/')}/graphql"
+    latencies: List[float] = []
+    login_stats = {"ok": 0, "errors": 0}
+    stop_at = time.perf_counter() + args.duration
+
+    limits = httpx.Limits(max_connections=args.logins + args.probes + 10)
+    async with httpx.AsyncClient(timeout=60, limits=limits) as client:
+        tasks = [probe_worker(client, url, stop_at, latencies) for _ in range(args.probes)]
+        if storm:
+            tasks += [
+                login_worker(client, url, args.email, args.password, stop_at, login_stats)
+                for _ in range(args.logins)
+            ]
+        await asyncio.gather(*tasks)
+
+    if storm:
+        print(f"  logins: {login_stats['ok']} ok, {login_stats['errors']} rejected/failed")
+    return latencies
+
+
+def report(label: str, latencies: List[float]) -> None:
+    print(
+        f"{label}: n={len(latencies)} "
+        f"p50={percentile(latencies, 50):.1f}ms "
+        f"p95={percentile(latencies, 95):.1f}ms "
+        f"p99={percentile(latencies, 99):.1f}ms "
+        f"mean={statistics.fmean(latencies) if latencies else 0:.1f}ms"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--logins", type=int, default=50, help="concurrent login clients")
+    parser.add_argument("--probes", type=int, default=5, help="concurrent probe clients")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per phase")
+    args = parser.parse_args()
+
+    report("baseline", await run_phase(args, storm=False))
+    report("login storm", await run_phase(args, storm=True))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
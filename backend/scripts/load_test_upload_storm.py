@@ -0,0 +1,129 @@
+"""
+Upload-storm load test.
+
+Keeps several clients uploading a holdings export while another set keeps
+issuing a cheap query, then reports the latency percentiles of the cheap
+query. With spreadsheet parsing on the event loop the p99 tracks the parse
+time of the largest file; with the parse worker processes it should stay
+close to the baseline.
+
+Usage (from the backend directory, against a running server):
+
+    python -m scripts.load_test_upload_storm --email user@example.com --password secret --file holdings.xlsx
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from pathlib import Path
+from typing import List
+
+import httpx
+
+LOGIN_MUTATION = """
+mutation Login($input: LoginInput!) {
+  login(input: $input) { accessToken }
+}
+"""
+
+UPLOAD_MUTATION = """
+mutation Upload($file: Upload!) {
+  upload_holdings(file: $file) { success message count }
+}
+"""
+
+PROBE_QUERY = "query Probe { recent_articles(limit: 1) { id } }"
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def login(client: httpx.AsyncClient, url: str, email: str, password: str) -> str:
+    payload = {"query": LOGIN_MUTATION, "variables": {"input": {"email": email, "password": password}}}
+    response = await client.post(url, json=payload)
+    return response.json()["data"]["login"]["accessToken"]
+
+
+async def upload_worker(client: httpx.AsyncClient, url: str, token: str, path: Path, stop_at: float, stats: dict):
+    # GraphQL multipart request: operations, a map of file parts, the file
+    operations = json.dumps({"query": UPLOAD_MUTATION, "variables": {"file": None}})
+    content = path.read_bytes()
+    while time.perf_counter() < stop_at:
+        start = time.perf_counter()
+        response = await client.post(
+            url,
+            headers={"Authorization": f"Bearer {token}", "apollo-require-preflight": "true"},
+            data={"operations": operations, "map": json.dumps({"0": ["variables.file"]})},
+            files={"0": (path.name, content)},
+        )
+        result = response.json().get("data", {}).get("upload_holdings") or {}
+        stats["ok" if result.get("success") else "failed"] += 1
+        stats["seconds"].append(time.perf_counter() - start)
+
+
+async def probe_worker(client: httpx.AsyncClient, url: str, stop_at: float, latencies: List[float]):
+    payload = {"query": PROBE_QUERY}
+    while time.perf_counter() < stop_at:
+        start = time.perf_counter()
+        await client.post(url, json=payload)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+async def run_phase(args, token: str, storm: bool) -> List[float]:
+    url = f"{args.url.rstrip('/')}/graphql"
+    latencies: List[float] = []
+    upload_stats = {"ok": 0, "failed": 0, "seconds": []}
+    stop_at = time.perf_counter() + args.duration
+
+    limits = httpx.Limits(max_connections=args.uploads + args.probes + 10)
+    async with httpx.AsyncClient(timeout=300, limits=limits) as client:
+        tasks = [probe_worker(client, url, stop_at, latencies) for _ in range(args.probes)]
+        if storm:
+            tasks += [
+                upload_worker(client, url, token, Path(args.file), stop_at, upload_stats)
+                for _ in range(args.uploads)
+            ]
+        await asyncio.gather(*tasks)
+
+    if storm:
+        mean = statistics.fmean(upload_stats["seconds"]) if upload_stats["seconds"] else 0
+        print(f"  uploads: {upload_stats['ok']} ok, {upload_stats['failed']} failed, mean {mean:.1f}s each")
+    return latencies
+
+
+def report(label: str, latencies: List[float]) -> None:
+    print(
+        f"{label}: n={len(latencies)} "
+        f"p50={percentile(latencies, 50):.1f}ms "
+        f"p95={percentile(latencies, 95):.1f}ms "
+        f"p99={percentile(latencies, 99):.1f}ms "
+        f"mean={statistics.fmean(latencies) if latencies else 0:.1f}ms"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--file", required=True, help="holdings export (.xlsx or .csv) to upload")
+    parser.add_argument("--uploads", type=int, default=4, help="concurrent upload clients")
+    parser.add_argument("--probes", type=int, default=5, help="concurrent probe clients")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds per phase")
+    args = parser.parse_args()
+
+    async with httpx.AsyncClient(timeout=60) as client:
+        token = await login(client, f"{args.url.rstrip('/')}/graphql", args.email, args.password)
+
+    report("baseline", await run_phase(args, token, storm=False))
+    report("upload storm", await run_phase(args, token, storm=True))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,29 @@
+"""
+Rebuild the sentiment_daily rollup from the raw sentiments table.
+
+Usage (from the backend directory):
+
+    python -m scripts.rebuild_sentiment_daily            # every ticker
+    python -m scripts.rebuild_sentiment_daily --ticker INFY
+"""
+import argparse
+import asyncio
+
+from app.database import AsyncSessionLocal, engine
+from app.services.sentiment_rollup import SentimentRollupService
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ticker", help="only rebuild this ticker")
+    args = parser.parse_args()
+
+    async with AsyncSessionLocal() as db:
+        rows = await SentimentRollupService.rebuild(db, ticker=args.ticker)
+        await db.commit()
+    await engine.dispose()
+    print(f"Wrote {rows} daily rows for {args.ticker or 'all tickers'}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
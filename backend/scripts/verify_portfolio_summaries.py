@@ -0,0 +1,52 @@
+"""
+Consistency check for the incrementally maintained portfolio summaries.
+
+Recomputes every user's aggregates from their holdings and reports users whose
+stored summary has drifted. With --fix, drifted summaries are rebuilt.
+
+Usage (from the backend directory):
+
+    python -m scripts.verify_portfolio_summaries [--user-id 42] [--fix]
+"""
+import argparse
+import asyncio
+import sys
+
+from sqlalchemy import select
+
+from app.database import AsyncSessionLocal, engine
+from app.models.user import User
+from app.services.portfolio_summary_service import PortfolioSummaryService
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user-id", type=int, help="only check this user")
+    parser.add_argument("--fix", action="store_true", help="rebuild summaries that drifted")
+    args = parser.parse_args()
+
+    drifted = 0
+    async with AsyncSessionLocal() as db:
+        if args.user_id is not None:
+            user_ids = [args.user_id]
+        else:
+            user_ids = (await db.execute(select(User.id).order_by(User.id))).scalars().all()
+
+        for user_id in user_ids:
+            problems = await PortfolioSummaryService.verify(db, user_id)
+            if not problems:
+                continue
+            drifted += 1
+            print(f"user {user_id}: {'; '.join(problems)}")
+            if args.fix:
+                await PortfolioSummaryService.recompute(db, user_id)
+                await db.commit()
+                print(f"user {user_id}: rebuilt")
+
+    await engine.dispose()
+    print(f"{len(user_ids) - drifted}/{len(user_ids)} summaries consistent")
+    return 1 if drifted and not args.fix else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))